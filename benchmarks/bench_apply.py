@@ -0,0 +1,165 @@
+"""
+Apply benchmarks against the mock switch.
+
+Measures wall time, HTTP requests per path and executor-thread occupancy for
+
+* TPLinkConnector.apply_profile (legacy_connector: requests, run in the executor like before)
+* AsyncTPLinkConnector.apply_profile (login/logout per toggle)
+* DeviceCommandQueue on a shared TPLinkSessionBroker (what the entities use)
+* the config flow login test (VlanSwitchConfigFlow._test_login)
+
+Run from the repository root with Home Assistant and requests installed:
+
+    python -m benchmarks.bench_apply --latency 0.02 --toggles 12 --vlans 8
+"""
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.tp_link_vlan_switcher.command_queue import DeviceCommandQueue
+from custom_components.tp_link_vlan_switcher.config_flow import VlanSwitchConfigFlow
+from custom_components.tp_link_vlan_switcher.profile_plan import compile_profile
+from custom_components.tp_link_vlan_switcher.session_broker import TPLinkSessionBroker
+from custom_components.tp_link_vlan_switcher.tp_link_connector import AsyncTPLinkConnector
+
+from .legacy_connector import TPLinkConnector
+from .mock_switch import MockTPLinkSwitch
+
+
+class MeteredExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that sums up how long its threads were busy."""
+
+    def __init__(self, max_workers: int):
+        super().__init__(max_workers=max_workers)
+        self.busy = 0.0
+        self.jobs = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        def _timed():
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.busy += time.perf_counter() - start
+                    self.jobs += 1
+
+        return super().submit(_timed)
+
+
+def make_profile(vlans: int, port_count: int) -> tuple[dict, dict]:
+    """A profile that moves port 1..n between two VLAN sets."""
+    on, off = [], []
+    for i in range(vlans):
+        vid = 100 + i
+        port = i % port_count + 1
+        on.append({"vid": vid, "vname": f"bench{vid}", "ports": {str(port): 0}})
+        off.append({"vid": vid, "vname": f"bench{vid}", "ports": {str(port): 2}})
+    pvid = {
+        "turn_on": {"100": [1]},
+        "turn_off": {"1": [1]},
+    }
+    return {"turn_on": on, "turn_off": off}, pvid
+
+
+def report(name: str, wall: float, switch: MockTPLinkSwitch, executor: MeteredExecutor, toggles: int) -> None:
+    total = sum(switch.counts.values())
+    print(f"\n{name}")
+    print(f"  wall time          {wall * 1000:9.1f} ms  ({wall / toggles * 1000:.1f} ms/toggle)")
+    print(f"  http requests      {total:9d}     ({total / toggles:.1f}/toggle)")
+    print(f"  executor busy      {executor.busy * 1000:9.1f} ms  ({executor.jobs} jobs)")
+    print("  per path           " + ", ".join(f"{k}={v}" for k, v in sorted(switch.counts.items())))
+
+
+async def bench_sync(args, vlans, pvid) -> None:
+    executor = MeteredExecutor(args.workers)
+    loop = asyncio.get_running_loop()
+    with MockTPLinkSwitch(latency=args.latency, session_slots=args.slots) as switch:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            loop.run_in_executor(
+                executor, TPLinkConnector(switch.address, "admin", "admin").apply_profile,
+                vlans, pvid, "turn_on" if i % 2 == 0 else "turn_off",
+            )
+            for i in range(args.toggles)
+        ))
+        report("TPLinkConnector.apply_profile (executor)", time.perf_counter() - start,
+               switch, executor, args.toggles)
+    executor.shutdown()
+
+
+async def bench_async(args, vlans, pvid, session) -> None:
+    executor = MeteredExecutor(args.workers)
+    asyncio.get_running_loop().set_default_executor(executor)
+    with MockTPLinkSwitch(latency=args.latency, session_slots=args.slots) as switch:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            AsyncTPLinkConnector(session, switch.address, "admin", "admin").apply_profile(
+                vlans, pvid, "turn_on" if i % 2 == 0 else "turn_off"
+            )
+            for i in range(args.toggles)
+        ))
+        report(f"AsyncTPLinkConnector.apply_profile ({results.count(False)} failed)",
+               time.perf_counter() - start, switch, executor, args.toggles)
+
+
+async def bench_queue(args, vlans, pvid, session, hass) -> None:
+    executor = MeteredExecutor(args.workers)
+    asyncio.get_running_loop().set_default_executor(executor)
+    with MockTPLinkSwitch(latency=args.latency, session_slots=args.slots) as switch:
+        broker = TPLinkSessionBroker(
+            hass, AsyncTPLinkConnector(session, switch.address, "admin", "admin")
+        )
+        queue = DeviceCommandQueue(hass, broker, debounce=0.05)
+        plans = [compile_profile(f"p{i}", vlans, pvid, 8) for i in range(args.toggles)]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(queue.async_submit(plan, "turn_on") for plan in plans))
+        report("DeviceCommandQueue + TPLinkSessionBroker", time.perf_counter() - start,
+               switch, executor, args.toggles)
+        await queue.async_shutdown()
+        await broker.async_close()
+
+
+async def bench_login_test(args, hass) -> None:
+    executor = MeteredExecutor(args.workers)
+    asyncio.get_running_loop().set_default_executor(executor)
+    with MockTPLinkSwitch(latency=args.latency, session_slots=args.slots) as switch:
+        flow = VlanSwitchConfigFlow()
+        flow.hass = hass
+        start = time.perf_counter()
+        ok, error, _ = await flow._test_login(switch.address, "admin", "admin")
+        report(f"VlanSwitchConfigFlow._test_login (ok={ok}, error={error})",
+               time.perf_counter() - start, switch, executor, 1)
+
+
+async def main(args) -> None:
+    vlans, pvid = make_profile(args.vlans, 8)
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+
+        async with aiohttp.ClientSession() as session:
+            await bench_sync(args, vlans, pvid)
+            await bench_async(args, vlans, pvid, session)
+            await bench_queue(args, vlans, pvid, session, hass)
+            await bench_login_test(args, hass)
+
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request on the mock switch")
+    parser.add_argument("--toggles", type=int, default=12, help="concurrent profile toggles")
+    parser.add_argument("--vlans", type=int, default=8, help="VLANs per profile phase")
+    parser.add_argument("--slots", type=int, default=16, help="web session slots of the mock switch")
+    parser.add_argument("--workers", type=int, default=4, help="executor threads")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of the embedded JS parser on real-size switch pages.
+
+Compares utils.parse_js_vars / extract_js_object_field with the former per-call regex
+implementation (kept here as baseline) on SystemInfoRpm.htm and the 802.1Q VLAN/PVID pages
+of a 24-port switch with 32 VLANs, padded with the usual page markup and scripts.
+
+    python -m benchmarks.bench_parser --number 2000
+"""
+import argparse
+import json
+import re
+import timeit
+
+from custom_components.tp_link_vlan_switcher.utils import (
+    extract_js_object_field, parse_js_object, parse_js_vars
+)
+
+from .mock_switch import MockTPLinkSwitch
+
+# Markup and script around the data objects, roughly the size of the real pages
+_PAGE_PADDING = (
+    "<html><head><meta http-equiv='Content-Type' content='text/html; charset=utf-8'>"
+    "<link rel='stylesheet' href='/css/style.css'></head><body>\n"
+    + "<script>\nfunction chk_%d(f){var i = 0; var el = document.getElementById('p%d');"
+      " if(el.value == '') {alert('Please input'); return false;} return true;}\n</script>\n" * 40
+    + "<table class='BORDER'>" + "<tr><td class='TD_FIRST_COL'>Port</td><td>-</td></tr>" * 60 + "</table>"
+)
+
+
+def legacy_extract_js_object_field(html: str, object_name: str, field: str = None):
+    """The former implementation: per-call f-string regex, single-string arrays only."""
+    match = re.search(rf"var {object_name} = (\{{.*?\}});", html, re.DOTALL)
+    if not match:
+        return None
+    js_obj_str = re.sub(r'(\w+)?:\s*\[\s*"(.*?)"\s*\]', r'"\1": ["\2"]', match.group(1))
+    obj = json.loads(js_obj_str)
+    transformed_obj = {k: v[0] for k, v in obj.items()}
+    if field:
+        return transformed_obj.get(field)
+    return transformed_obj
+
+
+def build_pages() -> dict[str, str]:
+    switch = MockTPLinkSwitch(port_count=24)
+    for i in range(31):
+        vid = 100 + i
+        switch.vlans[vid] = [f"vlan{vid}", {p: (p + i) % 3 for p in range(1, 25)}]
+    padding = _PAGE_PADDING.replace("%d", "0")
+    return {
+        "SystemInfoRpm.htm": padding + switch.system_info_page(),
+        "Vlan8021QRpm.htm": padding + switch.vlan_page(),
+        "Vlan8021QPvidRpm.htm": padding + switch.pvid_page(),
+    }
+
+
+def main(args) -> None:
+    pages = build_pages()
+    for name, page in pages.items():
+        print(f"{name}: {len(page)} bytes")
+
+    def _bench(label: str, stmt) -> None:
+        seconds = timeit.timeit(stmt, number=args.number)
+        print(f"  {label:<48} {seconds / args.number * 1e6:8.1f} µs/call")
+
+    print("\nSystemInfoRpm.htm")
+    info = pages["SystemInfoRpm.htm"]
+    _bench("legacy extract_js_object_field", lambda: legacy_extract_js_object_field(info, "info_ds"))
+    _bench("extract_js_object_field", lambda: extract_js_object_field(info, "info_ds"))
+
+    for name in ("Vlan8021QRpm.htm", "Vlan8021QPvidRpm.htm"):
+        page = pages[name]
+        print(f"\n{name}")
+        obj = "qvlan_ds" if name == "Vlan8021QRpm.htm" else "pvid_ds"
+        _bench("parse_js_vars (all declarations)", lambda: parse_js_vars(page))
+        _bench(f"parse_js_object ({obj} only)", lambda: parse_js_object(page, obj))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="calls per measurement")
+    main(parser.parse_args())
@@ -0,0 +1,140 @@
+"""
+Record a switch session once, then benchmark and verify the connector against it offline.
+
+`record` runs a fixed scenario on a switch (the mock switch unless --host is given) with an
+HttpRecorder attached and writes the trace:
+
+* login and system info (like the config flow login test)
+* --polls rounds of VLAN/PVID and port statistics reads (like the coordinators)
+* with --apply a profile switched on and off again (like the command queue)
+* logout
+
+`replay` runs the same scenario against a ReplaySession of the trace and reports wall time,
+requests, requests the trace had no answer for, parse cache hits and the parsed results.
+Pass the scenario options used for recording; --scale 0 replays without latency, 1 with
+the recorded one.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_replay record --out sg108e.jsonl.gz --polls 5 --apply
+    python -m benchmarks.bench_replay record --host 192.168.0.1 --password secret --out sg108e.jsonl.gz
+    python -m benchmarks.bench_replay replay sg108e.jsonl.gz --polls 5 --apply --scale 0 --repeat 100
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+
+import aiohttp
+
+from custom_components.tp_link_vlan_switcher.profile_plan import compile_profile
+from custom_components.tp_link_vlan_switcher.recorder import HttpRecorder, ReplaySession, load_trace
+from custom_components.tp_link_vlan_switcher.tp_link_connector import AsyncTPLinkConnector
+
+from .bench_apply import make_profile
+from .mock_switch import MockTPLinkSwitch
+
+
+async def scenario(connector: AsyncTPLinkConnector, args) -> dict:
+    """The recorded session; returns what was parsed along the way."""
+    await connector.ensure_login()
+    info = await connector.get_device_info()
+    state = counters = None
+    for _ in range(args.polls):
+        state = await connector.get_vlan_state()
+        counters = await connector.get_port_counters(args.ports)
+    if args.apply:
+        vlans, pvid = make_profile(args.vlans, args.ports)
+        plan = compile_profile("bench", vlans, pvid, args.ports)
+        for phase in ("turn_on", "turn_off"):
+            await connector.execute_plan(plan.phase(phase), diff=True)
+    await connector.logout()
+    return {"info": info, "state": state, "counters": counters}
+
+
+def describe(result: dict) -> str:
+    info = result["info"] or {}
+    state = result["state"]
+    vlans = "-" if state is None else len(state.vlans)
+    ports = "-" if result["counters"] is None else len(result["counters"])
+    return f"{info.get('hardwareStr', '?')} fw {info.get('firmwareStr', '?')}: {vlans} VLANs, {ports} ports"
+
+
+async def record(args) -> None:
+    with contextlib.ExitStack() as stack:
+        if args.host:
+            host, username, password = args.host, args.username, args.password
+        else:
+            switch = stack.enter_context(MockTPLinkSwitch(port_count=args.ports, latency=args.latency))
+            host, username, password = switch.address, switch.username, switch.password
+        if os.path.exists(args.out):
+            os.remove(args.out)
+        recorder = HttpRecorder(args.out, host, secrets=(username, password))
+        async with aiohttp.ClientSession() as session:
+            connector = AsyncTPLinkConnector(session, host, username, password, recorder=recorder)
+            start = time.perf_counter()
+            result = await scenario(connector, args)
+            wall = time.perf_counter() - start
+        await recorder.async_close()
+    print(f"recorded {recorder.exchanges} exchanges in {wall:.3f}s -> {args.out} "
+          f"({os.path.getsize(args.out)} bytes)")
+    print(f"  {describe(result)}")
+
+
+async def replay(args) -> None:
+    header, exchanges, bodies = await asyncio.get_running_loop().run_in_executor(None, load_trace, args.trace)
+    recorded = sum(e.duration for e in exchanges)
+    print(f"{args.trace}: {header.get('host')} recorded {header.get('recorded')}, "
+          f"{len(exchanges)} exchanges, {len(bodies)} distinct bodies, {recorded:.3f}s request time")
+
+    walls, misses, cache = [], 0, [0, 0]
+    for _ in range(args.repeat):
+        session = ReplaySession(exchanges, bodies, latency_scale=args.scale)
+        connector = AsyncTPLinkConnector(session, header.get("host", "replay"), "replay", "replay")
+        start = time.perf_counter()
+        result = await scenario(connector, args)
+        walls.append(time.perf_counter() - start)
+        misses += len(session.misses)
+        cache[0] += connector.parse_cache.hits
+        cache[1] += connector.parse_cache.misses
+        if session.misses or session.unused:
+            print(f"  {len(session.misses)} unanswered requests, {session.unused} recorded exchanges not requested")
+            for method, path, query in session.misses[:5]:
+                print(f"    {method} {path} {dict(query)}")
+
+    walls.sort()
+    print(f"replay x{args.scale:g} latency, {args.repeat} runs: median {walls[len(walls) // 2] * 1000:.2f} ms, "
+          f"min {walls[0] * 1000:.2f} ms, max {walls[-1] * 1000:.2f} ms")
+    print(f"  unanswered requests: {misses}, parse cache {cache[0]} hits / {cache[1]} misses")
+    print(f"  {describe(result)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="record the scenario into a trace")
+    rec.add_argument("--out", required=True, help="trace file (.jsonl.gz)")
+    rec.add_argument("--host", help="switch address (default: a local mock switch)")
+    rec.add_argument("--username", default="admin")
+    rec.add_argument("--password", default="admin")
+    rec.add_argument("--latency", type=float, default=0.02, help="seconds per request on the mock switch")
+
+    rep = commands.add_parser("replay", help="run the scenario against a trace")
+    rep.add_argument("trace", help="trace file (.jsonl.gz)")
+    rep.add_argument("--scale", type=float, default=1.0, help="factor on the recorded latency (0 = none)")
+    rep.add_argument("--repeat", type=int, default=1, help="scenario runs")
+
+    for sub in (rec, rep):
+        sub.add_argument("--polls", type=int, default=3, help="VLAN and port statistics reads")
+        sub.add_argument("--apply", action="store_true", help="switch a profile on and off")
+        sub.add_argument("--vlans", type=int, default=4, help="VLANs of the applied profile")
+        sub.add_argument("--ports", type=int, default=8, help="port count of the switch")
+
+    args = parser.parse_args()
+    asyncio.run(record(args) if args.command == "record" else replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Startup benchmark: a Home Assistant instance with many switches and profiles.
+
+Starts one mock switch per device, creates a config entry per switch with the given
+number of profile switches and measures
+
+* the import time of the integration package (fresh interpreter)
+* the time until all config entries are loaded and their entities exist
+* the HTTP requests the switches received during setup
+* the time until the first poll of every switch finished in the background
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_startup --devices 10 --profiles 100
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+
+from homeassistant import config_entries, loader
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import (
+    area_registry as ar, device_registry as dr, entity_registry as er, restore_state as rs
+)
+
+from custom_components.tp_link_vlan_switcher.const import DATA_COORDINATOR, DOMAIN
+
+from .bench_apply import make_profile
+from .mock_switch import MockTPLinkSwitch
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time() -> float:
+    """Seconds a fresh interpreter needs to import the integration (HA core preloaded)."""
+    code = (
+        "import time, homeassistant.core, homeassistant.helpers.update_coordinator\n"
+        "start = time.perf_counter()\n"
+        "import custom_components.tp_link_vlan_switcher.switch\n"
+        "import custom_components.tp_link_vlan_switcher.sensor\n"
+        "import custom_components.tp_link_vlan_switcher.button\n"
+        "import custom_components.tp_link_vlan_switcher.select\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+async def start_hass(config_dir: str) -> HomeAssistant:
+    """Minimal core with registries and config entries, custom_components linked in."""
+    os.symlink(os.path.join(REPO_ROOT, "custom_components"), os.path.join(config_dir, "custom_components"))
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    hass.data["entity_info"] = {}
+    await ar.async_load(hass)
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    await rs.async_load(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    await hass.async_start()
+    return hass
+
+
+def make_entry(switch: MockTPLinkSwitch, profiles: int, vlans: int) -> config_entries.ConfigEntry:
+    vlan_cfg, pvid_cfg = make_profile(vlans, switch.port_count)
+    return config_entries.ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title=switch.address,
+        data={
+            "ip_address": switch.address,
+            "username": "admin",
+            "password": "admin",
+            "port_count": switch.port_count,
+            "system_info": dict(switch.info),
+        },
+        source=config_entries.SOURCE_USER,
+        options={
+            "switches": {f"profile {i}": {"vlans": vlan_cfg, "pvid": pvid_cfg} for i in range(profiles)},
+        },
+    )
+
+
+async def main(args) -> None:
+    print(f"import time            {import_time() * 1000:9.1f} ms")
+
+    per_device = max(1, args.profiles // args.devices)
+    with tempfile.TemporaryDirectory() as config_dir, ExitStack() as stack:
+        switches = [
+            stack.enter_context(MockTPLinkSwitch(latency=args.latency, session_slots=16))
+            for _ in range(args.devices)
+        ]
+        hass = await start_hass(config_dir)
+        entries = [make_entry(switch, per_device, args.vlans) for switch in switches]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(hass.config_entries.async_add(entry) for entry in entries))
+        setup = time.perf_counter() - start
+        requests_during_setup = sum(sum(s.counts.values()) for s in switches)
+
+        await hass.async_block_till_done()
+        coordinators = [
+            hass.data[DOMAIN][e.entry_id][DATA_COORDINATOR]
+            for e in entries if e.entry_id in hass.data.get(DOMAIN, {})
+        ]
+        # The first poll runs as a background task after setup
+        deadline = time.perf_counter() + args.timeout
+        while time.perf_counter() < deadline and any(c.data is None for c in coordinators):
+            await asyncio.sleep(0.01)
+        first_poll = time.perf_counter() - start
+        loaded = sum(e.state is config_entries.ConfigEntryState.LOADED for e in entries)
+        polled = sum(c.data is not None for c in coordinators)
+
+        print(f"devices / profiles     {args.devices:9d} / {per_device * args.devices}")
+        print(f"entries loaded         {loaded:9d}")
+        print(f"entities               {len(hass.states.async_all()):9d}")
+        print(f"setup                  {setup * 1000:9.1f} ms")
+        print(f"http until setup done  {requests_during_setup:9d}")
+        print(f"first poll done        {first_poll * 1000:9.1f} ms  ({polled} devices)")
+
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=10, help="mock switches / config entries")
+    parser.add_argument("--profiles", type=int, default=100, help="profile switches over all devices")
+    parser.add_argument("--vlans", type=int, default=4, help="VLANs per profile phase")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request on the mock switch")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for the first poll")
+    asyncio.run(main(parser.parse_args()))
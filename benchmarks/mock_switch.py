@@ -0,0 +1,364 @@
+"""
+In-process stand-in for the web interface of a TP-Link Easy Smart switch.
+
+Serves logon.cgi, Logout.htm, SystemInfoRpm.htm, PortStatisticsRpm.htm, qvlanSet.cgi,
+vlanPvidSet.cgi, reboot.cgi, config_back.cgi, conf_restore.cgi and the 802.1Q VLAN/PVID
+read pages from a plain ThreadingHTTPServer, so both the requests-based legacy connector
+and the aiohttp-based connector can talk to it. Latency, the number of web session slots
+and failures can be configured per instance; every request is counted per path.
+
+    with MockTPLinkSwitch(latency=0.05) as switch:
+        connector = AsyncTPLinkConnector(session, switch.address, "admin", "admin")
+        ...
+        print(switch.counts)
+"""
+import email.parser
+import json
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Union
+from urllib.parse import parse_qs, urlsplit
+
+# errType values of the logonInfo array
+ERR_OK = 0
+ERR_BAD_CREDENTIALS = 1
+ERR_SESSION_FULL = 4
+
+
+class MockTPLinkSwitch:
+    """Emulated switch with VLAN/PVID state, session slots, latency and failure injection."""
+
+    def __init__(self, port_count: int = 8, latency: float = 0.0, session_slots: int = 3,
+                 session_timeout: float = 600.0, username: str = "admin", password: str = "admin",
+                 failure_rate: float = 0.0, serialize: bool = True, reboot_time: float = 1.0,
+                 config_size: int = 4096):
+        self.port_count = port_count
+        self.latency = latency
+        self.session_slots = session_slots
+        self.session_timeout = session_timeout
+        self.username = username
+        self.password = password
+        self.failure_rate = failure_rate
+        self.reboot_time = reboot_time
+        self.config_size = config_size
+        self.info = {
+            "descriStr": "TL-SG108E",
+            "macStr": "50:C7:BF:00:00:01",
+            "ipStr": "127.0.0.1",
+            "netmaskStr": "255.255.255.0",
+            "gatewayStr": "0.0.0.0",
+            "firmwareStr": "1.0.0 Build 20230218 Rel.50633",
+            "hardwareStr": "TL-SG108E 6.0",
+        }
+
+        # vid -> [name, {port: state}]
+        self.vlans: dict[int, list] = {1: ["Default", {p: 0 for p in range(1, port_count + 1)}]}
+        self.pvids: list[int] = [1] * port_count
+        # per port link_status code and [txGood, txBad, rxGood, rxBad]
+        self.link_status: list[int] = [6] * port_count
+        self.packets: list[list[int]] = [[0, 0, 0, 0] for _ in range(port_count)]
+
+        self.counts: Counter = Counter()
+        self._sessions: list[float] = []  # last activity per logged-in session
+        self._failures: dict[str, list[int]] = {}  # path -> [remaining, status]
+        self._state_lock = threading.Lock()
+        # The embedded web server handles one request at a time
+        self._serve_lock = threading.Lock() if serialize else None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._bind = ("127.0.0.1", 0)
+        self._connections: set[socket.socket] = set()
+
+    # ---------------------- Lifecycle ----------------------
+    @property
+    def address(self) -> str:
+        host, port = self._bind
+        return f"{host}:{port}"
+
+    def start(self) -> "MockTPLinkSwitch":
+        """Start serving; after a stop() the switch comes back on the same address."""
+        self._server = ThreadingHTTPServer(self._bind, _make_handler(self))
+        self._server.daemon_threads = True
+        self._bind = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and drop open keep-alive connections, like a powered off switch."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._state_lock:
+            for conn in self._connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self._connections.clear()
+            self._sessions.clear()
+
+    def __enter__(self) -> "MockTPLinkSwitch":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---------------------- Test control ----------------------
+    def fail(self, path: str, count: int = 1, status: int = 500) -> None:
+        """Answer the next `count` requests to path with the given HTTP status."""
+        self._failures[path.lstrip("/")] = [count, status]
+
+    def reset_counts(self) -> None:
+        self.counts.clear()
+
+    @property
+    def active_sessions(self) -> int:
+        with self._state_lock:
+            self._expire_sessions()
+            return len(self._sessions)
+
+    # ---------------------- Sessions ----------------------
+    def _expire_sessions(self) -> None:
+        now = time.monotonic()
+        self._sessions = [t for t in self._sessions if now - t < self.session_timeout]
+
+    def _login(self, username: str, password: str) -> int:
+        if username != self.username or password != self.password:
+            return ERR_BAD_CREDENTIALS
+        with self._state_lock:
+            self._expire_sessions()
+            if len(self._sessions) >= self.session_slots:
+                return ERR_SESSION_FULL
+            self._sessions.append(time.monotonic())
+        return ERR_OK
+
+    def _logout(self) -> None:
+        with self._state_lock:
+            if self._sessions:
+                self._sessions.pop()
+
+    def _authorized(self) -> bool:
+        with self._state_lock:
+            self._expire_sessions()
+            if not self._sessions:
+                return False
+            self._sessions[-1] = time.monotonic()
+            return True
+
+    # ---------------------- Pages ----------------------
+    def login_page(self, err_type: int) -> str:
+        return f"<script>var logonInfo = new Array({err_type}, 0, 0);</script>"
+
+    def system_info_page(self) -> str:
+        fields = ",\n".join(f'{k}:["{v}"]' for k, v in self.info.items())
+        return f"<script>\nvar info_ds = {{\n{fields}\n}};\n</script>"
+
+    def vlan_page(self) -> str:
+        vids = sorted(self.vlans)
+
+        def bitmap(vid: int, state: int) -> int:
+            return sum(1 << (p - 1) for p, st in self.vlans[vid][1].items() if st == state)
+
+        return (
+            "<script>\nvar qvlan_ds = {\nstate:1,\n"
+            f"portNum:{self.port_count},\n"
+            f"vids:[{','.join(map(str, vids))}],\n"
+            f"count:{len(vids)},\nmaxVids:32,\n"
+            f"names:[{','.join(repr(self.vlans[v][0]) for v in vids)}],\n"
+            f"tagMbrs:[{','.join(hex(bitmap(v, 1)) for v in vids)}],\n"
+            f"untagMbrs:[{','.join(hex(bitmap(v, 0)) for v in vids)}],\n"
+            f"lagIds:[{','.join('0' for _ in range(self.port_count))}],\n"
+            f"lagMbrs:[{','.join('0' for _ in range(self.port_count))}]\n"
+            "};\n</script>"
+        )
+
+    def pvid_page(self) -> str:
+        return (
+            "<script>\nvar pvid_ds = {\nstate:1,\n"
+            f"portNum:{self.port_count},\n"
+            f"pvids:[{','.join(map(str, self.pvids))}],\n"
+            f"lagIds:[{','.join('0' for _ in range(self.port_count))}],\n"
+            f"lagMbrs:[{','.join('0' for _ in range(self.port_count))}]\n"
+            "};\n</script>"
+        )
+
+    def port_stats_page(self) -> str:
+        return (
+            f"<script>\nvar max_port_num = {self.port_count};\nvar all_info = {{\n"
+            f"state:[{','.join('1' for _ in range(self.port_count))}],\n"
+            f"link_status:[{','.join(map(str, self.link_status))}],\n"
+            f"pkts:[{','.join(str(v) for port in self.packets for v in port)}]\n"
+            "};\n</script>"
+        )
+
+    # ---------------------- Config writes ----------------------
+    def _qvlan_set(self, query: dict[str, list[str]]) -> None:
+        with self._state_lock:
+            if "qvlan_add" in query:
+                vid = int(query["vid"][0])
+                entry = self.vlans.setdefault(
+                    vid, [query.get("vname", [""])[0], {p: 2 for p in range(1, self.port_count + 1)}]
+                )
+                if query.get("vname", [""])[0]:
+                    entry[0] = query["vname"][0]
+                for key, value in query.items():
+                    if key.startswith("selType_"):
+                        entry[1][int(key[8:])] = int(value[0])
+            elif "qvlan_del" in query:
+                for vid in query.get("selVlans", []):
+                    if int(vid) != 1:
+                        self.vlans.pop(int(vid), None)
+
+    def _pvid_set(self, query: dict[str, list[str]]) -> None:
+        """Like the firmware: ports that are not member of the PVID's VLAN keep their PVID (still HTTP 200)."""
+        pbm = int(query["pbm"][0])
+        pvid = int(query["pvid"][0])
+        with self._state_lock:
+            entry = self.vlans.get(pvid)
+            for i in range(self.port_count):
+                if pbm & (1 << i) and entry is not None and entry[1].get(i + 1, 2) != 2:
+                    self.pvids[i] = pvid
+
+    def _reboot(self, save: bool) -> None:
+        """Go offline, forget unsaved config, come back after reboot_time."""
+        self.stop()
+        if not save:
+            self.vlans = {1: ["Default", {p: 0 for p in range(1, self.port_count + 1)}]}
+            self.pvids = [1] * self.port_count
+        threading.Timer(self.reboot_time, self.start).start()
+
+    def config_file(self) -> bytes:
+        """Binary config backup: VLAN/PVID tables padded to config_size like the real file."""
+        with self._state_lock:
+            data = json.dumps({"vlans": self.vlans, "pvids": self.pvids}, sort_keys=True).encode()
+        return data + b"\n" + b"\0" * max(0, self.config_size - len(data) - 1)
+
+    def _restore(self, config: bytes) -> None:
+        data = json.loads(config.rstrip(b"\0"))
+        with self._state_lock:
+            self.vlans = {
+                int(vid): [name, {int(p): st for p, st in ports.items()}]
+                for vid, (name, ports) in data["vlans"].items()
+            }
+            self.pvids = list(data["pvids"])
+        threading.Timer(0.05, self._reboot, (True,)).start()
+
+    # ---------------------- Dispatch ----------------------
+    def handle(self, method: str, path: str, query: dict[str, list[str]],
+               form: dict[str, list]) -> tuple[int, Union[str, bytes]]:
+        path = path.lstrip("/")
+        self.counts[path] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        rule = self._failures.get(path)
+        if rule and rule[0] > 0:
+            rule[0] -= 1
+            return rule[1], "error"
+        if self.failure_rate and random.random() < self.failure_rate:
+            return 500, "error"
+
+        if path == "logon.cgi":
+            err = self._login(form.get("username", [""])[0], form.get("password", [""])[0])
+            return 200, self.login_page(err)
+        if path == "Logout.htm":
+            self._logout()
+            return 200, self.login_page(ERR_OK)
+        if not self._authorized():
+            return 200, self.login_page(ERR_OK)
+
+        if path == "SystemInfoRpm.htm":
+            return 200, self.system_info_page()
+        if path == "Vlan8021QRpm.htm":
+            return 200, self.vlan_page()
+        if path == "Vlan8021QPvidRpm.htm":
+            return 200, self.pvid_page()
+        if path == "PortStatisticsRpm.htm":
+            return 200, self.port_stats_page()
+        if path == "qvlanSet.cgi":
+            self._qvlan_set(query)
+            return 200, self.vlan_page()
+        if path == "vlanPvidSet.cgi":
+            self._pvid_set(query)
+            return 200, self.pvid_page()
+        if path == "reboot.cgi":
+            save = query.get("save_op", ["false"])[0] == "true"
+            threading.Timer(0.05, self._reboot, (save,)).start()
+            return 200, "<html><body>Rebooting...</body></html>"
+        if path == "config_back.cgi":
+            return 200, self.config_file()
+        if path == "conf_restore.cgi":
+            try:
+                self._restore(form["configfile"][0])
+            except (KeyError, ValueError) as e:
+                return 200, f"<html><body>Invalid config file: {e}</body></html>"
+            return 200, "<html><body>Restoring configuration, rebooting...</body></html>"
+        return 404, "not found"
+
+
+def _make_handler(switch: MockTPLinkSwitch):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Send headers and body in one segment, otherwise delayed ACKs dominate the timings
+        wbufsize = 1 << 16
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with switch._state_lock:
+                switch._connections.add(self.connection)
+
+        def finish(self):
+            with switch._state_lock:
+                switch._connections.discard(self.connection)
+            super().finish()
+
+        def _dispatch(self, method: str) -> None:
+            url = urlsplit(self.path)
+            form = {}
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                body = self.rfile.read(length)
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("multipart/form-data"):
+                    message = email.parser.BytesParser().parsebytes(
+                        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+                    )
+                    form = {
+                        part.get_param("name", header="content-disposition"): [part.get_payload(decode=True)]
+                        for part in message.get_payload()
+                    }
+                else:
+                    form = parse_qs(body.decode(), keep_blank_values=True)
+            query = parse_qs(url.query, keep_blank_values=True)
+
+            if switch._serve_lock is not None:
+                with switch._serve_lock:
+                    status, body = switch.handle(method, url.path, query, form)
+            else:
+                status, body = switch.handle(method, url.path, query, form)
+
+            binary = isinstance(body, bytes)
+            data = body if binary else body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/octet-stream" if binary else "text/html")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def log_message(self, *args):
+            pass
+
+    return _Handler
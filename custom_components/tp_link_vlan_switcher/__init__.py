@@ -1,30 +1,223 @@
-from homeassistant.core import HomeAssistant
+import asyncio
+import logging
+
+import aiohttp
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.typing import ConfigType
-from homeassistant.const import Platform
-from .const import DOMAIN, PLATFORMS
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.helpers import device_registry as dr
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from .const import (
+    DOMAIN, PLATFORMS, CONF_IP, CONF_USERNAME, CONF_PASSWORD, CONF_PORTS, CONF_SWITCHES, CONF_DEVICE,
+    CONF_VLANS, CONF_PVID, CONF_DEBOUNCE, DEFAULT_DEBOUNCE,
+    CONF_TIMEOUT_MIN, CONF_TIMEOUT_MAX, CONF_APPLY_DEADLINE,
+    DEFAULT_TIMEOUT_MIN, DEFAULT_TIMEOUT_MAX, DEFAULT_APPLY_DEADLINE,
+    DATA_CONFIG, DATA_BROKER, DATA_COORDINATOR, DATA_PLANS, DATA_QUEUE, DATA_METRICS,
+    DATA_PORT_COORDINATOR, DATA_SNAPSHOT, DATA_BACKUPS, DATA_SCHEDULER, DATA_SWITCH_MANAGER, CONF_GROUPS,
+    CONF_BACKUP_BEFORE_APPLY, CONF_BACKUP_RETENTION, DEFAULT_BACKUP_RETENTION, CONF_RECORD_HTTP, DATA_RECORDER,
+    SIGNAL_ENTRIES_CHANGED,
+)
+from .backup import BackupStore
+from .command_queue import DeviceCommandQueue
+from .coordinator import TPLinkPortStatsCoordinator, TPLinkVlanCoordinator
+from .entity_base import entry_device_info
+from .metrics import ConnectorMetrics
+from .profile_plan import ProfilePlan, ProfileValidationError, compile_profile
+from .recorder import HttpRecorder, trace_path
+from .scheduler import FleetScheduler
+from .services import async_setup_services
+from .session_broker import TPLinkSessionBroker
+from .snapshot import DeviceSnapshot
+from .timeouts import AdaptiveTimeouts
+from .tp_link_connector import AsyncTPLinkConnector, TPLinkError, TPLinkUnavailable
+
+_LOGGER = logging.getLogger(__name__)
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the fleet scheduler, load the shared backup index and register the services."""
+    backups = BackupStore(hass)
+    await backups.async_load()
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    domain_data[DATA_BACKUPS] = backups
+    domain_data[DATA_SCHEDULER] = FleetScheduler(hass)
+    async_setup_services(hass)
+    return True
+
+
+def _compile_plans(entry: ConfigEntry) -> dict[str, ProfilePlan]:
+    """Compile all profile switches of an entry, skipping invalid ones."""
+    plans = {}
+    for name, cfg in entry.options.get(CONF_SWITCHES, {}).items():
+        try:
+            plans[name] = compile_profile(
+                name, cfg.get(CONF_VLANS) or {}, cfg.get(CONF_PVID) or {}, entry.data.get(CONF_PORTS)
+            )
+        except ProfileValidationError as e:
+            _LOGGER.error("[%s] Ungültiges Profil '%s' wird übersprungen: %s", entry.entry_id, name, e)
+    return plans
+
+
+async def _async_refresh_device_info(hass: HomeAssistant, entry: ConfigEntry,
+                                     broker: TPLinkSessionBroker) -> None:
+    """Re-read system_info and update entry data and device registry if it changed."""
+    try:
+        info = await broker.async_run(lambda connector: connector.get_device_info())
+    except (TPLinkError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+        _LOGGER.debug("[%s] Systeminfo konnte nicht aktualisiert werden: %s", entry.entry_id, err)
+        return
+    if not info or info == entry.data.get(CONF_DEVICE):
+        return
+
+    hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_DEVICE: info})
+    registry = dr.async_get(hass)
+    device = registry.async_get_device(identifiers={(DOMAIN, entry.data[CONF_IP])})
+    if device is not None:
+        device_info = entry_device_info(hass, entry)
+        registry.async_update_device(
+            device.id,
+            name=device_info["name"],
+            model=device_info["model"],
+            sw_version=device_info["sw_version"],
+            hw_version=device_info["hw_version"],
+        )
+
+
+async def _async_startup_refresh(hass: HomeAssistant, entry: ConfigEntry, broker: TPLinkSessionBroker,
+                                 coordinators: list) -> None:
+    """First poll and system_info refresh, run after setup instead of blocking it."""
+    for coordinator in coordinators:
+        await coordinator.async_refresh()
+    await _async_refresh_device_info(hass, entry, broker)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Set up TP-Link VLAN Switcher from a config entry."""
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = entry.data
+    """Set up TP-Link VLAN Switcher from a config entry (no network I/O on this path)."""
+    metrics = ConnectorMetrics()
+    scheduler: FleetScheduler = hass.data[DOMAIN][DATA_SCHEDULER]
+    options = dict(entry.options)
+    timeouts = AdaptiveTimeouts(
+        floor=options.get(CONF_TIMEOUT_MIN, DEFAULT_TIMEOUT_MIN),
+        ceiling=options.get(CONF_TIMEOUT_MAX, DEFAULT_TIMEOUT_MAX),
+    )
+    recorder = None
+    if options.get(CONF_RECORD_HTTP):
+        # Alle Sessions des Eintrags landen in einer Trace-Datei
+        recorder = HttpRecorder(trace_path(hass, entry.data[CONF_IP]), entry.data[CONF_IP],
+                                secrets=(entry.data.get(CONF_USERNAME), entry.data.get(CONF_PASSWORD)), hass=hass)
+        _LOGGER.info("[%s] HTTP-Verkehr wird aufgezeichnet: %s", entry.entry_id, recorder.path)
+
+        async def _flush_trace(_event) -> None:
+            await recorder.async_flush()
+
+        # Beim Stoppen wird der Eintrag nicht entladen, der Puffer muss trotzdem auf die Platte
+        entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _flush_trace))
+    broker = TPLinkSessionBroker(hass, lambda: AsyncTPLinkConnector(
+        async_get_clientsession(hass),
+        entry.data[CONF_IP],
+        entry.data.get(CONF_USERNAME),
+        entry.data.get(CONF_PASSWORD),
+        metrics,
+        timeouts,
+        options.get(CONF_APPLY_DEADLINE, DEFAULT_APPLY_DEADLINE) or None,
+        scheduler.limiter,
+        recorder,
+    ))
+    # Letzter bekannter Stand von der Platte, damit Entitäten nicht mit "aus" starten
+    snapshot = DeviceSnapshot(hass, entry.entry_id)
+    await snapshot.async_load()
+    plans = _compile_plans(entry)
+
+    coordinator = TPLinkVlanCoordinator(hass, entry, broker, snapshot=snapshot, scheduler=scheduler)
+    port_coordinator = TPLinkPortStatsCoordinator(hass, entry, broker, scheduler=scheduler)
+
+    @callback
+    def _breaker_changed() -> None:
+        """Mark coordinator entities unavailable at once, poll again once the switch is back."""
+        for c in (coordinator, port_coordinator):
+            if broker.breaker.available:
+                hass.async_create_task(c.async_request_refresh())
+            else:
+                c.async_set_update_error(TPLinkUnavailable(f"{entry.data[CONF_IP]} is unreachable"))
+
+    entry.async_on_unload(broker.breaker.add_listener(_breaker_changed))
+
+    @callback
+    def _profile_applied(name: str, phase) -> None:
+        if name in plans:
+            snapshot.async_record_apply(name, phase)
+
+    before_batch = None
+    if options.get(CONF_BACKUP_BEFORE_APPLY):
+        backups: BackupStore = hass.data[DOMAIN][DATA_BACKUPS]
+        retention = options.get(CONF_BACKUP_RETENTION, DEFAULT_BACKUP_RETENTION)
+
+        async def before_batch(connector: AsyncTPLinkConnector) -> None:
+            await backups.async_backup_connector(entry.entry_id, connector, "before apply", retention)
+
+    queue = DeviceCommandQueue(
+        hass, broker, options.get(CONF_DEBOUNCE, DEFAULT_DEBOUNCE), _profile_applied, before_batch
+    )
+    # Zuletzt angewendete Phasen überleben den Neustart (Wiederherstellung nach Reboot)
+    queue.desired.update((name, phase) for name, phase in snapshot.desired.items() if name in plans)
+
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        DATA_CONFIG: entry.data,
+        DATA_BROKER: broker,
+        DATA_COORDINATOR: coordinator,
+        DATA_PLANS: plans,
+        DATA_METRICS: metrics,
+        DATA_PORT_COORDINATOR: port_coordinator,
+        DATA_QUEUE: queue,
+        DATA_SNAPSHOT: snapshot,
+        DATA_RECORDER: recorder,
+    }
 
     async def _update_listener(hass: HomeAssistant, updated_entry: ConfigEntry):
-        """Reload when config entry options change."""
-        await hass.config_entries.async_reload(updated_entry.entry_id)
+        """
+        Apply option changes (system_info updates only touch data).
 
-    # async def _update_listener(hass: HomeAssistant, updated_entry: ConfigEntry):
-    #     """Reload when config entry options change."""
-    #     # Trigger the platform to setup again
-    #     for platform in PLATFORMS:
-    #         hass.async_create_task(
-    #             hass.config_entries.async_forward_entry_setup(updated_entry, platform)
-    #         )
+        Profile and group changes update the switch entities in place; everything else
+        (timeouts, debounce, backups, recording) needs a reload.
+        """
+        new_options = dict(updated_entry.options)
+        changed = {key for key in options.keys() | new_options.keys() if options.get(key) != new_options.get(key)}
+        if not changed:
+            return
+        manager = hass.data[DOMAIN][entry.entry_id].get(DATA_SWITCH_MANAGER)
+        if manager is None or not changed <= {CONF_SWITCHES, CONF_GROUPS}:
+            await hass.config_entries.async_reload(updated_entry.entry_id)
+            return
+
+        options.clear()
+        options.update(new_options)
+        new_plans = _compile_plans(updated_entry)
+        removed = plans.keys() - new_plans.keys()
+        for name in removed:
+            queue.desired.pop(name, None)
+        snapshot.async_forget(removed)
+        # In place, queue callbacks, reboot restore and services hold this dict
+        plans.clear()
+        plans.update(new_plans)
+        manager.async_update(plans, new_options.get(CONF_GROUPS, {}))
+        _LOGGER.debug("[%s] Profile aktualisiert ohne Reload (%s)", entry.entry_id, ", ".join(sorted(changed)))
 
     # register listener for options updates
     entry.async_on_unload(entry.add_update_listener(_update_listener))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_create_background_task(
+        hass,
+        _async_startup_refresh(hass, entry, broker, [coordinator, port_coordinator]),
+        f"{DOMAIN} startup refresh {entry.data[CONF_IP]}",
+    )
+    # Gruppen anderer Einträge mit diesem Switch als Mitglied
+    async_dispatcher_send(hass, SIGNAL_ENTRIES_CHANGED)
     return True
 
 
@@ -32,5 +225,19 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        async_dispatcher_send(hass, SIGNAL_ENTRIES_CHANGED)
+        await data[DATA_QUEUE].async_shutdown()
+        await data[DATA_BROKER].async_close()
+        await data[DATA_SNAPSHOT].async_flush()
+        if data[DATA_RECORDER] is not None:
+            await data[DATA_RECORDER].async_close()
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the stored snapshot and config backups of a removed entry."""
+    await DeviceSnapshot(hass, entry.entry_id).async_remove()
+    backups = hass.data.get(DOMAIN, {}).get(DATA_BACKUPS)
+    if backups is not None:
+        await backups.async_remove_entry(entry.entry_id)
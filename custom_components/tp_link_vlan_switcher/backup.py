@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import IO, Any, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, BACKUP_DIR, DEFAULT_BACKUP_RETENTION
+from .session_broker import TPLinkSessionBroker
+from .tp_link_connector import AsyncTPLinkConnector, TPLinkError
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Shortest hash prefix accepted when selecting a backup
+MIN_PREFIX = 6
+
+
+@dataclass(frozen=True, slots=True)
+class BackupRecord:
+    """One stored config backup of a switch."""
+
+    sha256: str
+    size: int
+    created: str
+    reason: str
+
+
+class BackupError(TPLinkError):
+    """A backup could not be taken or selected."""
+
+
+class _HashingFile:
+    """Temporary file in the backup directory, hashed while chunks are written to it."""
+
+    def __init__(self, hass: HomeAssistant, directory: str):
+        self._hass = hass
+        self._dir = directory
+        self._fh: Optional[IO[bytes]] = None
+        self._digest = hashlib.sha256()
+
+    async def __aenter__(self) -> "_HashingFile":
+        self._fh = await self._hass.async_add_executor_job(self._open)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._hass.async_add_executor_job(self._discard)
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    async def write(self, chunk: bytes) -> None:
+        self._digest.update(chunk)
+        await self._hass.async_add_executor_job(self._fh.write, chunk)
+
+    def commit(self, path: str) -> bool:
+        """Move the file to path unless an identical object exists; True if it was stored (executor)."""
+        self._fh.close()
+        if os.path.exists(path):
+            return False
+        os.replace(self._fh.name, path)
+        return True
+
+    def _open(self) -> IO[bytes]:
+        os.makedirs(self._dir, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self._dir, prefix=".download-", delete=False)
+
+    def _discard(self) -> None:
+        self._fh.close()
+        if os.path.exists(self._fh.name):
+            os.remove(self._fh.name)
+
+
+class BackupStore:
+    """
+    Content-addressed config backups of all switches.
+
+    Backup files are streamed to .storage/tp_link_vlan_switcher_backups/<sha256>.cfg, so
+    identical configs (of one or several switches) are stored once. A Store keeps the list
+    of backups per entry; retention drops the oldest records and deletes files nobody
+    references anymore.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._dir = hass.config.path(".storage", BACKUP_DIR)
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.backups")
+        self._records: dict[str, list[BackupRecord]] = {}
+        self._lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load() or {}
+        for entry_id, records in data.get("entries", {}).items():
+            try:
+                self._records[entry_id] = [BackupRecord(**r) for r in records]
+            except TypeError as e:
+                _LOGGER.warning("Ignoring unreadable backup index of %s: %s", entry_id, e)
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self._dir, f"{sha256}.cfg")
+
+    def backups(self, entry_id: str) -> list[BackupRecord]:
+        """Backups of an entry, newest last."""
+        return list(self._records.get(entry_id, ()))
+
+    def latest(self, entry_id: str) -> Optional[BackupRecord]:
+        records = self._records.get(entry_id)
+        return records[-1] if records else None
+
+    def find(self, entry_id: str, selector: Optional[str]) -> BackupRecord:
+        """Backup by hash or unique hash prefix, the latest one without selector."""
+        records = self._records.get(entry_id) or []
+        if not selector:
+            if not records:
+                raise BackupError("No backup stored for this switch")
+            return records[-1]
+        selector = selector.lower()
+        if len(selector) < MIN_PREFIX:
+            raise BackupError(f"Backup hash '{selector}' is too short (at least {MIN_PREFIX} characters)")
+        matches = {r.sha256: r for r in records if r.sha256.startswith(selector)}
+        if len(matches) != 1:
+            raise BackupError(f"Backup '{selector}' matches {len(matches)} backups of this switch")
+        return next(iter(matches.values()))
+
+    # ---------------------- Backup ----------------------
+    async def async_backup(self, entry_id: str, broker: TPLinkSessionBroker, reason: str,
+                           retention: int = DEFAULT_BACKUP_RETENTION, keep: Optional[str] = None) -> BackupRecord:
+        """Download the config of a switch in its own broker session."""
+        return await broker.async_run(
+            lambda connector: self.async_backup_connector(entry_id, connector, reason, retention, keep)
+        )
+
+    async def async_backup_connector(self, entry_id: str, connector: AsyncTPLinkConnector, reason: str,
+                                     retention: int = DEFAULT_BACKUP_RETENTION,
+                                     keep: Optional[str] = None) -> BackupRecord:
+        """
+        Download the config on an already logged-in connector.
+
+        If the hash equals the latest backup of the entry, nothing new is recorded. The
+        backup with hash `keep` survives the retention (the one about to be restored).
+        """
+        async with _HashingFile(self._hass, self._dir) as tmp:
+            size = await connector.download_config(tmp.write)
+            sha256 = tmp.sha256
+
+            latest = self.latest(entry_id)
+            if latest is not None and latest.sha256 == sha256:
+                _LOGGER.debug("Config of %s unchanged since the backup of %s", connector.ip, latest.created)
+                return latest
+
+            # Ablegen, Index und Aufräumen dürfen sich zwischen Einträgen nicht überholen
+            async with self._lock:
+                stored = await self._hass.async_add_executor_job(tmp.commit, self.path(sha256))
+                record = BackupRecord(sha256=sha256, size=size, created=dt_util.utcnow().isoformat(),
+                                      reason=reason)
+                records = self._records.setdefault(entry_id, [])
+                records[:] = [r for r in records if r.sha256 != sha256] + [record]
+                excess = len(records) - retention if retention > 0 else 0
+                if excess > 0:
+                    # Die ältesten zuerst verwerfen, das Backup `keep` bleibt in jedem Fall
+                    kept = []
+                    for r in records:
+                        if excess > 0 and r.sha256 != keep:
+                            excess -= 1
+                        else:
+                            kept.append(r)
+                    records[:] = kept
+                await self._async_save_and_collect()
+        _LOGGER.info("Config backup of %s: %s (%s bytes, %s)", connector.ip, sha256[:12], size,
+                     "stored" if stored else "deduplicated")
+        return record
+
+    async def async_remove_entry(self, entry_id: str) -> None:
+        async with self._lock:
+            if self._records.pop(entry_id, None) is not None:
+                await self._async_save_and_collect()
+
+    async def _async_save_and_collect(self) -> None:
+        """Persist the index and delete backup files no entry references anymore."""
+        await self._store.async_save(
+            {"entries": {eid: [asdict(r) for r in records] for eid, records in self._records.items()}}
+        )
+        referenced = {self.path(r.sha256) for records in self._records.values() for r in records}
+        await self._hass.async_add_executor_job(self._collect, referenced)
+
+    def _collect(self, referenced: set[str]) -> None:
+        if not os.path.isdir(self._dir):
+            return
+        for name in os.listdir(self._dir):
+            path = os.path.join(self._dir, name)
+            if name.endswith(".cfg") and path not in referenced:
+                os.remove(path)
+
+    # ---------------------- Restore ----------------------
+    async def async_restore(self, entry_id: str, broker: TPLinkSessionBroker, selector: Optional[str],
+                            retention: int = DEFAULT_BACKUP_RETENTION) -> bool:
+        """
+        Upload a stored backup and wait until the switch rebooted with it.
+
+        The running config is backed up first; if it already has the selected hash the
+        upload (and the reboot) is skipped.
+        """
+        record = self.find(entry_id, selector)
+        path = self.path(record.sha256)
+        if not await self._hass.async_add_executor_job(os.path.exists, path):
+            raise BackupError(f"Backup file {record.sha256[:12]} is missing")
+
+        current = await self.async_backup(entry_id, broker, "before restore", retention, keep=record.sha256)
+        if current.sha256 == record.sha256:
+            _LOGGER.info("%s already runs config %s, skipping the restore", broker.connector.ip, record.sha256[:12])
+            return True
+
+        async def _upload(connector: AsyncTPLinkConnector) -> None:
+            fh = await self._hass.async_add_executor_job(open, path, "rb")
+            try:
+                await connector.upload_config(fh)
+            finally:
+                await self._hass.async_add_executor_job(fh.close)
+
+        _LOGGER.info("Restoring config %s on %s", record.sha256[:12], broker.connector.ip)
+        return await broker.async_reboot(trigger=_upload)
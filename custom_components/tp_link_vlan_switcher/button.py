@@ -1,6 +1,11 @@
+import asyncio
 import logging
+
+import aiohttp
 from homeassistant.components.button import ButtonEntity
 from .entity_base import TPLinkSmartSwitchBaseEntity
+from .reboot import async_reboot_and_restore
+from .tp_link_connector import TPLinkError
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,10 +32,19 @@ class RebootButton(TPLinkSmartSwitchBaseEntity, ButtonEntity):
         return f"{self._ip}_reboot"
 
     async def async_press(self) -> None:
-        """Send reboot command to the switch."""
-        ip = self._ip
-        _LOGGER.debug("Reboot command sent to %s", ip)
-        # TODO: Implementiere echten HTTP-Request
+        """Reboot the switch; waiting and restoring the profiles runs in the background."""
+        _LOGGER.debug("Reboot command sent to %s", self._ip)
+        self._config_entry.async_create_background_task(
+            self.hass, self._async_reboot(), f"tp_link_vlan_switcher reboot {self._ip}"
+        )
+
+    async def _async_reboot(self) -> None:
+        try:
+            await async_reboot_and_restore(self.hass, self._config_entry.entry_id)
+        except (TPLinkError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _LOGGER.error("Reboot of %s failed: %s", self._ip, e)
+        except Exception as e:
+            _LOGGER.exception("Unexpected error during reboot of %s: %s", self._ip, e)
 
 
 class ResetButton(TPLinkSmartSwitchBaseEntity, ButtonEntity):
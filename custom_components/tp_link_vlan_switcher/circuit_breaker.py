@@ -0,0 +1,110 @@
+import time
+from typing import Callable
+
+from .const import BREAKER_THRESHOLD, BREAKER_BACKOFF, BREAKER_MAX_BACKOFF
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+STATE_MAINTENANCE = "maintenance"
+
+
+class CircuitBreaker:
+    """
+    Health of one switch.
+
+    Opens after `threshold` consecutive connection failures. While open, commands are
+    rejected immediately; after the backoff one probe may run (half-open). A failed probe
+    doubles the backoff up to `max_backoff`, a successful one closes the breaker again.
+    During maintenance (e.g. a reboot) the switch is unavailable until resume().
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD,
+                 backoff: float = BREAKER_BACKOFF, max_backoff: float = BREAKER_MAX_BACKOFF):
+        self._threshold = threshold
+        self._base_backoff = backoff
+        self._max_backoff = max_backoff
+        self._backoff = backoff
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._next_probe = 0.0
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def available(self) -> bool:
+        return self._state == STATE_CLOSED
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the next half-open probe is due."""
+        return max(0.0, self._next_probe - time.monotonic())
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener on every open/close; returns a remove function."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    # ---------------------- Transitions ----------------------
+    def try_probe(self) -> bool:
+        """Move from open to half-open if the backoff elapsed; True if the caller may probe."""
+        if self._state == STATE_OPEN and time.monotonic() >= self._next_probe:
+            self._state = STATE_HALF_OPEN
+            return True
+        return False
+
+    def suspend(self) -> None:
+        """Enter maintenance: unavailable, no probes, failures are ignored."""
+        self._state = STATE_MAINTENANCE
+        self._notify()
+
+    def resume(self) -> None:
+        """Leave maintenance with a clean failure count."""
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._backoff = self._base_backoff
+        self._notify()
+
+    def trip(self) -> None:
+        """Open at once, e.g. when a rebooted switch did not come back."""
+        self._open()
+        self._notify()
+
+    def record_success(self) -> bool:
+        """Reset the failure count; True if this closed the breaker."""
+        self._failures = 0
+        if self._state in (STATE_CLOSED, STATE_MAINTENANCE):
+            return False
+        self._state = STATE_CLOSED
+        self._backoff = self._base_backoff
+        self._notify()
+        return True
+
+    def record_failure(self) -> bool:
+        """Count a connection failure; True if this opened the breaker."""
+        if self._state == STATE_MAINTENANCE:
+            return False
+        self._failures += 1
+        if self._state == STATE_HALF_OPEN:
+            self._backoff = min(self._backoff * 2, self._max_backoff)
+            self._open()
+        elif self._state == STATE_CLOSED and self._failures >= self._threshold:
+            self._open()
+            self._notify()
+            return True
+        return False
+
+    def _open(self) -> None:
+        self._state = STATE_OPEN
+        self._next_probe = time.monotonic() + self._backoff
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
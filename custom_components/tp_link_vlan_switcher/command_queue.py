@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+
+from .const import DEFAULT_DEBOUNCE, DEBOUNCE_MAX_DELAY
+from .profile_plan import ProfilePlan
+from .session_broker import TPLinkSessionBroker
+from .tp_link_connector import AsyncTPLinkConnector, Phase, TPLinkSessionExpired
+
+_LOGGER = logging.getLogger(__name__)
+
+Members = tuple[tuple[str, Phase], ...]
+
+
+class _PendingCommand:
+    """Latest desired phase of one profile plus everyone waiting for it."""
+
+    __slots__ = ("plan", "phase", "members", "waiters")
+
+    def __init__(self, plan: ProfilePlan, phase: Phase, members: Optional[Members] = None):
+        self.plan = plan
+        self.phase = phase
+        # Profile phases a merged plan (scene) stands for, None for a plain profile
+        self.members = members
+        self.waiters: list[tuple[Phase, asyncio.Future]] = []
+
+    def applied(self) -> Members:
+        """(profile, phase) pairs to record once the command succeeded."""
+        return self.members if self.members is not None else ((self.plan.name, self.phase),)
+
+
+class DeviceCommandQueue:
+    """
+    Serializes profile applies of one switch.
+
+    Commands are debounced (sliding window, capped at DEBOUNCE_MAX_DELAY), coalesced so that
+    only the latest desired phase per profile runs, and executed back to back on one session.
+    """
+
+    def __init__(self, hass: HomeAssistant, broker: TPLinkSessionBroker,
+                 debounce: float = DEFAULT_DEBOUNCE,
+                 on_applied: Optional[Callable[[str, Phase], None]] = None,
+                 before_batch: Optional[Callable[[AsyncTPLinkConnector], Awaitable[None]]] = None):
+        self._hass = hass
+        self._broker = broker
+        self._debounce = debounce
+        self._on_applied = on_applied
+        # Runs once per batch in the same session before the first write (e.g. config backup)
+        self._before_batch = before_batch
+        self._pending: dict[str, _PendingCommand] = {}
+        self._last_submit = 0.0
+        self._worker: Optional[asyncio.Task] = None
+        # Last phase requested per profile, re-applied after a reboot
+        self.desired: dict[str, Phase] = {}
+
+    async def async_submit(self, plan: ProfilePlan, phase: Phase, members: Optional[Members] = None) -> bool:
+        """
+        Queue a profile phase; True once exactly this phase was applied successfully.
+
+        A merged plan passes the profile phases it consists of as members; those (not the
+        merged plan) become desired and are reported applied, and only after success.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        if members is None:
+            self.desired[plan.name] = phase
+        cmd = self._pending.get(plan.name)
+        if cmd is None:
+            cmd = self._pending[plan.name] = _PendingCommand(plan, phase, members)
+        else:
+            _LOGGER.debug("Coalescing %s: %s -> %s", plan.name, cmd.phase, phase)
+            cmd.plan, cmd.phase, cmd.members = plan, phase, members
+        cmd.waiters.append((phase, future))
+        self._last_submit = loop.time()
+
+        if self._worker is None or self._worker.done():
+            self._worker = self._hass.async_create_background_task(
+                self._async_worker(), f"tp_link_vlan_switcher queue {self._broker.connector.ip}"
+            )
+        return await future
+
+    async def async_shutdown(self) -> None:
+        """Stop the worker and fail everything still pending."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for cmd in self._pending.values():
+            for _, future in cmd.waiters:
+                if not future.done():
+                    future.set_result(False)
+        self._pending.clear()
+
+    # ---------------------- Worker ----------------------
+    async def _async_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            started = loop.time()
+            while True:
+                wait = min(self._last_submit + self._debounce, started + DEBOUNCE_MAX_DELAY) - loop.time()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            batch, self._pending = self._pending, {}
+            results = await self._async_run_batch(batch)
+
+            for name, cmd in batch.items():
+                ok = results.get(name, False)
+                if ok:
+                    for profile, phase in cmd.applied():
+                        if cmd.members is not None:
+                            self.desired[profile] = phase
+                        if self._on_applied is not None:
+                            self._on_applied(profile, phase)
+                for phase, future in cmd.waiters:
+                    if not future.done():
+                        # Superseded phases were never applied
+                        future.set_result(ok and phase == cmd.phase)
+
+    async def _async_run_batch(self, batch: dict[str, _PendingCommand]) -> dict[str, bool]:
+        results: dict[str, bool] = {}
+        prepared = self._before_batch is None
+
+        async def _run(connector: AsyncTPLinkConnector) -> None:
+            nonlocal prepared
+            if not prepared:
+                # Schlägt das fehl, wird nichts geschrieben
+                await self._before_batch(connector)
+                prepared = True
+            for name, cmd in batch.items():
+                if name in results:
+                    # already done before a session expiry re-run
+                    continue
+                start = time.monotonic()
+                try:
+                    results[name] = await connector.execute_plan(cmd.plan.phase(cmd.phase), diff=True)
+                    connector.metrics.record_apply(name, time.monotonic() - start)
+                except (TPLinkSessionExpired, aiohttp.ClientError, asyncio.TimeoutError):
+                    # Connection errors abort the batch and count towards the circuit breaker
+                    raise
+                except Exception as e:
+                    _LOGGER.error("Fehler beim Anwenden des Profils %s/%s auf %s: %s",
+                                  name, cmd.phase, connector.ip, e)
+                    results[name] = False
+
+        try:
+            await self._broker.async_run(_run)
+        except Exception as e:
+            _LOGGER.error("Queued profiles on %s could not be applied: %s", self._broker.connector.ip, e)
+        return results
@@ -1,18 +1,20 @@
-import re
+import asyncio
 import logging
-import requests
+import aiohttp
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import DOMAIN, CONF_IP, CONF_USERNAME, CONF_PASSWORD, CONF_PORTS, CONF_DEVICE
-from .utils import extract_js_object_field
+from .const import (
+    DOMAIN, CONF_IP, CONF_USERNAME, CONF_PASSWORD, CONF_PORTS, CONF_DEVICE,
+    CONF_NETWORK, DEFAULT_DISCOVERY_NETWORK, DATA_DISCOVERY, CONF_RECORD_HTTP,
+)
+from .discovery import DiscoveredSwitch, DiscoveryCache, async_discover, discovery_hosts
+from .recorder import HttpRecorder, trace_path
+from .tp_link_connector import AsyncTPLinkConnector
 
 _LOGGER = logging.getLogger(__name__)
 
-LOGIN_PATTERN = re.compile(
-    r"var\s+logonInfo\s*=\s*new\s+Array\s*\(\s*(\d+)\s*,", re.IGNORECASE
-)
-
 # Map TP-Link errType -> HA error bucket
 ERR_INVALID_AUTH = {1, 2, 6}   # falsche Zugangsdaten
 ERR_CANNOT_CONNECT = {3, 4, 5} # Session voll / nicht erreichbar
@@ -21,108 +23,179 @@ ERR_CANNOT_CONNECT = {3, 4, 5} # Session voll / nicht erreichbar
 class VlanSwitchConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle config flow for TP-Link VLAN Switcher."""
 
+    def __init__(self):
+        self._discovered: dict[str, DiscoveredSwitch] = {}
+        self._record_http = False
+
     async def async_step_user(self, user_input=None):
+        """Choose between network discovery and manual entry."""
+        if user_input is not None:
+            if user_input["action"] == "discovery":
+                return await self.async_step_discovery()
+            return await self.async_step_manual()
+
+        schema = vol.Schema({
+            vol.Required("action", default="discovery"): vol.In({
+                "discovery": "Switches im Netzwerk suchen",
+                "manual": "IP-Adresse manuell eingeben",
+            })
+        })
+        return self.async_show_form(step_id="user", data_schema=schema)
+
+    # -------------------------------
+    # DISCOVERY
+    # -------------------------------
+    async def async_step_discovery(self, user_input=None):
+        """Sweep a network for Easy Smart switches."""
         errors = {}
+        network = DEFAULT_DISCOVERY_NETWORK
 
         if user_input is not None:
-            ip = user_input[CONF_IP].strip()
-            username = user_input[CONF_USERNAME].strip()
-            password = user_input[CONF_PASSWORD]
-
-            successful, error, device_info = await self.hass.async_add_executor_job(
-                self._test_login, ip, username, password
-            )
-            if successful:
-                user_input[CONF_DEVICE] = device_info
-                return self.async_create_entry(
-                    title=device_info['descriStr'], data=user_input
+            network = user_input[CONF_NETWORK].strip()
+            try:
+                discovery_hosts(network)
+            except ValueError:
+                errors[CONF_NETWORK] = "invalid_network"
+            else:
+                configured = {e.data.get(CONF_IP) for e in self._async_current_entries()}
+                cache = self.hass.data.setdefault(DOMAIN, {}).setdefault(DATA_DISCOVERY, DiscoveryCache())
+                found = await async_discover(
+                    async_get_clientsession(self.hass), network, exclude=configured, cache=cache
                 )
+                if found:
+                    self._discovered = {s.ip: s for s in found}
+                    return await self.async_step_discovery_select()
+                errors["base"] = "no_devices_found"
 
-            # error is  -> HA error key
-            errors["base"] = error
+        schema = vol.Schema({
+            vol.Required(CONF_NETWORK, description={"name": "Netzwerk (CIDR)"}, default=network): str,
+        })
+        return self.async_show_form(step_id="discovery", data_schema=schema, errors=errors)
+
+    async def async_step_discovery_select(self, user_input=None):
+        """Pick a discovered switch and enter its credentials."""
+        errors = {}
+
+        if user_input is not None:
+            errors = await self._async_validate(user_input)
+            if not errors:
+                return self._async_create_entry(user_input)
+
+        first = next(iter(self._discovered.values()))
+        data_schema = vol.Schema({
+            vol.Required(CONF_IP, description={"name": "Switch"}, default=first.ip): vol.In(
+                {ip: s.label for ip, s in self._discovered.items()}
+            ),
+            vol.Required(CONF_USERNAME, description={"name": "Benutzername"}): str,
+            vol.Required(CONF_PASSWORD, description={"name": "Passwort"}): str,
+            vol.Required(CONF_PORTS, description={"name": "Anzahl Ports"},
+                         default=first.port_count or 5): int,
+            vol.Optional(CONF_RECORD_HTTP, description={"name": "HTTP-Verkehr aufzeichnen"},
+                         default=False): bool,
+        })
+        return self.async_show_form(
+            step_id="discovery_select", data_schema=data_schema, errors=errors
+        )
+
+    # -------------------------------
+    # MANUAL
+    # -------------------------------
+    async def async_step_manual(self, user_input=None):
+        errors = {}
+
+        if user_input is not None:
+            errors = await self._async_validate(user_input)
+            if not errors:
+                return self._async_create_entry(user_input)
 
         data_schema = vol.Schema({
             vol.Required(CONF_IP, description={"name": "IP-Adresse"}): str,
             vol.Required(CONF_USERNAME, description={"name": "Benutzername"}): str,
             vol.Required(CONF_PASSWORD, description={"name": "Passwort"}): str,
             vol.Required(CONF_PORTS, description={"name": "Anzahl Ports"}, default=5): int,
+            vol.Optional(CONF_RECORD_HTTP, description={"name": "HTTP-Verkehr aufzeichnen"},
+                         default=False): bool,
         })
 
         return self.async_show_form(
-            step_id="user", data_schema=data_schema, errors=errors
+            step_id="manual", data_schema=data_schema, errors=errors
         )
 
-    def _test_login(self, ip: str, username: str, password: str):
-        """Do a blocking login test and parse TP-Link logonInfo array."""
+    def _async_create_entry(self, user_input):
+        # Aufzeichnung ist eine Option, sie läuft nach der Einrichtung weiter
+        options = {CONF_RECORD_HTTP: True} if self._record_http else {}
+        return self.async_create_entry(title=user_input[CONF_DEVICE]["descriStr"], data=user_input,
+                                       options=options)
+
+    async def _async_validate(self, user_input) -> dict:
+        """Test the login; on success store the device info in user_input."""
+        ip = user_input[CONF_IP].strip()
+        username = user_input[CONF_USERNAME].strip()
+        password = user_input[CONF_PASSWORD]
+        self._record_http = user_input.pop(CONF_RECORD_HTTP, False)
+
+        successful, error, device_info = await self._test_login(ip, username, password, self._record_http)
+        if not successful:
+            # error is  -> HA error key
+            return {"base": error}
+        user_input[CONF_DEVICE] = device_info
+        return {}
+
+    async def _test_login(self, ip: str, username: str, password: str, record: bool = False):
+        """Do a login test and parse TP-Link logonInfo array (optionally recording the HTTP trace)."""
+        recorder = None
+        if record:
+            recorder = HttpRecorder(trace_path(self.hass, ip, "config_flow"), ip, secrets=(username, password),
+                                    hass=self.hass)
+            _LOGGER.info("Recording the login test of %s to %s", ip, recorder.path)
+        connector = AsyncTPLinkConnector(async_get_clientsession(self.hass), ip, username, password,
+                                         recorder=recorder)
         try:
-            with requests.Session() as s:
-                # 1. Login
-                url = f"http://{ip}/logon.cgi"
-                payload = {
-                    "username": username,
-                    "password": password,
-                    "cpassword": "",
-                    "logon": "Login",
-                }
-                resp = s.post(url, data=payload, timeout=8)
-                if resp.status_code != 200:
-                    _LOGGER.debug("Login HTTP status != 200: %s", resp.status_code)
-                    return False, "cannot_connect", None
-
-                # Parse errType from embedded JS
-                m = LOGIN_PATTERN.search(resp.text)
-                if not m:
-                    _LOGGER.debug("logonInfo array not found in response")
-                    return False, "cannot_connect", None
-
-                err_type = int(m.group(1))
-                _LOGGER.debug("Parsed errType=%s from login page", err_type)
-
-                if err_type in ERR_INVALID_AUTH:
-                    return False, "invalid_auth", None
-
-                if err_type in ERR_CANNOT_CONNECT:
-                    return False, "cannot_connect", None
-
-                if err_type != 0:
-                    return False, "unknown", None
-
-                # 2. Get device info
-                device_info = self._get_device_info(s, ip)
-
-                # 3. Logout
-                try:
-                    s.get(f"http://{ip}/Logout.htm", timeout=5)
-                except Exception:
-                    pass
-
-                if not device_info:
-                    return False, "cannot_connect", None
-
-                return True, None, device_info
-
-        except requests.exceptions.RequestException as e:
+            # 1. Login
+            err_type = await connector.logon()
+            if err_type is None:
+                return False, "cannot_connect", None
+
+            _LOGGER.debug("Parsed errType=%s from login page", err_type)
+
+            if err_type in ERR_INVALID_AUTH:
+                return False, "invalid_auth", None
+
+            if err_type in ERR_CANNOT_CONNECT:
+                return False, "cannot_connect", None
+
+            if err_type != 0:
+                return False, "unknown", None
+
+            # 2. Get device info
+            device_info = await self._get_device_info(connector)
+
+            # 3. Logout
+            await connector.logout()
+
+            if not device_info:
+                return False, "cannot_connect", None
+
+            return True, None, device_info
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             _LOGGER.error("Login test request error: %s", e)
-            return False, "cannot_connect"
+            return False, "cannot_connect", None
         except Exception as e:
             _LOGGER.exception("Unexpected error during login test: %s", e)
-            return False, "unknown"
+            return False, "unknown", None
+        finally:
+            if recorder is not None:
+                await recorder.async_close()
 
     @staticmethod
-    def _get_device_info(s, ip):
+    async def _get_device_info(connector: AsyncTPLinkConnector):
         try:
-            resp_system_info = s.get(f"http://{ip}/SystemInfoRpm.htm")
+            return await connector.get_device_info()
         except Exception as e:
             _LOGGER.exception("Unexpected error during system info request: %s", e)
             return None
 
-        if resp_system_info.status_code != 200:
-            _LOGGER.warning("Unable to get device info, Status code: %s", resp_system_info.status_code)
-            return None
-
-        # Parse html
-        return extract_js_object_field(resp_system_info.text, "info_ds")
-
     @staticmethod
     def async_get_options_flow(config_entry):
         """Bind options flow."""
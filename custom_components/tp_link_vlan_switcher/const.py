@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 DOMAIN = "tp_link_vlan_switcher"
 CONF_IP = "ip_address"
 CONF_USERNAME = "username"
@@ -5,14 +7,122 @@ CONF_PASSWORD = "password"
 # TODO: Implement this
 CONF_DEVICE = "system_info"
 CONF_PORTS = "port_count"
+CONF_NETWORK = "network"
 
-PLATFORMS = ["button", "switch"]
+PLATFORMS = ["button", "select", "sensor", "switch"]
 
 CONF_VLANS = "vlans"
 
+# Options keys
+CONF_SWITCHES = "switches"
+CONF_GROUPS = "groups"
+CONF_DEBOUNCE = "debounce"
+CONF_TIMEOUT_MIN = "timeout_min"
+CONF_TIMEOUT_MAX = "timeout_max"
+CONF_APPLY_DEADLINE = "apply_deadline"
+CONF_BACKUP_BEFORE_APPLY = "backup_before_apply"
+CONF_BACKUP_RETENTION = "backup_retention"
+CONF_RECORD_HTTP = "record_http"
+
+# Group profile keys
+CONF_MEMBERS = "members"
+CONF_PROFILE = "profile"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+DEFAULT_GROUP_CONCURRENCY = 4
+
+# Service names and fields
+SERVICE_APPLY_SCENE = "apply_scene"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_PROFILES = "profiles"
+ATTR_PHASE = "phase"
+SERVICE_BACKUP_CONFIG = "backup_config"
+SERVICE_RESTORE_CONFIG = "restore_config"
+SERVICE_LIST_BACKUPS = "list_backups"
+ATTR_BACKUP = "backup"
+
 # VLAN keys
 CONF_VID = "vid"
 CONF_VNAME = "vname"
 CONF_VLAN = "vlan"
 CONF_PVID_PORT = "pvid_port"
 CONF_PVID = "pvid"
+
+# hass.data[DOMAIN][entry_id] keys
+DATA_CONFIG = "config"
+DATA_BROKER = "broker"
+DATA_COORDINATOR = "coordinator"
+DATA_PLANS = "plans"
+DATA_QUEUE = "queue"
+DATA_METRICS = "metrics"
+DATA_PORT_COORDINATOR = "port_coordinator"
+DATA_SNAPSHOT = "snapshot"
+DATA_RECORDER = "recorder"
+DATA_SWITCH_MANAGER = "switch_manager"
+# (system_info it was built from, DeviceInfo)
+DATA_DEVICE_INFO = "device_info"
+
+# hass.data[DOMAIN] key of the discovery cache shared by config flows
+DATA_DISCOVERY = "discovery"
+# hass.data[DOMAIN] key of the config backup store shared by all entries
+DATA_BACKUPS = "backups"
+# hass.data[DOMAIN] key of the fleet-wide poll scheduler
+DATA_SCHEDULER = "scheduler"
+
+# Dispatcher signal sent whenever an entry was set up or unloaded (group members)
+SIGNAL_ENTRIES_CHANGED = f"{DOMAIN}_entries_changed"
+
+# Seconds an unused web session stays logged in
+DEFAULT_SESSION_IDLE_TIMEOUT = 60
+
+# Poll interval of the VLAN/PVID status read-back
+DEFAULT_SCAN_INTERVAL = timedelta(seconds=30)
+
+# Fleet scheduler: HTTP requests in flight over all switches, jitter as fraction of the
+# slot spacing, largest interval factor, seconds after which a poll counts as slow
+FLEET_MAX_REQUESTS = 4
+FLEET_JITTER = 0.1
+FLEET_MAX_BACKOFF = 4.0
+FLEET_SLOW_POLL = 5.0
+
+# Seconds to collect toggles before a queued apply runs, and the upper bound of that wait
+DEFAULT_DEBOUNCE = 0.3
+DEBOUNCE_MAX_DELAY = 2.0
+
+# Adaptive request timeouts in seconds: bounds of the RTT based read timeout, the total
+# timeout (connect included) before anything was measured, bounds of the connect timeout
+DEFAULT_TIMEOUT_MIN = 1.0
+DEFAULT_TIMEOUT_MAX = 15.0
+INITIAL_TIMEOUT = 8.0
+CONNECT_TIMEOUT_MIN = 0.5
+CONNECT_TIMEOUT_MAX = 5.0
+# Upper bound for one profile apply (snapshot and writes, rollback not included)
+DEFAULT_APPLY_DEADLINE = 30.0
+
+# Circuit breaker: consecutive connection failures until open, probe backoff in seconds
+BREAKER_THRESHOLD = 3
+BREAKER_BACKOFF = 5.0
+BREAKER_MAX_BACKOFF = 300.0
+
+# Reboot: seconds the switch gets to go down (checked every REBOOT_DOWN_POLL), readiness
+# poll backoff bounds, give up after
+REBOOT_INITIAL_DELAY = 10.0
+REBOOT_DOWN_POLL = 0.5
+REBOOT_POLL_MIN = 1.0
+REBOOT_POLL_MAX = 15.0
+REBOOT_TIMEOUT = 180.0
+
+# Seconds snapshot writes are delayed and coalesced
+SNAPSHOT_SAVE_DELAY = 10
+
+# Config backups: kept per switch, directory below .storage, download/upload chunk size
+DEFAULT_BACKUP_RETENTION = 10
+BACKUP_DIR = "tp_link_vlan_switcher_backups"
+BACKUP_CHUNK_SIZE = 64 * 1024
+
+# HTTP traces for offline tests: directory below .storage, exchanges per file, buffered lines
+TRACE_DIR = "tp_link_vlan_switcher_traces"
+TRACE_MAX_EXCHANGES = 20000
+TRACE_FLUSH_LINES = 100
+
+# Default network of the discovery step (factory IP of Easy Smart switches is 192.168.0.1)
+DEFAULT_DISCOVERY_NETWORK = "192.168.0.0/24"
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+import aiohttp
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import DOMAIN, CONF_IP, CONF_PORTS, DEFAULT_SCAN_INTERVAL
+from .models import PortCounters, PortVlanMatrix, SwitchVlanState
+from .scheduler import FleetScheduler, ScheduledPollMixin
+from .session_broker import TPLinkSessionBroker
+from .snapshot import DeviceSnapshot
+from .tp_link_connector import TPLinkError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TPLinkVlanCoordinator(ScheduledPollMixin, DataUpdateCoordinator[SwitchVlanState]):
+    """Polls the VLAN and PVID tables of one switch once per interval for all entities."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, broker: TPLinkSessionBroker,
+                 update_interval: timedelta = DEFAULT_SCAN_INTERVAL,
+                 snapshot: Optional[DeviceSnapshot] = None,
+                 scheduler: Optional[FleetScheduler] = None):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {entry.data[CONF_IP]}",
+            # Mit Scheduler bestimmt der die Pollzeiten (ScheduledPollMixin)
+            update_interval=None if scheduler is not None else update_interval,
+            # Unveränderte Tabellen (meist dasselbe Objekt aus dem Parse-Cache) lösen keine Updates aus
+            always_update=False,
+        )
+        self._broker = broker
+        self._snapshot = snapshot
+        self._reconciled = snapshot is None
+        self._matrix: Optional[tuple[SwitchVlanState, PortVlanMatrix]] = None
+        if snapshot is not None and snapshot.state is not None:
+            # Letzter bekannter Stand bis zum ersten Poll
+            self.data = snapshot.state
+        self._init_schedule(scheduler)
+
+    @property
+    def matrix(self) -> Optional[PortVlanMatrix]:
+        """Membership matrix of the current table, built once per table for all port entities."""
+        state = self.data
+        if state is None:
+            return None
+        if self._matrix is None or self._matrix[0] is not state:
+            self._matrix = (state, PortVlanMatrix.from_state(state))
+        return self._matrix[1]
+
+    def async_set_updated_data(self, data: SwitchVlanState) -> None:
+        # Eigene Änderung: wieder im Grundintervall pollen
+        self.reset_backoff()
+        super().async_set_updated_data(data)
+
+    async def _async_update_data(self) -> SwitchVlanState:
+        start = time.monotonic()
+        try:
+            state = await self._broker.async_run(lambda connector: connector.get_vlan_state())
+        except (TPLinkError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise UpdateFailed(f"Error reading VLAN tables from {self._broker.connector.ip}: {err}") from err
+        self._record_poll(time.monotonic() - start, state != self.data)
+
+        if self._snapshot is not None:
+            if not self._reconciled:
+                self._reconciled = True
+                self._log_drift(self._snapshot.state, state)
+            self._snapshot.async_update_state(state)
+        return state
+
+    def _log_drift(self, stored: Optional[SwitchVlanState], state: SwitchVlanState) -> None:
+        """Report changes made on the switch while Home Assistant was not running."""
+        if stored is None or stored == state:
+            return
+        vids = sorted(vid for vid in stored.vlans.keys() | state.vlans.keys()
+                      if stored.vlans.get(vid) != state.vlans.get(vid))
+        ports = [i + 1 for i, (a, b) in enumerate(zip(stored.pvids, state.pvids)) if a != b]
+        _LOGGER.info(
+            "%s changed since the last snapshot (%s): VLANs %s, PVIDs of ports %s",
+            self._broker.connector.ip, self._snapshot.timestamp, vids or "-", ports or "-",
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PortStatus:
+    """Latest counters of one port plus packet rates against the previous sample."""
+
+    counters: PortCounters
+    tx_good_rate: Optional[float] = None
+    tx_bad_rate: Optional[float] = None
+    rx_good_rate: Optional[float] = None
+    rx_bad_rate: Optional[float] = None
+
+
+class TPLinkPortStatsCoordinator(ScheduledPollMixin, DataUpdateCoordinator[dict[int, PortStatus]]):
+    """Reads the port statistics page once per interval and derives per-port packet rates."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, broker: TPLinkSessionBroker,
+                 update_interval: timedelta = DEFAULT_SCAN_INTERVAL,
+                 scheduler: Optional[FleetScheduler] = None):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {entry.data[CONF_IP]} ports",
+            update_interval=None if scheduler is not None else update_interval,
+            always_update=False,
+        )
+        self._broker = broker
+        self._port_count = entry.data.get(CONF_PORTS) or 0
+        # port -> (monotonic time, counters) of the previous poll
+        self._previous: dict[int, tuple[float, PortCounters]] = {}
+        self._init_schedule(scheduler)
+
+    async def _async_update_data(self) -> dict[int, PortStatus]:
+        start = time.monotonic()
+        try:
+            counters = await self._broker.async_run(
+                lambda connector: connector.get_port_counters(self._port_count)
+            )
+        except (TPLinkError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise UpdateFailed(f"Error reading port statistics from {self._broker.connector.ip}: {err}") from err
+
+        now = time.monotonic()
+        previous = self.data or {}
+        self._record_poll(now - start, any(
+            (status := previous.get(c.port)) is None or status.counters != c for c in counters
+        ))
+        result = {}
+        for c in counters:
+            result[c.port] = self._status(now, c, self._previous.get(c.port))
+            self._previous[c.port] = (now, c)
+        return result
+
+    @staticmethod
+    def _status(now: float, cur: PortCounters,
+                previous: Optional[tuple[float, PortCounters]]) -> PortStatus:
+        if previous is None:
+            return PortStatus(cur)
+        t0, prev = previous
+        dt = now - t0
+        if dt <= 0:
+            return PortStatus(cur)
+
+        def _rate(new: int, old: int) -> Optional[float]:
+            # counters were cleared or wrapped -> no meaningful rate for this interval
+            return round((new - old) / dt, 2) if new >= old else None
+
+        return PortStatus(
+            cur,
+            tx_good_rate=_rate(cur.tx_good, prev.tx_good),
+            tx_bad_rate=_rate(cur.tx_bad, prev.tx_bad),
+            rx_good_rate=_rate(cur.rx_good, prev.rx_good),
+            rx_bad_rate=_rate(cur.rx_bad, prev.rx_bad),
+        )
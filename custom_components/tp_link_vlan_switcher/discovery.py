@@ -0,0 +1,157 @@
+import asyncio
+import ipaddress
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import aiohttp
+
+from .utils import extract_js_object_field
+
+_LOGGER = logging.getLogger(__name__)
+
+# Root page of an Easy Smart switch: login form posting to logon.cgi / logonInfo array
+LOGIN_PAGE_PATTERN = re.compile(r"logon\.cgi|var\s+logonInfo\s*=", re.IGNORECASE)
+# TL-SG105E / TL-SG108E / TL-SG116E ... -> port count from the model number
+MODEL_PORTS_PATTERN = re.compile(r"SG1(\d{2})", re.IGNORECASE)
+
+DISCOVERY_CONCURRENCY = 64
+DISCOVERY_CONNECT_TIMEOUT = 0.8
+DISCOVERY_TIMEOUT = 3.0
+# Seconds a found switch is reused by the next sweep (misses are probed again every time)
+DISCOVERY_CACHE_TTL = 300
+# Largest network a sweep accepts (/22)
+DISCOVERY_MAX_HOSTS = 1024
+
+
+@dataclass(frozen=True, slots=True)
+class DiscoveredSwitch:
+    """Easy Smart switch found on the network."""
+
+    ip: str
+    model: Optional[str] = None
+    mac: Optional[str] = None
+    firmware: Optional[str] = None
+    hardware: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        details = ", ".join(v for v in (self.mac, self.firmware) if v)
+        name = f"{self.model or 'TP-Link Easy Smart'} ({self.ip})"
+        return f"{name} – {details}" if details else name
+
+    @property
+    def port_count(self) -> Optional[int]:
+        match = MODEL_PORTS_PATTERN.search(self.hardware or self.model or "")
+        return int(match.group(1)) if match else None
+
+
+class DiscoveryCache:
+    """
+    Found switches per IP with expiry, shared by all config flows.
+
+    Misses are not kept: a switch that was off or still booting during one sweep has to
+    show up in the next one.
+    """
+
+    def __init__(self, ttl: float = DISCOVERY_CACHE_TTL):
+        self._ttl = ttl
+        self._results: Dict[str, tuple[float, DiscoveredSwitch]] = {}
+
+    def get(self, ip: str) -> tuple[bool, Optional[DiscoveredSwitch]]:
+        """Return (cached, result) for ip."""
+        entry = self._results.get(ip)
+        if entry is None or time.monotonic() - entry[0] > self._ttl:
+            return False, None
+        return True, entry[1]
+
+    def set(self, ip: str, result: Optional[DiscoveredSwitch]) -> None:
+        if result is None:
+            self._results.pop(ip, None)
+        else:
+            self._results[ip] = (time.monotonic(), result)
+
+
+def discovery_hosts(network: str) -> list[str]:
+    """Host addresses of a CIDR, ValueError if invalid or larger than DISCOVERY_MAX_HOSTS."""
+    net = ipaddress.ip_network(network.strip(), strict=False)
+    if net.version != 4 or net.num_addresses > DISCOVERY_MAX_HOSTS + 2:
+        raise ValueError(f"{network} is not an IPv4 network of at most {DISCOVERY_MAX_HOSTS} hosts")
+    return [str(ip) for ip in net.hosts()] or [str(net.network_address)]
+
+
+def _info_value(info: dict, key: str) -> Optional[str]:
+    value = info.get(key)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value) if value else None
+
+
+async def async_probe(session: aiohttp.ClientSession, ip: str,
+                      timeout: float = DISCOVERY_TIMEOUT,
+                      connect_timeout: float = DISCOVERY_CONNECT_TIMEOUT) -> Optional[DiscoveredSwitch]:
+    """Check whether ip serves the Easy Smart login page and read its system info."""
+    client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+    try:
+        async with session.get(f"http://{ip}/", timeout=client_timeout, allow_redirects=False) as resp:
+            if resp.status != 200:
+                return None
+            text = await resp.text(errors="replace")
+        if not LOGIN_PAGE_PATTERN.search(text):
+            return None
+
+        # Viele Firmwares liefern die Systeminfo auch ohne Login, sonst nur die IP anbieten
+        async with session.get(f"http://{ip}/SystemInfoRpm.htm", timeout=client_timeout) as resp:
+            text = await resp.text(errors="replace") if resp.status == 200 else ""
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+        return None
+
+    info = extract_js_object_field(text, "info_ds") if text else None
+    if not isinstance(info, dict):
+        return DiscoveredSwitch(ip)
+    return DiscoveredSwitch(
+        ip,
+        model=_info_value(info, "descriStr"),
+        mac=_info_value(info, "macStr"),
+        firmware=_info_value(info, "firmwareStr"),
+        hardware=_info_value(info, "hardwareStr"),
+    )
+
+
+async def async_discover(session: aiohttp.ClientSession, network: str,
+                         exclude: Iterable[str] = (), cache: Optional[DiscoveryCache] = None,
+                         concurrency: int = DISCOVERY_CONCURRENCY,
+                         timeout: float = DISCOVERY_TIMEOUT) -> list[DiscoveredSwitch]:
+    """Sweep a CIDR with at most `concurrency` probes in flight; skips excluded IPs."""
+    skip = set(exclude)
+    found: list[DiscoveredSwitch] = []
+    pending: list[str] = []
+    for ip in discovery_hosts(network):
+        if ip in skip:
+            continue
+        cached, result = cache.get(ip) if cache is not None else (False, None)
+        if not cached:
+            pending.append(ip)
+        elif result is not None:
+            found.append(result)
+
+    hosts = iter(pending)
+    start = time.monotonic()
+
+    async def _worker() -> None:
+        # Ein fester Pool an Workern statt einem Task pro Adresse
+        for ip in hosts:
+            result = await async_probe(session, ip, timeout)
+            if cache is not None:
+                cache.set(ip, result)
+            if result is not None:
+                found.append(result)
+
+    await asyncio.gather(*(_worker() for _ in range(max(1, min(concurrency, len(pending))))))
+    _LOGGER.debug(
+        "Discovery of %s probed %s hosts in %.2fs, found %s switches",
+        network, len(pending), time.monotonic() - start, len(found),
+    )
+    return sorted(found, key=lambda s: ipaddress.ip_address(s.ip))
@@ -1,6 +1,53 @@
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.device_registry import DeviceInfo
-from .const import DOMAIN, CONF_IP, CONF_DEVICE, CONF_USERNAME, CONF_PASSWORD
+from .circuit_breaker import CircuitBreaker
+from .const import DOMAIN, CONF_IP, CONF_DEVICE, CONF_USERNAME, CONF_PASSWORD, DATA_BROKER, DATA_DEVICE_INFO
+
+_NO_SYSTEM_INFO: Mapping[str, Any] = MappingProxyType({})
+
+
+def build_device_info(ip: str, system_info: Mapping[str, Any]) -> DeviceInfo:
+    """Build the DeviceInfo of a switch from its SystemInfoRpm.htm fields."""
+    mac = system_info.get("macStr")
+
+    # mac kann ein String oder eine Liste sein
+    if isinstance(mac, list):
+        mac_set = {("mac", m) for m in mac}
+    elif mac:
+        mac_set = {("mac", mac)}
+    else:
+        mac_set = set()
+
+    # hardwareStr z.B. "TL-SG108E 6.0" -> Modell und Hardware-Version
+    model, _, hw_version = (system_info.get("hardwareStr") or "").partition(" ")
+
+    return DeviceInfo(
+        identifiers = {(DOMAIN, ip)},
+        name = system_info.get("descriStr", f"TP-Link Smart Switch {ip}"),
+        connections = mac_set,
+        manufacturer = "TP-Link",
+        model = model or None,
+        sw_version = system_info.get("firmwareStr"),
+        hw_version = hw_version or None,
+        configuration_url=f"http://{ip}/"
+    )
+
+
+def entry_device_info(hass: HomeAssistant, config_entry) -> DeviceInfo:
+    """DeviceInfo of an entry, parsed once and rebuilt only when system_info changes."""
+    system_info = config_entry.data.get(CONF_DEVICE) or _NO_SYSTEM_INFO
+    # Liegt bei den übrigen Objekten des Eintrags und verschwindet mit ihnen beim Entladen
+    data = hass.data.get(DOMAIN, {}).get(config_entry.entry_id)
+    cached = None if data is None else data.get(DATA_DEVICE_INFO)
+    if cached is None or cached[0] is not system_info:
+        cached = (system_info, build_device_info(config_entry.data[CONF_IP], system_info))
+        if data is not None:
+            data[DATA_DEVICE_INFO] = cached
+    return cached[1]
 
 
 class TPLinkSmartSwitchBaseEntity(Entity):
@@ -12,27 +59,20 @@ class TPLinkSmartSwitchBaseEntity(Entity):
         self._user = config_entry.data.get(CONF_USERNAME)
         self._pwd = config_entry.data.get(CONF_PASSWORD)
         self._device_info = config_entry.data.get(CONF_DEVICE, {})
+        self._breaker: Optional[CircuitBreaker] = None
 
     @property
     def device_info(self):
-        mac = self._device_info.get("macStr")
-
-        # mac kann ein String oder eine Liste sein
-        if isinstance(mac, list):
-            # z.B. nur das erste Element nutzen oder alle
-            mac_set = {("mac", m) for m in mac}
-        elif mac:
-            mac_set = {("mac", mac)}
-        else:
-            mac_set = set()
-
-        return DeviceInfo(
-            identifiers = {(DOMAIN, self._ip)},
-            name = self._device_info.get("descriStr", f"TP-Link Smart Switch {self._ip}"),
-            connections = mac_set,
-            manufacturer = "TP-Link",
-            model = self._device_info.get("hardwareStr").split(" ", 1)[0],
-            sw_version = self._device_info.get("firmwareStr"),
-            hw_version = self._device_info.get("hardwareStr").split(" ", 1)[1],
-            configuration_url=f"http://{self._ip}/"
-        )
+        return entry_device_info(self.hass, self._config_entry)
+
+    @property
+    def available(self) -> bool:
+        # Alle Entitäten eines nicht erreichbaren Switches sind unavailable
+        return super().available and (self._breaker is None or self._breaker.available)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        data = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if data is not None:
+            self._breaker = data[DATA_BROKER].breaker
+            self.async_on_remove(self._breaker.add_listener(self.async_write_ha_state))
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Iterable
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_COORDINATOR, DATA_PLANS, DATA_QUEUE, DEFAULT_GROUP_CONCURRENCY
+from .tp_link_connector import Phase
+
+# Per-device results of a group apply
+RESULT_OK = "ok"
+RESULT_NOT_LOADED = "not_loaded"
+RESULT_UNKNOWN_PROFILE = "unknown_profile"
+RESULT_FAILED = "failed"
+
+
+async def _apply_member(hass: HomeAssistant, entry_id: str, profile: str, phase: Phase,
+                        semaphore: asyncio.Semaphore) -> str:
+    data = hass.data.get(DOMAIN, {}).get(entry_id)
+    if data is None:
+        return RESULT_NOT_LOADED
+    plan = data[DATA_PLANS].get(profile)
+    if plan is None:
+        return RESULT_UNKNOWN_PROFILE
+
+    async with semaphore:
+        if not await data[DATA_QUEUE].async_submit(plan, phase):
+            return RESULT_FAILED
+
+    await data[DATA_COORDINATOR].async_request_refresh()
+    return RESULT_OK
+
+
+async def async_apply_group(hass: HomeAssistant, members: Iterable[str], profile: str, phase: Phase,
+                            max_concurrency: int = DEFAULT_GROUP_CONCURRENCY) -> dict[str, str]:
+    """Apply the named profile on all member entries concurrently, return a result per entry."""
+    members = list(members)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    results = await asyncio.gather(
+        *(_apply_member(hass, entry_id, profile, phase, semaphore) for entry_id in members)
+    )
+    return dict(zip(members, results))
@@ -0,0 +1,70 @@
+import math
+from collections import deque
+from typing import Optional
+
+# Samples kept per rolling window
+DEFAULT_WINDOW = 200
+
+
+class RollingStats:
+    """Fixed-size window of samples with nearest-rank percentiles."""
+
+    __slots__ = ("_samples", "count", "last")
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._samples: deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.last: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+        self.last = value
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "last_ms": _ms(self.last),
+            "p50_ms": _ms(self.percentile(50)),
+            "p95_ms": _ms(self.percentile(95)),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class ConnectorMetrics:
+    """Performance counters of one switch connection."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._window = window
+        self.requests = RollingStats(window)
+        self.endpoints: dict[str, RollingStats] = {}
+        self.applies: dict[str, RollingStats] = {}
+        self.last_apply = RollingStats(window)
+        self.logins = 0
+        self.session_reuses = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def record_request(self, endpoint: str, duration: float) -> None:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = RollingStats(self._window)
+        stats.add(duration)
+        self.requests.add(duration)
+
+    def record_apply(self, profile: str, duration: float) -> None:
+        stats = self.applies.get(profile)
+        if stats is None:
+            stats = self.applies[profile] = RollingStats(self._window)
+        stats.add(duration)
+        self.last_apply.add(duration)
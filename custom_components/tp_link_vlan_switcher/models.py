@@ -0,0 +1,205 @@
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+# 802.1Q port states as used by qvlanSet.cgi (selType_{port})
+PORT_UNTAGGED = 0
+PORT_TAGGED = 1
+PORT_NOT_MEMBER = 2
+PORT_STATE_NAMES = {PORT_UNTAGGED: "untagged", PORT_TAGGED: "tagged", PORT_NOT_MEMBER: "not_member"}
+
+
+@dataclass(frozen=True, slots=True)
+class VlanEntry:
+    """One row of the 802.1Q VLAN table, memberships as port bitmaps (bit 0 = port 1)."""
+
+    vid: int
+    name: str
+    tagged: int
+    untagged: int
+
+    def port_state(self, port: int) -> int:
+        bit = 1 << (port - 1)
+        if self.untagged & bit:
+            return PORT_UNTAGGED
+        if self.tagged & bit:
+            return PORT_TAGGED
+        return PORT_NOT_MEMBER
+
+
+@dataclass(frozen=True, slots=True)
+class SwitchVlanState:
+    """Parsed 802.1Q VLAN and PVID tables of one switch."""
+
+    port_count: int
+    vlans: Mapping[int, VlanEntry]
+    pvids: tuple[int, ...]  # index 0 = port 1
+
+    def port_state(self, vid: int, port: int) -> int:
+        entry = self.vlans.get(vid)
+        if entry is None:
+            return PORT_NOT_MEMBER
+        return entry.port_state(port)
+
+    def pvid(self, port: int) -> Optional[int]:
+        if 1 <= port <= len(self.pvids):
+            return self.pvids[port - 1]
+        return None
+
+    # ---------------------- Diff ----------------------
+    def vlan_differs(self, vid: int, ports: Iterable[tuple[int, int]]) -> bool:
+        """True if any of the given (port, state) pairs differs from the current table."""
+        return any(self.port_state(vid, port) != state for port, state in ports)
+
+    def with_pvid(self, port: int, pvid: int) -> "SwitchVlanState":
+        """Copy with the PVID of one port changed (after a successful write)."""
+        pvids = list(self.pvids)
+        pvids[port - 1] = pvid
+        return replace(self, pvids=tuple(pvids))
+
+    def pvid_bitmap(self, pvid: int) -> int:
+        """Port bitmap of all ports whose PVID is currently the given one."""
+        pbm = 0
+        for i, p in enumerate(self.pvids):
+            if p == pvid:
+                pbm |= 1 << i
+        return pbm
+
+    # ---------------------- Persistence ----------------------
+    def as_dict(self) -> dict[str, Any]:
+        """JSON-serializable form for the snapshot store."""
+        return {
+            "port_count": self.port_count,
+            "vlans": [[v.vid, v.name, v.tagged, v.untagged] for v in self.vlans.values()],
+            "pvids": list(self.pvids),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "SwitchVlanState":
+        vlans = {
+            int(vid): VlanEntry(vid=int(vid), name=str(name), tagged=int(tagged), untagged=int(untagged))
+            for vid, name, tagged, untagged in data.get("vlans", [])
+        }
+        return cls(
+            port_count=int(data.get("port_count", 0)),
+            vlans=vlans,
+            pvids=tuple(int(p) for p in data.get("pvids", [])),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PortVlanMatrix:
+    """
+    Port x VID membership of one VLAN table as a flat byte string (one PORT_* per cell).
+
+    Built once per polled table and shared by all per-port entities; a port's row is a
+    small bytes slice that is cheap to compare between polls.
+    """
+
+    vids: tuple[int, ...]
+    cells: bytes
+
+    @classmethod
+    def from_state(cls, state: SwitchVlanState) -> "PortVlanMatrix":
+        vids = tuple(sorted(state.vlans))
+        entries = [state.vlans[vid] for vid in vids]
+        cells = bytearray(len(vids) * state.port_count)
+        for port in range(1, state.port_count + 1):
+            offset = (port - 1) * len(vids)
+            for i, entry in enumerate(entries):
+                cells[offset + i] = entry.port_state(port)
+        return cls(vids=vids, cells=bytes(cells))
+
+    def row(self, port: int) -> bytes:
+        width = len(self.vids)
+        return self.cells[(port - 1) * width:port * width]
+
+    def memberships(self, port: int) -> Dict[int, int]:
+        """VID -> PORT_TAGGED/PORT_UNTAGGED for all VLANs the port is a member of."""
+        return {vid: state for vid, state in zip(self.vids, self.row(port)) if state != PORT_NOT_MEMBER}
+
+
+# link_status codes of PortStatisticsRpm.htm -> (label, speed in Mbit/s)
+LINK_STATUS = {
+    0: ("down", 0),
+    1: ("auto", None),
+    2: ("10M half", 10),
+    3: ("10M full", 10),
+    4: ("100M half", 100),
+    5: ("100M full", 100),
+    6: ("1000M full", 1000),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class PortCounters:
+    """One sample of the port statistics page for one port."""
+
+    port: int
+    enabled: bool
+    link_status: int
+    tx_good: int
+    tx_bad: int
+    rx_good: int
+    rx_bad: int
+
+    @property
+    def link(self) -> str:
+        return LINK_STATUS.get(self.link_status, ("unknown", None))[0]
+
+    @property
+    def speed(self) -> Optional[int]:
+        return LINK_STATUS.get(self.link_status, ("unknown", None))[1]
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, str):
+        return int(value, 0)
+    return int(value)
+
+
+def parse_vlan_state(qvlan_ds: Dict[str, Any], pvid_ds: Dict[str, Any]) -> SwitchVlanState:
+    """Build a SwitchVlanState from the qvlan_ds / pvid_ds objects of the switch pages."""
+    vids = qvlan_ds.get("vids", [])
+    names = qvlan_ds.get("names", [])
+    tag_mbrs = qvlan_ds.get("tagMbrs", [])
+    untag_mbrs = qvlan_ds.get("untagMbrs", [])
+    count = _to_int(qvlan_ds.get("count", len(vids)))
+
+    vlans = {}
+    for i in range(min(count, len(vids))):
+        vid = _to_int(vids[i])
+        vlans[vid] = VlanEntry(
+            vid=vid,
+            name=str(names[i]) if i < len(names) else "",
+            tagged=_to_int(tag_mbrs[i]) if i < len(tag_mbrs) else 0,
+            untagged=_to_int(untag_mbrs[i]) if i < len(untag_mbrs) else 0,
+        )
+
+    port_count = _to_int(pvid_ds.get("portNum", qvlan_ds.get("portNum", 0)))
+    pvids = tuple(_to_int(p) for p in pvid_ds.get("pvids", [])[:port_count])
+
+    return SwitchVlanState(port_count=port_count, vlans=vlans, pvids=pvids)
+
+
+def parse_port_counters(all_info: Dict[str, Any], port_count: int) -> tuple[PortCounters, ...]:
+    """Build PortCounters from the all_info object (pkts holds 4 counters per port)."""
+    state = all_info.get("state", [])
+    link_status = all_info.get("link_status", [])
+    pkts = all_info.get("pkts", [])
+
+    counters = []
+    for i in range(port_count):
+        base = i * 4
+        tx_good, tx_bad, rx_good, rx_bad = (
+            _to_int(v) for v in (pkts[base:base + 4] if len(pkts) >= base + 4 else (0, 0, 0, 0))
+        )
+        counters.append(PortCounters(
+            port=i + 1,
+            enabled=bool(_to_int(state[i])) if i < len(state) else True,
+            link_status=_to_int(link_status[i]) if i < len(link_status) else 0,
+            tx_good=tx_good,
+            tx_bad=tx_bad,
+            rx_good=rx_good,
+            rx_bad=rx_bad,
+        ))
+    return tuple(counters)
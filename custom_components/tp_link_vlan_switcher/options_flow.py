@@ -3,7 +3,15 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.helpers import selector
-from .const import DOMAIN, CONF_PORTS
+import homeassistant.helpers.config_validation as cv
+from .const import (
+    DOMAIN, CONF_PORTS, CONF_SWITCHES, CONF_GROUPS, CONF_MEMBERS, CONF_PROFILE,
+    CONF_MAX_CONCURRENCY, DEFAULT_GROUP_CONCURRENCY, CONF_DEBOUNCE, DEFAULT_DEBOUNCE,
+    CONF_TIMEOUT_MIN, CONF_TIMEOUT_MAX, CONF_APPLY_DEADLINE,
+    DEFAULT_TIMEOUT_MIN, DEFAULT_TIMEOUT_MAX, DEFAULT_APPLY_DEADLINE,
+    CONF_BACKUP_BEFORE_APPLY, CONF_BACKUP_RETENTION, DEFAULT_BACKUP_RETENTION, CONF_RECORD_HTTP,
+)
+from .profile_plan import ProfileValidationError, compile_profile
 
 
 class VlanSwitchOptionsFlowHandler(config_entries.OptionsFlow):
@@ -12,7 +20,10 @@ class VlanSwitchOptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         """Initialize options flow."""
         self.config_entry = config_entry
-        self.switches = config_entry.options.get("switches", {})
+        # Kopien, die laufenden Optionen dürfen sich erst mit async_create_entry ändern
+        self.switches = dict(config_entry.options.get(CONF_SWITCHES, {}))
+        self.groups = dict(config_entry.options.get(CONF_GROUPS, {}))
+        self.settings = {}
         self._edit_name = None
 
         self.port_count = config_entry.data.get(CONF_PORTS)
@@ -27,6 +38,12 @@ class VlanSwitchOptionsFlowHandler(config_entries.OptionsFlow):
                 return await self.async_step_remove_switch()
             if action == "edit":
                 return await self.async_step_edit_switch()
+            if action == "add_group":
+                return await self.async_step_add_group()
+            if action == "remove_group":
+                return await self.async_step_remove_group()
+            if action == "settings":
+                return await self.async_step_settings()
 
         schema = vol.Schema(
             {
@@ -35,6 +52,9 @@ class VlanSwitchOptionsFlowHandler(config_entries.OptionsFlow):
                         "add": "Neuen Profil-Switch hinzufügen",
                         "remove": "Vorhandenen Profil-Switch entfernen",
                         "edit": "Vorhandenen Profil-Switch bearbeiten",
+                        "add_group": "Neues Gruppen-Profil (mehrere Switches) hinzufügen",
+                        "remove_group": "Vorhandenes Gruppen-Profil entfernen",
+                        "settings": "Einstellungen",
                     }
                 )
             }
@@ -43,7 +63,15 @@ class VlanSwitchOptionsFlowHandler(config_entries.OptionsFlow):
 
     async def _finish(self):
         """Create the options entry after any change."""
-        return self.async_create_entry(title="", data={"switches": self.switches})
+        return self.async_create_entry(
+            title="",
+            data={
+                **self.config_entry.options,
+                **self.settings,
+                CONF_SWITCHES: self.switches,
+                CONF_GROUPS: self.groups,
+            },
+        )
 
     # -------------------------------
     # ADD
@@ -69,6 +97,16 @@ class VlanSwitchOptionsFlowHandler(config_entries.OptionsFlow):
                     errors={"base": "invalid_json"},
                 )
 
+            try:
+                compile_profile(name, vlans, pvid, self.port_count)
+            except ProfileValidationError as err:
+                return self.async_show_form(
+                    step_id="add_switch",
+                    data_schema=self._get_add_schema(user_input),
+                    errors={"base": "invalid_profile"},
+                    description_placeholders={"error": str(err)},
+                )
+
             self.switches[name] = {
                 "vlans": vlans,
                 "pvid": pvid,
@@ -206,6 +244,16 @@ class VlanSwitchOptionsFlowHandler(config_entries.OptionsFlow):
                     errors={"base": "invalid_json"},
                 )
 
+            try:
+                compile_profile(self._edit_name, vlans, pvid, self.port_count)
+            except ProfileValidationError as err:
+                return self.async_show_form(
+                    step_id="edit_switch_details",
+                    data_schema=self._get_edit_schema(current, user_input),
+                    errors={"base": "invalid_profile"},
+                    description_placeholders={"error": str(err)},
+                )
+
             self.switches[self._edit_name] = {
                 "vlans": vlans,
                 "pvid": pvid,
@@ -264,6 +312,129 @@ class VlanSwitchOptionsFlowHandler(config_entries.OptionsFlow):
             }
         )
 
+    # -------------------------------
+    # GROUPS
+    # -------------------------------
+    async def async_step_add_group(self, user_input=None):
+        """Add a group profile that applies a profile on several switches at once."""
+        errors = {}
+        entries = {
+            entry.entry_id: entry.title
+            for entry in self.hass.config_entries.async_entries(DOMAIN)
+        }
+
+        if user_input is not None:
+            name = user_input["name"].strip()
+            members = user_input[CONF_MEMBERS]
+            profile = user_input[CONF_PROFILE].strip()
+
+            if not name or not members:
+                errors["base"] = "invalid_group"
+            else:
+                for entry_id in members:
+                    entry = self.hass.config_entries.async_get_entry(entry_id)
+                    switches = self.switches if entry_id == self.config_entry.entry_id else (
+                        entry.options.get(CONF_SWITCHES, {}) if entry else {}
+                    )
+                    if profile not in switches:
+                        errors["base"] = "unknown_profile"
+                        break
+
+            if not errors:
+                self.groups[name] = {
+                    CONF_MEMBERS: members,
+                    CONF_PROFILE: profile,
+                    CONF_MAX_CONCURRENCY: user_input[CONF_MAX_CONCURRENCY],
+                }
+                return await self._finish()
+
+        if user_input is None:
+            user_input = {}
+
+        schema = vol.Schema(
+            {
+                vol.Required("name", default=user_input.get("name", "")): str,
+                vol.Required(CONF_MEMBERS, default=user_input.get(CONF_MEMBERS, [])): cv.multi_select(entries),
+                vol.Required(CONF_PROFILE, default=user_input.get(CONF_PROFILE, "")): str,
+                vol.Required(
+                    CONF_MAX_CONCURRENCY,
+                    default=user_input.get(CONF_MAX_CONCURRENCY, DEFAULT_GROUP_CONCURRENCY),
+                ): vol.All(int, vol.Range(min=1)),
+            }
+        )
+        return self.async_show_form(step_id="add_group", data_schema=schema, errors=errors)
+
+    async def async_step_remove_group(self, user_input=None):
+        """Remove an existing group profile."""
+        if user_input is not None:
+            self.groups.pop(user_input["name"], None)
+            return await self._finish()
+
+        if not self.groups:
+            return await self._finish()
+
+        schema = vol.Schema(
+            {
+                vol.Required("name"): vol.In(list(self.groups.keys())),
+            }
+        )
+        return self.async_show_form(step_id="remove_group", data_schema=schema)
+
+    # -------------------------------
+    # SETTINGS
+    # -------------------------------
+    async def async_step_settings(self, user_input=None):
+        """Device-wide settings."""
+        errors = {}
+        if user_input is not None:
+            if user_input[CONF_TIMEOUT_MIN] > user_input[CONF_TIMEOUT_MAX]:
+                errors["base"] = "invalid_timeouts"
+            else:
+                self.settings = user_input
+                return await self._finish()
+
+        options = self.config_entry.options
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_DEBOUNCE,
+                    default=options.get(CONF_DEBOUNCE, DEFAULT_DEBOUNCE),
+                    description="Sekunden, in denen Schaltvorgänge gesammelt werden",
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                vol.Required(
+                    CONF_TIMEOUT_MIN,
+                    default=options.get(CONF_TIMEOUT_MIN, DEFAULT_TIMEOUT_MIN),
+                    description="Minimaler Request-Timeout in Sekunden",
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.2, max=30)),
+                vol.Required(
+                    CONF_TIMEOUT_MAX,
+                    default=options.get(CONF_TIMEOUT_MAX, DEFAULT_TIMEOUT_MAX),
+                    description="Maximaler Request-Timeout in Sekunden",
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=60)),
+                vol.Required(
+                    CONF_APPLY_DEADLINE,
+                    default=options.get(CONF_APPLY_DEADLINE, DEFAULT_APPLY_DEADLINE),
+                    description="Maximale Dauer eines Profil-Wechsels in Sekunden (0 = unbegrenzt)",
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=300)),
+                vol.Required(
+                    CONF_BACKUP_BEFORE_APPLY,
+                    default=options.get(CONF_BACKUP_BEFORE_APPLY, False),
+                    description="Konfiguration vor jedem Profil-Wechsel sichern",
+                ): bool,
+                vol.Required(
+                    CONF_BACKUP_RETENTION,
+                    default=options.get(CONF_BACKUP_RETENTION, DEFAULT_BACKUP_RETENTION),
+                    description="Anzahl aufbewahrter Sicherungen (0 = alle)",
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                vol.Required(
+                    CONF_RECORD_HTTP,
+                    default=options.get(CONF_RECORD_HTTP, False),
+                    description="HTTP-Verkehr für Offline-Tests aufzeichnen (ohne Passwort)",
+                ): bool,
+            }
+        )
+        return self.async_show_form(step_id="settings", data_schema=schema, errors=errors)
+
     # -------------------------------
     # ENTRYPOINT
     # -------------------------------
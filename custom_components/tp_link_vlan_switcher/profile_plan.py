@@ -0,0 +1,222 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from .models import PORT_UNTAGGED, PORT_TAGGED, PORT_NOT_MEMBER, SwitchVlanState
+
+PHASES = ("turn_on", "turn_off")
+PORT_STATES = (PORT_UNTAGGED, PORT_TAGGED, PORT_NOT_MEMBER)
+
+MIN_VID = 1
+MAX_VID = 4094
+
+
+class ProfileValidationError(ValueError):
+    """A VLAN/PVID profile is malformed or does not fit the switch."""
+
+
+class PlanConflictError(ProfileValidationError):
+    """Two merged profile phases assign different values to the same port or VLAN."""
+
+
+@dataclass(frozen=True, slots=True)
+class VlanWrite:
+    """One qvlanSet.cgi Add/Modify request."""
+
+    vid: int
+    name: str
+    ports: tuple[tuple[int, int], ...]  # (port, state)
+    query: tuple[tuple[str, str], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class PvidWrite:
+    """One vlanPvidSet.cgi request."""
+
+    pvid: int
+    pbm: int
+    query: tuple[tuple[str, str], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class PhasePlan:
+    """All requests of one profile phase, VLANs first, then PVIDs."""
+
+    vlans: tuple[VlanWrite, ...]
+    pvids: tuple[PvidWrite, ...]
+
+    def matches(self, state: SwitchVlanState) -> bool:
+        """True if the switch tables already reflect this phase."""
+        for w in self.vlans:
+            if state.vlan_differs(w.vid, w.ports):
+                return False
+        for w in self.pvids:
+            if w.pbm & ~state.pvid_bitmap(w.pvid):
+                return False
+        return True
+
+
+@dataclass(frozen=True, slots=True)
+class ProfilePlan:
+    """Compiled VLAN profile with a plan per phase."""
+
+    name: str
+    turn_on: PhasePlan
+    turn_off: PhasePlan
+
+    def phase(self, phase: str) -> PhasePlan:
+        return self.turn_on if phase == "turn_on" else self.turn_off
+
+
+# ---------------------- Query helpers ----------------------
+def vlan_query(vid: int, name: str, ports: tuple[tuple[int, int], ...]) -> tuple[tuple[str, str], ...]:
+    return (
+        ("vid", str(vid)),
+        ("vname", name),
+        ("qvlan_add", "Add/Modify"),
+        *((f"selType_{port}", str(state)) for port, state in ports),
+    )
+
+
+def vlan_delete_query(vid: int) -> tuple[tuple[str, str], ...]:
+    return (("selVlans", str(vid)), ("qvlan_del", "Delete"))
+
+
+def pvid_query(pvid: int, pbm: int) -> tuple[tuple[str, str], ...]:
+    return (("pbm", str(pbm)), ("pvid", str(pvid)))
+
+
+# ---------------------- Validation ----------------------
+def _vid(value: Any, where: str) -> int:
+    try:
+        vid = int(value)
+    except (TypeError, ValueError):
+        raise ProfileValidationError(f"{where}: VID {value!r} is not a number") from None
+    if not MIN_VID <= vid <= MAX_VID:
+        raise ProfileValidationError(f"{where}: VID {vid} out of range {MIN_VID}-{MAX_VID}")
+    return vid
+
+
+def _port(value: Any, port_count: Optional[int], where: str) -> int:
+    try:
+        port = int(value)
+    except (TypeError, ValueError):
+        raise ProfileValidationError(f"{where}: port {value!r} is not a number") from None
+    if port < 1 or (port_count and port > port_count):
+        raise ProfileValidationError(f"{where}: port {port} does not exist on this switch")
+    return port
+
+
+def _state(value: Any, where: str) -> int:
+    try:
+        state = int(value)
+    except (TypeError, ValueError):
+        state = None
+    if state not in PORT_STATES:
+        raise ProfileValidationError(f"{where}: state {value!r} must be 0, 1 or 2")
+    return state
+
+
+# ---------------------- Compile ----------------------
+def compile_vlans(vlan_list: Any, port_count: Optional[int] = None, where: str = "vlans") -> tuple[VlanWrite, ...]:
+    if not isinstance(vlan_list, list):
+        raise ProfileValidationError(f"{where}: expected a list of VLANs")
+
+    writes = []
+    for i, vlan in enumerate(vlan_list):
+        loc = f"{where}[{i}]"
+        if not isinstance(vlan, dict):
+            raise ProfileValidationError(f"{loc}: expected an object")
+        vid = _vid(vlan.get("vid"), loc)
+        name = str(vlan.get("vname") or "")
+        ports_cfg = vlan.get("ports", {})
+        if not isinstance(ports_cfg, dict):
+            raise ProfileValidationError(f"{loc}: ports must be an object of port -> state")
+
+        ports = tuple(sorted(
+            (_port(port, port_count, loc), _state(state, loc)) for port, state in ports_cfg.items()
+        ))
+        writes.append(VlanWrite(vid=vid, name=name, ports=ports, query=vlan_query(vid, name, ports)))
+    return tuple(writes)
+
+
+def compile_pvids(pvid_cfg: Any, port_count: Optional[int] = None, where: str = "pvid") -> tuple[PvidWrite, ...]:
+    if not isinstance(pvid_cfg, dict):
+        raise ProfileValidationError(f"{where}: expected an object of PVID -> ports")
+
+    writes = []
+    for pvid_str, ports in pvid_cfg.items():
+        loc = f"{where}[{pvid_str}]"
+        pvid = _vid(pvid_str, loc)
+        if not isinstance(ports, list):
+            raise ProfileValidationError(f"{loc}: expected a list of ports")
+        pbm = 0
+        for port in ports:
+            pbm |= 1 << (_port(port, port_count, loc) - 1)
+        writes.append(PvidWrite(pvid=pvid, pbm=pbm, query=pvid_query(pvid, pbm)))
+    return tuple(writes)
+
+
+def compile_profile(name: str, vlans: Dict[str, Any], pvid: Dict[str, Any],
+                    port_count: Optional[int] = None) -> ProfilePlan:
+    """Validate a profile from the options and compile it into request plans."""
+    if not isinstance(vlans, dict) or not isinstance(pvid, dict):
+        raise ProfileValidationError("vlans and pvid must be objects with turn_on/turn_off")
+
+    phases = {}
+    for phase in PHASES:
+        phases[phase] = PhasePlan(
+            vlans=compile_vlans(vlans.get(phase, []), port_count, f"vlans.{phase}"),
+            pvids=compile_pvids(pvid.get(phase, {}), port_count, f"pvid.{phase}"),
+        )
+    return ProfilePlan(name=name, **phases)
+
+
+# ---------------------- Merge ----------------------
+def merge_phase_plans(parts: Iterable[tuple[str, PhasePlan]]) -> PhasePlan:
+    """
+    Merge several labelled phase plans into one plan with one write per VID and PVID.
+
+    Raises PlanConflictError if two parts set a port of the same VID to different states,
+    give a VID different names or put a port on different PVIDs.
+    """
+    names: dict[int, tuple[str, str]] = {}                 # vid -> (name, label)
+    members: dict[int, dict[int, tuple[int, str]]] = {}   # vid -> port -> (state, label)
+    pvid_of: dict[int, tuple[int, str]] = {}              # port -> (pvid, label)
+
+    for label, plan in parts:
+        for w in plan.vlans:
+            if w.name:
+                prev = names.setdefault(w.vid, (w.name, label))
+                if prev[0] != w.name:
+                    raise PlanConflictError(
+                        f"VLAN {w.vid}: name '{prev[0]}' ({prev[1]}) conflicts with '{w.name}' ({label})"
+                    )
+            ports = members.setdefault(w.vid, {})
+            for port, state in w.ports:
+                prev = ports.setdefault(port, (state, label))
+                if prev[0] != state:
+                    raise PlanConflictError(
+                        f"VLAN {w.vid} port {port}: state {prev[0]} ({prev[1]}) conflicts with {state} ({label})"
+                    )
+        for w in plan.pvids:
+            for port in range(1, w.pbm.bit_length() + 1):
+                if not w.pbm & (1 << (port - 1)):
+                    continue
+                prev = pvid_of.setdefault(port, (w.pvid, label))
+                if prev[0] != w.pvid:
+                    raise PlanConflictError(
+                        f"Port {port}: PVID {prev[0]} ({prev[1]}) conflicts with PVID {w.pvid} ({label})"
+                    )
+
+    vlans = []
+    for vid, ports in members.items():
+        name = names.get(vid, ("", ""))[0]
+        port_states = tuple(sorted((port, state) for port, (state, _) in ports.items()))
+        vlans.append(VlanWrite(vid=vid, name=name, ports=port_states, query=vlan_query(vid, name, port_states)))
+
+    pbms: dict[int, int] = {}
+    for port, (pvid, _) in pvid_of.items():
+        pbms[pvid] = pbms.get(pvid, 0) | (1 << (port - 1))
+    pvids = tuple(PvidWrite(pvid=pvid, pbm=pbm, query=pvid_query(pvid, pbm)) for pvid, pbm in pbms.items())
+
+    return PhasePlan(vlans=tuple(vlans), pvids=pvids)
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Optional
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_BROKER, DATA_COORDINATOR, DATA_PLANS, DATA_QUEUE
+from .command_queue import DeviceCommandQueue
+from .models import SwitchVlanState
+from .profile_plan import ProfilePlan
+from .tp_link_connector import Phase
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def desired_phases(plans: dict[str, ProfilePlan], queue: DeviceCommandQueue,
+                   state: Optional[SwitchVlanState]) -> dict[str, Phase]:
+    """Last requested phase per profile, else the phase the last poll showed."""
+    desired: dict[str, Phase] = {}
+    for name, plan in plans.items():
+        phase = queue.desired.get(name)
+        if phase is None and state is not None:
+            if plan.turn_on.matches(state):
+                phase = "turn_on"
+            elif plan.turn_off.matches(state):
+                phase = "turn_off"
+        if phase is not None:
+            desired[name] = phase
+    return desired
+
+
+async def async_reboot_and_restore(hass: HomeAssistant, entry_id: str) -> bool:
+    """Reboot the switch of an entry, wait for it and re-apply all profile switches in one session."""
+    data = hass.data[DOMAIN][entry_id]
+    broker = data[DATA_BROKER]
+    queue: DeviceCommandQueue = data[DATA_QUEUE]
+    coordinator = data[DATA_COORDINATOR]
+    plans: dict[str, ProfilePlan] = data[DATA_PLANS]
+
+    # Vor dem Neustart festhalten, was geschaltet sein soll
+    desired = desired_phases(plans, queue, coordinator.data)
+
+    if not await broker.async_reboot():
+        return False
+
+    # Submitted together, the queue runs them as one batch on the session opened by the readiness check
+    results = await asyncio.gather(*(queue.async_submit(plans[name], phase) for name, phase in desired.items()))
+    failed = [name for name, ok in zip(desired, results) if not ok]
+    if failed:
+        _LOGGER.error("Profiles %s could not be restored on %s after the reboot", failed, broker.connector.ip)
+    else:
+        _LOGGER.info("Restored %s profiles on %s after the reboot", len(desired), broker.connector.ip)
+
+    await coordinator.async_request_refresh()
+    return not failed
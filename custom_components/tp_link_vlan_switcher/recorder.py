@@ -0,0 +1,441 @@
+import asyncio
+import base64
+import collections
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable, Optional, Union
+
+import aiohttp
+from yarl import URL
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import TRACE_DIR, TRACE_FLUSH_LINES, TRACE_MAX_EXCHANGES
+from .tp_link_connector import CONFIG_BACKUP_PATH, CONFIG_RESTORE_PATH
+
+_LOGGER = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+REDACTED = "***"
+# Form fields and query parameters whose values never end up in a trace
+SECRET_FIELDS = frozenset({"username", "password", "cpassword"})
+# Answers that may echo the credentials (both render the login page with its form); only
+# these bodies are searched for the `secrets`, a VLAN called like the user stays intact
+CREDENTIAL_PAGES = frozenset({"logon.cgi", "Logout.htm"})
+# Config file transfers: the file holds the credentials, so its body streams through
+# unbuffered and only its size is recorded (replayed as zero bytes)
+STREAMED_PATHS = frozenset({CONFIG_BACKUP_PATH, CONFIG_RESTORE_PATH})
+
+# Recorded error kind -> exception raised on replay
+_ERRORS = {
+    "timeout": asyncio.TimeoutError,
+    "disconnected": aiohttp.ServerDisconnectedError,
+    "payload": aiohttp.ClientPayloadError,
+    "connection": aiohttp.ClientConnectionError,
+}
+
+Query = tuple[tuple[str, str], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class TraceExchange:
+    """One recorded request and its answer (or the error it ended with)."""
+
+    method: str
+    path: str
+    query: Query
+    start: float
+    duration: float
+    status: Optional[int] = None
+    content_type: Optional[str] = None
+    encoding: Optional[str] = None
+    body: Optional[str] = None
+    form: Optional[Query] = None
+    error: Optional[str] = None
+    size: Optional[int] = None  # byte count of a body that was not recorded
+
+    @property
+    def key(self) -> tuple[str, str, Query]:
+        return self.method, self.path, self.query
+
+    def as_dict(self) -> dict[str, Any]:
+        data = {"method": self.method, "path": self.path, "start": self.start, "duration": self.duration}
+        for name in ("query", "status", "content_type", "encoding", "body", "form", "error", "size"):
+            value = getattr(self, name)
+            if value:
+                data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TraceExchange":
+        form = data.get("form")
+        return cls(
+            method=data["method"],
+            path=data["path"],
+            query=tuple((k, v) for k, v in data.get("query", ())),
+            start=data["start"],
+            duration=data["duration"],
+            status=data.get("status"),
+            content_type=data.get("content_type"),
+            encoding=data.get("encoding"),
+            body=data.get("body"),
+            form=None if form is None else tuple((k, v) for k, v in form),
+            error=data.get("error"),
+            size=data.get("size"),
+        )
+
+
+def _normalize_query(url: str, params: Any) -> Query:
+    """Query of a request as (name, value) pairs in request order."""
+    pairs = list(URL(url).query.items())
+    if params:
+        pairs.extend(params.items() if isinstance(params, dict) else params)
+    return tuple((str(k), REDACTED if k in SECRET_FIELDS else str(v)) for k, v in pairs)
+
+
+def _redacted_form(data: Any) -> Optional[Query]:
+    if not isinstance(data, dict):
+        return None
+    return tuple((str(k), REDACTED if k in SECRET_FIELDS else str(v)) for k, v in data.items())
+
+
+def _error_kind(err: BaseException) -> str:
+    if isinstance(err, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(err, aiohttp.ServerDisconnectedError):
+        return "disconnected"
+    if isinstance(err, aiohttp.ClientPayloadError):
+        return "payload"
+    return "connection"
+
+
+def trace_path(hass: HomeAssistant, ip: str, label: str = "session") -> str:
+    """New trace file below .storage for one switch."""
+    stamp = dt_util.utcnow().strftime("%Y%m%dT%H%M%S")
+    return hass.config.path(".storage", TRACE_DIR, f"{ip}-{stamp}-{label}.jsonl.gz")
+
+
+class TraceResponse:
+    """Fully read answer offering the parts of aiohttp.ClientResponse the connector uses."""
+
+    def __init__(self, status: int, content_type: str, encoding: str, body: bytes):
+        self.status = status
+        self.content_type = content_type
+        self.encoding = encoding
+        self.body = body
+        self.content = self
+
+    async def read(self) -> bytes:
+        return self.body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "strict") -> str:
+        return self.body.decode(encoding or self.encoding, errors)
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        for pos in range(0, len(self.body), n):
+            yield self.body[pos:pos + n]
+
+
+class StreamedResponse:
+    """Unbuffered aiohttp.ClientResponse passed through to the connector, counting the body bytes."""
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+        self.status = response.status
+        self.content_type = response.content_type
+        self.size = 0
+        self.content = self
+
+    async def read(self) -> bytes:
+        body = await self._response.read()
+        self.size += len(body)
+        return body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "strict") -> str:
+        body = await self.read()
+        return body.decode(encoding or self._response.get_encoding(), errors)
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        async for chunk in self._response.content.iter_chunked(n):
+            self.size += len(chunk)
+            yield chunk
+
+
+# ---------------------- Recording ----------------------
+class HttpRecorder:
+    """
+    Writes the HTTP exchanges of one switch to a trace file (gzip compressed JSON lines).
+
+    The first line is a header, then exchanges in request order. Response bodies are stored
+    once per content (blake2b id) in their own line before the first exchange using them, so
+    the unchanged pages of every poll cost one short line each. Credentials are replaced by
+    REDACTED in form fields and query parameters, the `secrets` (username and password) also
+    in the bodies of CREDENTIAL_PAGES; bodies of STREAMED_PATHS are not recorded at all. Lines are buffered
+    and appended in the executor, in a background task of hass if given; recording stops
+    after `max_exchanges`.
+    """
+
+    def __init__(self, path: str, host: str, secrets: Iterable[Optional[str]] = (),
+                 max_exchanges: int = TRACE_MAX_EXCHANGES, hass: Optional[HomeAssistant] = None):
+        self.path = path
+        self.exchanges = 0
+        self._max = max_exchanges
+        self._hass = hass
+        # Längere zuerst, falls das Passwort den Benutzernamen enthält
+        self._secrets = tuple(sorted({s.encode() for s in secrets if s}, key=len, reverse=True))
+        self._bodies: set[str] = set()
+        self._start = time.monotonic()
+        self._lines = [json.dumps({"version": TRACE_VERSION, "host": host,
+                                   "recorded": dt_util.utcnow().isoformat()})]
+        self._lock = asyncio.Lock()
+        self._flushing: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def wrap(self, session: aiohttp.ClientSession) -> "RecordingSession":
+        return RecordingSession(session, self)
+
+    @property
+    def active(self) -> bool:
+        return not self._closed and self.exchanges < self._max
+
+    def record(self, method: str, url: str, kwargs: dict[str, Any], start: float,
+               response: Union[TraceResponse, StreamedResponse, None] = None,
+               error: Optional[BaseException] = None) -> None:
+        if not self.active:
+            return
+        path = URL(url).path.lstrip("/")
+        body_id = size = encoding = None
+        if isinstance(response, TraceResponse):
+            body = response.body
+            if path in CREDENTIAL_PAGES:
+                # Gespeichert wird die geschwärzte Antwort, der Connector bekommt das Original
+                body = self.redact(body)
+            body_id = self._add_body(body)
+            encoding = None if response.encoding == "utf-8" else response.encoding
+        elif response is not None:
+            size = response.size
+        exchange = TraceExchange(
+            method=method,
+            path=path,
+            query=_normalize_query(url, kwargs.get("params")),
+            start=round(start - self._start, 6),
+            duration=round(time.monotonic() - start, 6),
+            status=None if response is None else response.status,
+            content_type=None if response is None else response.content_type,
+            encoding=encoding,
+            body=body_id,
+            form=_redacted_form(kwargs.get("data")),
+            error=None if error is None else _error_kind(error),
+            size=size,
+        )
+        self._lines.append(json.dumps(exchange.as_dict(), separators=(",", ":")))
+        self.exchanges += 1
+        if self.exchanges == self._max:
+            _LOGGER.info("HTTP trace %s reached %s exchanges, recording stopped", self.path, self._max)
+        if len(self._lines) >= TRACE_FLUSH_LINES and (self._flushing is None or self._flushing.done()):
+            if self._hass is not None:
+                self._flushing = self._hass.async_create_background_task(
+                    self.async_flush(), f"tp_link_vlan_switcher trace flush {self.path}"
+                )
+            else:
+                # Ohne Home Assistant (Benchmarks) hält _flushing die Referenz auf den Task
+                self._flushing = asyncio.get_running_loop().create_task(self.async_flush())
+
+    def redact(self, body: bytes) -> bytes:
+        for secret in self._secrets:
+            body = body.replace(secret, REDACTED.encode())
+        return body
+
+    def _add_body(self, body: bytes) -> str:
+        body_id = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if body_id not in self._bodies:
+            self._bodies.add(body_id)
+            try:
+                line = {"body": body_id, "text": body.decode("utf-8")}
+            except UnicodeDecodeError:
+                line = {"body": body_id, "base64": base64.b64encode(body).decode("ascii")}
+            self._lines.append(json.dumps(line, separators=(",", ":")))
+        return body_id
+
+    async def async_flush(self) -> None:
+        async with self._lock:
+            lines, self._lines = self._lines, []
+            if lines:
+                await asyncio.get_running_loop().run_in_executor(None, self._append, lines)
+
+    async def async_close(self) -> None:
+        """Write the remaining lines; nothing is recorded afterwards."""
+        self._closed = True
+        await self.async_flush()
+        _LOGGER.debug("HTTP trace %s closed after %s exchanges", self.path, self.exchanges)
+
+    def _append(self, lines: list[str]) -> None:
+        # Jeder Flush hängt ein eigenes gzip-Member an, gzip.open liest sie am Stück
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with gzip.open(self.path, "at", encoding="utf-8") as fh:
+            fh.write("\n".join(lines) + "\n")
+
+
+class RecordingSession:
+    """aiohttp.ClientSession stand-in passing requests through and recording them."""
+
+    def __init__(self, session: aiohttp.ClientSession, recorder: HttpRecorder):
+        self._session = session
+        self._recorder = recorder
+
+    def get(self, url: str, **kwargs) -> "_RecordedRequest":
+        return _RecordedRequest(self, "GET", url, kwargs)
+
+    def post(self, url: str, **kwargs) -> "_RecordedRequest":
+        return _RecordedRequest(self, "POST", url, kwargs)
+
+
+class _RecordedRequest:
+    def __init__(self, owner: RecordingSession, method: str, url: str, kwargs: dict[str, Any]):
+        self._owner = owner
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self._start = 0.0
+        self._request: Any = None
+        self._streamed: Optional[StreamedResponse] = None
+
+    async def __aenter__(self) -> Union[TraceResponse, StreamedResponse]:
+        recorder = self._owner._recorder
+        start = self._start = time.monotonic()
+        if URL(self._url).path.lstrip("/") in STREAMED_PATHS:
+            self._request = self._owner._session.request(self._method, self._url, **self._kwargs)
+            try:
+                self._streamed = StreamedResponse(await self._request.__aenter__())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                recorder.record(self._method, self._url, self._kwargs, start, error=err)
+                raise
+            return self._streamed
+        try:
+            async with self._owner._session.request(self._method, self._url, **self._kwargs) as resp:
+                body = await resp.read()
+                response = TraceResponse(resp.status, resp.content_type, resp.get_encoding(), body)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            recorder.record(self._method, self._url, self._kwargs, start, error=err)
+            raise
+        recorder.record(self._method, self._url, self._kwargs, start, response)
+        return response
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._streamed is None:
+            return None
+        # Aufgezeichnet wird erst nach dem Streamen, mit Dauer und Größe des ganzen Bodys
+        await self._request.__aexit__(exc_type, exc, tb)
+        error = exc if isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError)) else None
+        self._owner._recorder.record(self._method, self._url, self._kwargs, self._start,
+                                     None if error else self._streamed, error)
+        return None
+
+
+# ---------------------- Replay ----------------------
+def load_trace(path: str) -> tuple[dict[str, Any], list[TraceExchange], dict[str, bytes]]:
+    """Header, exchanges and bodies of a trace file (blocking)."""
+    header: dict[str, Any] = {}
+    exchanges: list[TraceExchange] = []
+    bodies: dict[str, bytes] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if "version" in data:
+                if data["version"] != TRACE_VERSION:
+                    raise ValueError(f"{path}: unsupported trace version {data['version']}")
+                header = data
+            elif "body" in data and "method" not in data:
+                bodies[data["body"]] = (data["text"].encode("utf-8") if "text" in data
+                                        else base64.b64decode(data["base64"]))
+            else:
+                exchanges.append(TraceExchange.from_dict(data))
+    return header, exchanges, bodies
+
+
+class ReplaySession:
+    """
+    Serves a recorded trace in place of an aiohttp.ClientSession.
+
+    Requests are matched by method, path and query. Repeated requests get the recorded
+    answers in order and the last one again once they run out, so a poll loop can run
+    longer than the recording. Every answer is delayed by its recorded duration times
+    `latency_scale` (0 = no delay) and honours the total timeout of the request. Requests
+    the trace has no answer for fail with a connection error and are listed in `misses`.
+    """
+
+    def __init__(self, exchanges: Iterable[TraceExchange], bodies: dict[str, bytes],
+                 latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+        self.requests = 0
+        self.misses: list[tuple[str, str, Query]] = []
+        self._bodies = bodies
+        self._pending: dict[tuple, collections.deque[TraceExchange]] = {}
+        self._last: dict[tuple, TraceExchange] = {}
+        for exchange in exchanges:
+            self._pending.setdefault(exchange.key, collections.deque()).append(exchange)
+
+    @classmethod
+    def from_file(cls, path: str, latency_scale: float = 1.0) -> "ReplaySession":
+        _, exchanges, bodies = load_trace(path)
+        return cls(exchanges, bodies, latency_scale)
+
+    @property
+    def unused(self) -> int:
+        """Recorded exchanges not served yet."""
+        return sum(len(q) for q in self._pending.values())
+
+    def get(self, url: str, **kwargs) -> "_ReplayedRequest":
+        return _ReplayedRequest(self, "GET", url, kwargs)
+
+    def post(self, url: str, **kwargs) -> "_ReplayedRequest":
+        return _ReplayedRequest(self, "POST", url, kwargs)
+
+    def _next(self, key: tuple) -> Optional[TraceExchange]:
+        pending = self._pending.get(key)
+        if pending:
+            self._last[key] = pending.popleft()
+        return self._last.get(key)
+
+    async def _answer(self, method: str, url: str, kwargs: dict[str, Any]) -> TraceResponse:
+        self.requests += 1
+        key = (method, URL(url).path.lstrip("/"), _normalize_query(url, kwargs.get("params")))
+        exchange = self._next(key)
+        if exchange is None:
+            self.misses.append(key)
+            raise aiohttp.ClientConnectionError(f"No recorded answer for {method} {key[1]}")
+
+        delay = exchange.duration * self.latency_scale
+        timeout: Union[aiohttp.ClientTimeout, None] = kwargs.get("timeout")
+        if timeout is not None and timeout.total is not None and delay > timeout.total:
+            await asyncio.sleep(timeout.total)
+            raise asyncio.TimeoutError
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if exchange.error is not None:
+            error = _ERRORS.get(exchange.error, aiohttp.ClientConnectionError)
+            raise error() if error is asyncio.TimeoutError else error(f"recorded {exchange.error}")
+        body = self._bodies.get(exchange.body, b"") if exchange.size is None else bytes(exchange.size)
+        return TraceResponse(exchange.status, exchange.content_type, exchange.encoding or "utf-8", body)
+
+
+class _ReplayedRequest:
+    def __init__(self, owner: ReplaySession, method: str, url: str, kwargs: dict[str, Any]):
+        self._owner = owner
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+
+    async def __aenter__(self) -> TraceResponse:
+        return await self._owner._answer(self._method, self._url, self._kwargs)
+
+    async def __aexit__(self, *exc) -> None:
+        return None
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    DEFAULT_SCAN_INTERVAL, FLEET_MAX_REQUESTS, FLEET_JITTER, FLEET_MAX_BACKOFF, FLEET_SLOW_POLL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Interval factor per unchanged poll and per slow poll
+UNCHANGED_BACKOFF = 1.5
+SLOW_BACKOFF = 2.0
+
+
+class PollSlot:
+    """Phase and backoff of one poller (coordinator) of the fleet."""
+
+    __slots__ = ("key", "offset", "backoff")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.offset = 0.0
+        self.backoff = 1.0
+
+
+class FleetScheduler:
+    """
+    Poll timing and request concurrency of all switches of the integration.
+
+    Every coordinator gets a slot; the slots are spread evenly over the scan interval, so
+    15 switches with two coordinators each poll one after another instead of all at once.
+    A poll is scheduled at the next occurrence of its slot's phase after interval * backoff,
+    plus a small jitter. The backoff grows while a device answers slowly or its data does
+    not change and resets on the first change. `limiter` caps the HTTP requests in flight
+    over all switches.
+    """
+
+    def __init__(self, hass: HomeAssistant, interval: timedelta = DEFAULT_SCAN_INTERVAL,
+                 max_requests: int = FLEET_MAX_REQUESTS):
+        self._hass = hass
+        self.interval = interval.total_seconds()
+        self.limiter = asyncio.Semaphore(max_requests)
+        self._epoch = hass.loop.time()
+        self._slots: dict[str, PollSlot] = {}
+
+    # ---------------------- Slots ----------------------
+    @callback
+    def async_register(self, key: str) -> PollSlot:
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = PollSlot(key)
+            self._spread()
+        return slot
+
+    @callback
+    def async_unregister(self, key: str) -> None:
+        if self._slots.pop(key, None) is not None:
+            self._spread()
+
+    def _spread(self) -> None:
+        """Distribute the phase offsets of all slots evenly over the interval."""
+        step = self.interval / max(1, len(self._slots))
+        for i, slot in enumerate(self._slots.values()):
+            slot.offset = i * step
+
+    # ---------------------- Timing ----------------------
+    def next_delay(self, slot: PollSlot) -> float:
+        """Seconds from now until the next poll of slot."""
+        now = self._hass.loop.time()
+        period = self.interval * slot.backoff
+        # Auf die Phase des Slots runden, damit die Geräte versetzt bleiben
+        cycles = round((now + period - self._epoch - slot.offset) / self.interval)
+        target = self._epoch + slot.offset + cycles * self.interval
+        while target - now < period / 2:
+            target += self.interval
+        spacing = self.interval / max(1, len(self._slots))
+        target += random.uniform(-FLEET_JITTER, FLEET_JITTER) * spacing
+        return max(0.0, target - now)
+
+    @callback
+    def async_record_poll(self, slot: PollSlot, duration: float, changed: bool) -> None:
+        """Adapt the backoff of slot after a poll."""
+        backoff = slot.backoff
+        if duration > FLEET_SLOW_POLL:
+            backoff *= SLOW_BACKOFF
+        elif not changed:
+            backoff *= UNCHANGED_BACKOFF
+        else:
+            backoff = 1.0
+        backoff = min(FLEET_MAX_BACKOFF, backoff)
+        if backoff != slot.backoff:
+            _LOGGER.debug("%s: poll interval x%.2f (%.2fs, %s)", slot.key, backoff, duration,
+                          "changed" if changed else "unchanged")
+            slot.backoff = backoff
+
+    @callback
+    def async_reset(self, slot: PollSlot) -> None:
+        """Back to the base interval, e.g. after a command changed the device."""
+        slot.backoff = 1.0
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            key: {"offset_s": round(slot.offset, 2), "backoff": round(slot.backoff, 2)}
+            for key, slot in self._slots.items()
+        }
+
+
+class ScheduledPollMixin:
+    """
+    DataUpdateCoordinator mixin taking its poll times from the FleetScheduler.
+
+    With a scheduler the coordinator is created with update_interval=None, so it never
+    polls on its own; after every refresh the mixin arms one timer at the slot's next
+    poll time that calls async_refresh(). Must come before DataUpdateCoordinator in the
+    bases; call _init_schedule() at the end of __init__ and _record_poll() after each
+    successful update.
+    """
+
+    _scheduler: Optional[FleetScheduler] = None
+    _slot: Optional[PollSlot] = None
+    _unsub_poll: Optional[CALLBACK_TYPE] = None
+
+    def _init_schedule(self, scheduler: Optional[FleetScheduler]) -> None:
+        self._scheduler = scheduler
+        if scheduler is not None:
+            self._slot = scheduler.async_register(self.name)
+            self._poll_job = HassJob(self._async_handle_poll, f"{self.name} poll", cancel_on_shutdown=True)
+
+    async def async_refresh(self) -> None:
+        try:
+            await super().async_refresh()
+        finally:
+            self._schedule_poll()
+
+    def async_set_updated_data(self, data: Any) -> None:
+        super().async_set_updated_data(data)
+        # Frische Daten: nächster Poll erst wieder im Abstand des Slots
+        self._schedule_poll()
+
+    @callback
+    def _schedule_poll(self) -> None:
+        if self._slot is None:
+            return
+        self._cancel_poll()
+        self._unsub_poll = async_call_later(self.hass, self._scheduler.next_delay(self._slot), self._poll_job)
+
+    @callback
+    def _cancel_poll(self) -> None:
+        if self._unsub_poll is not None:
+            self._unsub_poll()
+            self._unsub_poll = None
+
+    async def _async_handle_poll(self, _now: datetime) -> None:
+        self._unsub_poll = None
+        await self.async_refresh()
+
+    def _record_poll(self, duration: float, changed: bool) -> None:
+        if self._slot is not None:
+            self._scheduler.async_record_poll(self._slot, duration, changed)
+
+    def reset_backoff(self) -> None:
+        if self._slot is not None:
+            self._scheduler.async_reset(self._slot)
+
+    async def async_shutdown(self) -> None:
+        if self._slot is not None:
+            self._scheduler.async_unregister(self.name)
+            self._slot = None
+        self._cancel_poll()
+        await super().async_shutdown()
@@ -0,0 +1,131 @@
+import logging
+from typing import Any, Optional
+
+from homeassistant.components.select import SelectEntity
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .command_queue import DeviceCommandQueue
+from .const import DOMAIN, CONF_PORTS, DATA_BROKER, DATA_COORDINATOR, DATA_PLANS, DATA_QUEUE, DATA_SNAPSHOT
+from .coordinator import TPLinkVlanCoordinator
+from .entity_base import TPLinkSmartSwitchBaseEntity
+from .models import PORT_STATE_NAMES, SwitchVlanState
+from .profile_plan import PhasePlan, ProfilePlan, PvidWrite, pvid_query
+from .session_broker import TPLinkSessionBroker
+from .snapshot import DeviceSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up one PVID select per port, all fed by the VLAN coordinator."""
+    data = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator: TPLinkVlanCoordinator = data[DATA_COORDINATOR]
+    broker: TPLinkSessionBroker = data[DATA_BROKER]
+    async_add_entities(
+        PortPvidSelect(config_entry, coordinator, broker, data[DATA_QUEUE], data[DATA_SNAPSHOT], data[DATA_PLANS], port)
+        for port in range(1, (config_entry.data.get(CONF_PORTS) or 0) + 1)
+    )
+
+
+class PortPvidSelect(CoordinatorEntity[TPLinkVlanCoordinator], TPLinkSmartSwitchBaseEntity, SelectEntity):
+    """PVID of one port; the VLAN memberships of the port are exposed as attributes."""
+
+    _attr_entity_category = EntityCategory.CONFIG
+
+    def __init__(self, config_entry, coordinator: TPLinkVlanCoordinator, broker: TPLinkSessionBroker,
+                 queue: DeviceCommandQueue, snapshot: DeviceSnapshot, plans: dict[str, ProfilePlan], port: int):
+        CoordinatorEntity.__init__(self, coordinator)
+        TPLinkSmartSwitchBaseEntity.__init__(self, config_entry)
+        self._broker = broker
+        self._queue = queue
+        self._snapshot = snapshot
+        self._plans = plans
+        self._port = port
+        self._attr_name = f"Port {port} PVID"
+        self._last = self._key()
+
+    @property
+    def unique_id(self):
+        """Unique ID for this select."""
+        return f"{self._ip}_port{self._port}_pvid"
+
+    @property
+    def options(self) -> list[str]:
+        """VLANs the port is member of; the switch ignores any other PVID."""
+        matrix = self.coordinator.matrix
+        return [] if matrix is None else [str(vid) for vid in matrix.memberships(self._port)]
+
+    @property
+    def current_option(self) -> Optional[str]:
+        state = self.coordinator.data
+        pvid = None if state is None else state.pvid(self._port)
+        return None if pvid is None else str(pvid)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        matrix = self.coordinator.matrix
+        if matrix is None:
+            return {}
+        return {f"vlan_{vid}": PORT_STATE_NAMES[state] for vid, state in matrix.memberships(self._port).items()}
+
+    def _key(self) -> tuple:
+        """Everything this entity shows, compared between polls."""
+        state, matrix = self.coordinator.data, self.coordinator.matrix
+        if state is None:
+            return (None, None, None, self.available)
+        return (state.pvid(self._port), matrix.vids, matrix.row(self._port), self.available)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Nur schreiben, wenn sich an diesem Port etwas geändert hat
+        key = self._key()
+        if key == self._last:
+            return
+        self._last = key
+        self.async_write_ha_state()
+
+    async def async_select_option(self, option: str) -> None:
+        """
+        Set the PVID of this port through the command queue.
+
+        It runs like a profile phase: serialized with queued applies, checked against the
+        tables read back from the switch and rolled back if the switch did not take it.
+        """
+        pvid = int(option)
+        if option == self.current_option:
+            return
+        pbm = 1 << (self._port - 1)
+        plan = ProfilePlan(
+            name=self.unique_id,
+            turn_on=PhasePlan(vlans=(), pvids=(PvidWrite(pvid=pvid, pbm=pbm, query=pvid_query(pvid, pbm)),)),
+            turn_off=PhasePlan(vlans=(), pvids=()),
+        )
+        # Keine Mitglieder: der Port-PVID ist kein Profil und wird nicht als gewünscht gemerkt
+        if not await self._queue.async_submit(plan, "turn_on", members=()):
+            raise HomeAssistantError(f"Setting PVID {pvid} on port {self._port} of {self._ip} failed")
+
+        # Die nach dem Schreiben gelesenen Tabellen übernehmen, ohne erneuten Poll
+        state = self._broker.connector.vlan_state
+        if state is not None:
+            self._async_record(state)
+            self.coordinator.async_set_updated_data(state)
+
+    @callback
+    def _async_record(self, state: SwitchVlanState) -> None:
+        """
+        Record the changed tables in the snapshot and drop the profile phases that set another
+        PVID on this port, so a reboot-and-restore does not undo the manual change.
+        """
+        self._snapshot.async_update_state(state)
+        bit = 1 << (self._port - 1)
+        overridden = [
+            name for name, phase in self._queue.desired.items()
+            if name in self._plans
+            and any(w.pbm & bit and w.pvid != state.pvid(self._port) for w in self._plans[name].phase(phase).pvids)
+        ]
+        for name in overridden:
+            del self._queue.desired[name]
+        self._snapshot.async_forget(overridden)
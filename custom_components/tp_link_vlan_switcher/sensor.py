@@ -0,0 +1,240 @@
+import logging
+from typing import Any, Optional
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+from homeassistant.const import EntityCategory, UnitOfDataRate, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN, CONF_PORTS, DATA_METRICS, DATA_PORT_COORDINATOR
+from .coordinator import PortStatus, TPLinkPortStatsCoordinator
+from .entity_base import TPLinkSmartSwitchBaseEntity
+from .metrics import ConnectorMetrics
+from .models import LINK_STATUS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up diagnostic sensors for TP-Link VLAN Switch."""
+    data = hass.data[DOMAIN][config_entry.entry_id]
+    metrics: ConnectorMetrics = data[DATA_METRICS]
+    port_coordinator: TPLinkPortStatsCoordinator = data[DATA_PORT_COORDINATOR]
+    entities = [
+        RequestLatencySensor(config_entry, metrics, 50),
+        RequestLatencySensor(config_entry, metrics, 95),
+        ApplyDurationSensor(config_entry, metrics),
+        LoginCountSensor(config_entry, metrics),
+        SessionReuseSensor(config_entry, metrics),
+        TimeoutCountSensor(config_entry, metrics),
+        ErrorCountSensor(config_entry, metrics),
+    ]
+    # Ports aus der Konfiguration, der erste Poll läuft erst nach dem Setup
+    for port in range(1, (config_entry.data.get(CONF_PORTS) or 0) + 1):
+        entities.append(PortLinkSensor(config_entry, port_coordinator, port))
+        entities.append(PortSpeedSensor(config_entry, port_coordinator, port))
+        for key, name, enabled in PORT_RATES:
+            entities.append(PortRateSensor(config_entry, port_coordinator, port, key, name, enabled))
+    async_add_entities(entities)
+
+
+class TPLinkMetricSensor(TPLinkSmartSwitchBaseEntity, SensorEntity):
+    """Base for diagnostic sensors reading the in-memory connector metrics (no I/O)."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _key: str
+
+    def __init__(self, config_entry, metrics: ConnectorMetrics):
+        super().__init__(config_entry)
+        self._metrics = metrics
+
+    @property
+    def unique_id(self):
+        """Unique ID for this sensor."""
+        return f"{self._ip}_{self._key}"
+
+
+class RequestLatencySensor(TPLinkMetricSensor):
+    """Rolling request latency percentile over all endpoints."""
+
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 0
+
+    def __init__(self, config_entry, metrics: ConnectorMetrics, percentile: int):
+        super().__init__(config_entry, metrics)
+        self._percentile = percentile
+        self._key = f"request_latency_p{percentile}"
+        self._attr_name = f"Request Latency p{percentile}"
+
+    @property
+    def native_value(self) -> Optional[float]:
+        value = self._metrics.requests.percentile(self._percentile)
+        return None if value is None else round(value * 1000, 1)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {endpoint: stats.summary() for endpoint, stats in self._metrics.endpoints.items()}
+
+
+class ApplyDurationSensor(TPLinkMetricSensor):
+    """Duration of the last profile apply, per-profile statistics as attributes."""
+
+    _key = "apply_duration"
+    _attr_name = "Profile Apply Duration"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 0
+
+    @property
+    def native_value(self) -> Optional[float]:
+        value = self._metrics.last_apply.last
+        return None if value is None else round(value * 1000, 1)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {profile: stats.summary() for profile, stats in self._metrics.applies.items()}
+
+
+class LoginCountSensor(TPLinkMetricSensor):
+    """Number of logon.cgi logins."""
+
+    _key = "logins"
+    _attr_name = "Logins"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> int:
+        return self._metrics.logins
+
+
+class SessionReuseSensor(TPLinkMetricSensor):
+    """Number of commands served by an already logged-in session."""
+
+    _key = "session_reuses"
+    _attr_name = "Session Reuses"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> int:
+        return self._metrics.session_reuses
+
+
+class TimeoutCountSensor(TPLinkMetricSensor):
+    """Number of timed out requests."""
+
+    _key = "timeouts"
+    _attr_name = "Request Timeouts"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> int:
+        return self._metrics.timeouts
+
+
+class ErrorCountSensor(TPLinkMetricSensor):
+    """Number of failed requests (connection errors and non-200 config responses)."""
+
+    _key = "errors"
+    _attr_name = "Request Errors"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> int:
+        return self._metrics.errors
+
+
+# ---------------------- Port sensors ----------------------
+# PortStatus attribute, name suffix, enabled by default
+PORT_RATES = (
+    ("tx_good_rate", "TX Packets", True),
+    ("rx_good_rate", "RX Packets", True),
+    ("tx_bad_rate", "TX Errors", False),
+    ("rx_bad_rate", "RX Errors", False),
+)
+
+
+class TPLinkPortSensor(CoordinatorEntity, TPLinkSmartSwitchBaseEntity, SensorEntity):
+    """Base for per-port sensors fed by the shared port statistics coordinator."""
+
+    _key: str
+    _last_available = True
+
+    def __init__(self, config_entry, coordinator: TPLinkPortStatsCoordinator, port: int):
+        CoordinatorEntity.__init__(self, coordinator)
+        TPLinkSmartSwitchBaseEntity.__init__(self, config_entry)
+        self._port = port
+        self._attr_native_value = self._value()
+
+    @property
+    def unique_id(self):
+        """Unique ID for this sensor."""
+        return f"{self._ip}_port{self._port}_{self._key}"
+
+    def _status(self) -> Optional[PortStatus]:
+        return (self.coordinator.data or {}).get(self._port)
+
+    def _value(self):
+        raise NotImplementedError
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Nur bei geänderten Werten einen State schreiben
+        value = self._value()
+        available = self.available
+        if value == self._attr_native_value and available == self._last_available:
+            return
+        self._attr_native_value = value
+        self._last_available = available
+        self.async_write_ha_state()
+
+
+class PortLinkSensor(TPLinkPortSensor):
+    """Link state of a port (down, auto, 10M half ... 1000M full)."""
+
+    _key = "link"
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = [label for label, _ in LINK_STATUS.values()] + ["unknown"]
+
+    def __init__(self, config_entry, coordinator, port: int):
+        self._attr_name = f"Port {port} Link"
+        super().__init__(config_entry, coordinator, port)
+
+    def _value(self) -> Optional[str]:
+        status = self._status()
+        return None if status is None else status.counters.link
+
+
+class PortSpeedSensor(TPLinkPortSensor):
+    """Negotiated link speed of a port."""
+
+    _key = "speed"
+    _attr_device_class = SensorDeviceClass.DATA_RATE
+    _attr_native_unit_of_measurement = UnitOfDataRate.MEGABITS_PER_SECOND
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, config_entry, coordinator, port: int):
+        self._attr_name = f"Port {port} Speed"
+        super().__init__(config_entry, coordinator, port)
+
+    def _value(self) -> Optional[int]:
+        status = self._status()
+        return None if status is None else status.counters.speed
+
+
+class PortRateSensor(TPLinkPortSensor):
+    """Packet rate of one port counter, computed from the delta of two polls."""
+
+    _attr_native_unit_of_measurement = "packets/s"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 1
+
+    def __init__(self, config_entry, coordinator, port: int, key: str, name: str, enabled: bool):
+        self._key = key
+        self._attr_name = f"Port {port} {name}"
+        self._attr_entity_registry_enabled_default = enabled
+        super().__init__(config_entry, coordinator, port)
+
+    def _value(self) -> Optional[float]:
+        status = self._status()
+        return None if status is None else getattr(status, self._key)
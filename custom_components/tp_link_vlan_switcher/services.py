@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from dataclasses import asdict
+
+import aiohttp
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    DOMAIN, CONF_PROFILE, DATA_BROKER, DATA_COORDINATOR, DATA_PLANS, DATA_QUEUE, DATA_BACKUPS, DATA_SNAPSHOT,
+    CONF_BACKUP_RETENTION, DEFAULT_BACKUP_RETENTION,
+    SERVICE_APPLY_SCENE, SERVICE_BACKUP_CONFIG, SERVICE_RESTORE_CONFIG, SERVICE_LIST_BACKUPS,
+    ATTR_CONFIG_ENTRY_ID, ATTR_PROFILES, ATTR_PHASE, ATTR_BACKUP,
+)
+from .backup import BackupError, BackupStore
+from .profile_plan import PHASES, PlanConflictError, ProfilePlan, merge_phase_plans
+from .snapshot import DeviceSnapshot
+from .tp_link_connector import TPLinkError
+
+_LOGGER = logging.getLogger(__name__)
+
+APPLY_SCENE_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_PROFILES): vol.All(cv.ensure_list, [vol.Schema({
+        vol.Required(CONF_PROFILE): cv.string,
+        vol.Optional(ATTR_PHASE, default="turn_on"): vol.In(PHASES),
+    })], vol.Length(min=1)),
+})
+
+ENTRY_SCHEMA = vol.Schema({vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string})
+
+RESTORE_CONFIG_SCHEMA = ENTRY_SCHEMA.extend({vol.Optional(ATTR_BACKUP): cv.string})
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services (once, independent of config entries)."""
+
+    def _entry_data(call: ServiceCall) -> dict:
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        data = hass.data.get(DOMAIN, {}).get(entry_id)
+        if not isinstance(data, dict) or DATA_PLANS not in data:
+            raise ServiceValidationError(f"Config entry {entry_id} is not loaded")
+        return data
+
+    def _retention(call: ServiceCall) -> int:
+        entry = hass.config_entries.async_get_entry(call.data[ATTR_CONFIG_ENTRY_ID])
+        return entry.options.get(CONF_BACKUP_RETENTION, DEFAULT_BACKUP_RETENTION)
+
+    async def _async_apply_scene(call: ServiceCall) -> None:
+        data = _entry_data(call)
+
+        parts = []
+        members = []
+        for item in call.data[ATTR_PROFILES]:
+            name, phase = item[CONF_PROFILE], item[ATTR_PHASE]
+            plan = data[DATA_PLANS].get(name)
+            if plan is None:
+                raise ServiceValidationError(f"Unknown profile '{name}'")
+            parts.append((f"{name}/{phase}", plan.phase(phase)))
+            members.append((name, phase))
+
+        # Konflikte werden erkannt, bevor ein einziger Request gesendet wird
+        try:
+            merged = merge_phase_plans(parts)
+        except PlanConflictError as e:
+            raise ServiceValidationError(f"Scene conflict: {e}") from e
+
+        label = "scene " + " + ".join(label for label, _ in parts)
+        _LOGGER.debug("Applying %s as %s VLAN and %s PVID writes", label, len(merged.vlans), len(merged.pvids))
+        scene = ProfilePlan(name=label, turn_on=merged, turn_off=merged)
+        # Die Queue merkt sich die einzelnen Profil-Phasen, nicht die Szene
+        if not await data[DATA_QUEUE].async_submit(scene, "turn_on", tuple(members)):
+            raise HomeAssistantError(f"{label} could not be applied (changes were rolled back)")
+        # Sofort pollen, async_request_refresh hängt im Debouncer-Cooldown
+        await data[DATA_COORDINATOR].async_refresh()
+
+    # ---------------------- Config backup ----------------------
+    async def _async_backup_config(call: ServiceCall) -> ServiceResponse:
+        data = _entry_data(call)
+        backups: BackupStore = hass.data[DOMAIN][DATA_BACKUPS]
+        try:
+            record = await backups.async_backup(
+                call.data[ATTR_CONFIG_ENTRY_ID], data[DATA_BROKER], "manual", _retention(call)
+            )
+        except (TPLinkError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            raise HomeAssistantError(f"Config backup failed: {e}") from e
+        return asdict(record)
+
+    async def _async_restore_config(call: ServiceCall) -> None:
+        data = _entry_data(call)
+        backups: BackupStore = hass.data[DOMAIN][DATA_BACKUPS]
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        try:
+            backups.find(entry_id, call.data.get(ATTR_BACKUP))
+        except BackupError as e:
+            raise ServiceValidationError(str(e)) from e
+        try:
+            ok = await backups.async_restore(entry_id, data[DATA_BROKER], call.data.get(ATTR_BACKUP), _retention(call))
+        except (TPLinkError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            raise HomeAssistantError(f"Config restore failed: {e}") from e
+        if not ok:
+            raise HomeAssistantError("The switch did not come back after the config restore")
+        # Die Phasen vor dem Restore gelten nicht mehr: der nächste Neustart leitet sie aus den neuen Tabellen ab
+        data[DATA_QUEUE].desired.clear()
+        snapshot: DeviceSnapshot = data[DATA_SNAPSHOT]
+        snapshot.async_forget(list(snapshot.applied))
+        await data[DATA_COORDINATOR].async_refresh()
+
+    async def _async_list_backups(call: ServiceCall) -> ServiceResponse:
+        _entry_data(call)
+        backups: BackupStore = hass.data[DOMAIN][DATA_BACKUPS]
+        return {"backups": [asdict(r) for r in reversed(backups.backups(call.data[ATTR_CONFIG_ENTRY_ID]))]}
+
+    hass.services.async_register(DOMAIN, SERVICE_APPLY_SCENE, _async_apply_scene, schema=APPLY_SCENE_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_BACKUP_CONFIG, _async_backup_config, schema=ENTRY_SCHEMA,
+                                 supports_response=SupportsResponse.OPTIONAL)
+    hass.services.async_register(DOMAIN, SERVICE_RESTORE_CONFIG, _async_restore_config,
+                                 schema=RESTORE_CONFIG_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_LIST_BACKUPS, _async_list_backups, schema=ENTRY_SCHEMA,
+                                 supports_response=SupportsResponse.ONLY)
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, TypeVar, Union
+
+import aiohttp
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .circuit_breaker import CircuitBreaker
+from .const import (
+    DEFAULT_SESSION_IDLE_TIMEOUT,
+    REBOOT_INITIAL_DELAY, REBOOT_DOWN_POLL, REBOOT_POLL_MIN, REBOOT_POLL_MAX, REBOOT_TIMEOUT,
+)
+from .tp_link_connector import AsyncTPLinkConnector, TPLinkError, TPLinkSessionExpired, TPLinkUnavailable
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TPLinkSessionBroker:
+    """Keeps one authenticated web session per switch and shares it between all entities."""
+
+    def __init__(self, hass: HomeAssistant,
+                 connector: Union[AsyncTPLinkConnector, Callable[[], AsyncTPLinkConnector]],
+                 idle_timeout: float = DEFAULT_SESSION_IDLE_TIMEOUT):
+        self._hass = hass
+        # A factory defers building the connector (and the HTTP session) to the first request
+        if isinstance(connector, AsyncTPLinkConnector):
+            self._connector, self._factory = connector, None
+        else:
+            self._connector, self._factory = None, connector
+        self._idle_timeout = idle_timeout
+        self._lock = asyncio.Lock()
+        self._logged_in = False
+        self._cancel_idle: Optional[Callable[[], None]] = None
+        self._cancel_probe: Optional[Callable[[], None]] = None
+        self.breaker = CircuitBreaker()
+
+    @property
+    def connector(self) -> AsyncTPLinkConnector:
+        if self._connector is None:
+            self._connector = self._factory()
+        return self._connector
+
+    @property
+    def logged_in(self) -> bool:
+        return self._logged_in
+
+    # ---------------------- Run ----------------------
+    async def async_run(self, func: Callable[[AsyncTPLinkConnector], Awaitable[T]]) -> T:
+        """
+        Run func on the shared, logged-in connector (re-login once if the session expired).
+
+        Raises TPLinkUnavailable right away while the circuit breaker is open.
+        """
+        self._check_available()
+        async with self._lock:
+            # the breaker may have opened while waiting for the lock
+            self._check_available()
+            self._cancel_idle_timer()
+            try:
+                connector = self.connector
+                if not self._logged_in:
+                    await self._login()
+                else:
+                    connector.metrics.session_reuses += 1
+                try:
+                    result = await func(connector)
+                except TPLinkSessionExpired:
+                    _LOGGER.debug("Session on %s expired, logging in again", connector.ip)
+                    self._logged_in = False
+                    await self._login()
+                    result = await func(connector)
+                self.breaker.record_success()
+                return result
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self._record_failure()
+                raise
+            finally:
+                if self._logged_in:
+                    self._schedule_idle_close()
+
+    async def _login(self) -> None:
+        await self._connector.ensure_login()
+        self._logged_in = True
+
+    # ---------------------- Circuit breaker ----------------------
+    def _check_available(self) -> None:
+        if not self.breaker.available:
+            raise TPLinkUnavailable(
+                f"{self.connector.ip} is unreachable, next check in {self.breaker.retry_in:.0f}s"
+            )
+
+    @callback
+    def _record_failure(self) -> None:
+        if self.breaker.record_failure():
+            _LOGGER.warning("%s failed %s times in a row, rejecting commands until it answers again",
+                            self._connector.ip, self.breaker.failures)
+            # Die Web-Session ist nach einem Ausfall ohnehin weg
+            self._logged_in = False
+            self._schedule_probe()
+
+    @callback
+    def _schedule_probe(self) -> None:
+        self._cancel_probe = async_call_later(self._hass, self.breaker.retry_in, self._probe_due)
+
+    @callback
+    def _probe_due(self, _now) -> None:
+        self._cancel_probe = None
+        if self.breaker.try_probe():
+            self._hass.async_create_background_task(
+                self._async_probe(), f"tp_link_vlan_switcher probe {self._connector.ip}"
+            )
+        elif not self.breaker.available:
+            self._schedule_probe()
+
+    async def _async_probe(self) -> None:
+        """Half-open check with one cheap request; reschedule with a longer backoff on failure."""
+        if await self._connector.probe():
+            _LOGGER.info("%s reachable again", self._connector.ip)
+            self.breaker.record_success()
+            return
+        self.breaker.record_failure()
+        _LOGGER.debug("%s still unreachable, next check in %.0fs", self._connector.ip, self.breaker.retry_in)
+        self._schedule_probe()
+
+    # ---------------------- Reboot ----------------------
+    async def async_reboot(self, timeout: float = REBOOT_TIMEOUT,
+                           trigger: Optional[Callable[[AsyncTPLinkConnector], Awaitable[Any]]] = None) -> bool:
+        """
+        Reboot the switch and wait until it accepts a login again.
+
+        trigger replaces the reboot request, e.g. a config upload the switch reboots after.
+        The breaker is in maintenance meanwhile, so all entities are unavailable and other
+        commands fail fast. Returns True with a logged-in session once the switch went down
+        and is back; False if it never went down (the request did not take effect) or did
+        not come back within timeout, then the breaker opens and probing takes over.
+        """
+        await self.async_run(trigger or (lambda connector: connector.reboot()))
+        self.breaker.suspend()
+        async with self._lock:
+            self._cancel_idle_timer()
+            self._logged_in = False
+            if not await self._async_wait_down():
+                _LOGGER.warning("%s did not go down within %.0fs, the reboot did not take effect",
+                                self._connector.ip, REBOOT_INITIAL_DELAY)
+                self.breaker.resume()
+                return False
+            ready = await self._async_wait_ready(timeout)
+            if ready:
+                self._schedule_idle_close()
+        if ready:
+            _LOGGER.info("%s is back after the reboot", self._connector.ip)
+            self.breaker.resume()
+        else:
+            _LOGGER.warning("%s did not come back within %.0fs after the reboot", self._connector.ip, timeout)
+            self.breaker.trip()
+            self._schedule_probe()
+        return ready
+
+    async def _async_wait_down(self) -> bool:
+        """True once the switch stopped answering, False if it still answers after REBOOT_INITIAL_DELAY."""
+        # Erst wenn der Switch wirklich weg war, zählt eine Antwort als "wieder da"
+        loop = asyncio.get_running_loop()
+        down_deadline = loop.time() + REBOOT_INITIAL_DELAY
+        while await self._connector.probe():
+            if loop.time() >= down_deadline:
+                return False
+            await asyncio.sleep(REBOOT_DOWN_POLL)
+        return True
+
+    async def _async_wait_ready(self, timeout: float) -> bool:
+        """Poll with exponential backoff until the web server answers and login works."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = REBOOT_POLL_MIN
+
+        while True:
+            if await self._connector.probe():
+                try:
+                    await self._login()
+                    return True
+                except (TPLinkError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    _LOGGER.debug("%s answers but login failed yet: %s", self._connector.ip, e)
+            if loop.time() + delay > deadline:
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, REBOOT_POLL_MAX)
+
+    # ---------------------- Close ----------------------
+    async def async_close(self) -> None:
+        """Logout and drop the session (idle timeout or unload)."""
+        self._cancel_idle_timer()
+        if self._cancel_probe is not None:
+            self._cancel_probe()
+            self._cancel_probe = None
+        async with self._lock:
+            if self._logged_in:
+                self._logged_in = False
+                await self._connector.logout()
+
+    @callback
+    def _schedule_idle_close(self) -> None:
+        self._cancel_idle = async_call_later(self._hass, self._idle_timeout, self._idle_close)
+
+    @callback
+    def _idle_close(self, _now) -> None:
+        self._cancel_idle = None
+        _LOGGER.debug("Closing idle session on %s", self._connector.ip)
+        self._hass.async_create_task(self.async_close())
+
+    @callback
+    def _cancel_idle_timer(self) -> None:
+        if self._cancel_idle is not None:
+            self._cancel_idle()
+            self._cancel_idle = None
@@ -0,0 +1,94 @@
+import logging
+from typing import Any, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, SNAPSHOT_SAVE_DELAY
+from .models import SwitchVlanState
+from .tp_link_connector import Phase
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+
+class DeviceSnapshot:
+    """
+    Last known VLAN/PVID tables and applied profile phases of one switch.
+
+    Persisted in .storage/tp_link_vlan_switcher.<entry_id>, so entities can show the right
+    state on startup before the first poll. Writes are delayed and coalesced.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        self.state: Optional[SwitchVlanState] = None
+        self.applied: dict[str, dict[str, str]] = {}   # profile -> {"phase", "at"}
+        self.timestamp: Optional[str] = None
+        self._dirty = False
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load()
+        if not data:
+            return
+        try:
+            if data.get("state") is not None:
+                self.state = SwitchVlanState.from_dict(data["state"])
+            self.applied = dict(data.get("applied") or {})
+            self.timestamp = data.get("timestamp")
+        except (TypeError, ValueError, KeyError) as e:
+            _LOGGER.warning("Ignoring unreadable snapshot %s: %s", self._store.key, e)
+            self.state, self.applied, self.timestamp = None, {}, None
+
+    async def async_flush(self) -> None:
+        """Write a pending delayed save now (on unload)."""
+        if self._dirty:
+            await self._store.async_save(self._data())
+
+    async def async_remove(self) -> None:
+        await self._store.async_remove()
+
+    @property
+    def desired(self) -> dict[str, Phase]:
+        """Last applied phase per profile."""
+        return {name: rec["phase"] for name, rec in self.applied.items() if "phase" in rec}
+
+    # ---------------------- Updates ----------------------
+    @callback
+    def async_update_state(self, state: SwitchVlanState) -> None:
+        """Record polled tables; only schedules a write if they changed."""
+        if state == self.state:
+            return
+        self.state = state
+        self._async_schedule_save()
+
+    @callback
+    def async_record_apply(self, name: str, phase: Phase) -> None:
+        self.applied[name] = {"phase": phase, "at": dt_util.utcnow().isoformat()}
+        self._async_schedule_save()
+
+    @callback
+    def async_forget(self, names) -> None:
+        """Drop the applied phases of removed profiles."""
+        removed = False
+        for name in list(names):
+            if self.applied.pop(name, None) is not None:
+                removed = True
+        if removed:
+            self._async_schedule_save()
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        self.timestamp = dt_util.utcnow().isoformat()
+        self._dirty = True
+        self._store.async_delay_save(self._data, SNAPSHOT_SAVE_DELAY)
+
+    def _data(self) -> dict[str, Any]:
+        self._dirty = False
+        return {
+            "timestamp": self.timestamp,
+            "state": None if self.state is None else self.state.as_dict(),
+            "applied": self.applied,
+        }
@@ -2,97 +2,294 @@ import logging
 from typing import Any, Dict
 
 from homeassistant.components.switch import SwitchEntity
+from homeassistant.const import STATE_ON
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
-from .const import DOMAIN, CONF_VLANS, CONF_PVID
+from .const import (
+    DOMAIN, CONF_SWITCHES, CONF_GROUPS, CONF_MEMBERS, CONF_PROFILE, CONF_MAX_CONCURRENCY,
+    DEFAULT_GROUP_CONCURRENCY, DATA_BROKER, DATA_COORDINATOR, DATA_PLANS, DATA_QUEUE, DATA_SWITCH_MANAGER,
+    SIGNAL_ENTRIES_CHANGED,
+)
+from .command_queue import DeviceCommandQueue
+from .coordinator import TPLinkVlanCoordinator
 from .entity_base import TPLinkSmartSwitchBaseEntity
-from .tp_link_connector import TPLinkConnector, Phase
+from .group import RESULT_OK, async_apply_group
+from .profile_plan import ProfilePlan
+from .tp_link_connector import Phase
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    data = entry.data
     options = entry.options or {}
 
-    switches: Dict[str, Dict[str, Any]] = options.get("switches", {})
-    if not switches:
+    switches: Dict[str, Dict[str, Any]] = options.get(CONF_SWITCHES, {})
+    groups: Dict[str, Dict[str, Any]] = options.get(CONF_GROUPS, {})
+    data = hass.data[DOMAIN][entry.entry_id]
+    manager = data[DATA_SWITCH_MANAGER] = ProfileSwitchManager(hass, entry, async_add_entities)
+    if not switches and not groups:
         _LOGGER.debug("[%s] Keine Switch-Profile in options -> keine Entitäten", entry.entry_id)
         return
+    manager.async_update(data[DATA_PLANS], groups)
 
-    entities = []
-    for name, cfg in switches.items():
-        vlans = cfg.get(CONF_VLANS, {}) or {}
-        pvid = cfg.get(CONF_PVID, {}) or {}
-
-        entities.append(
-            VLANProfileSwitch(
-                config_entry=entry,
-                name=name,
-                vlans=vlans,
-                pvid=pvid,
-            )
-        )
-    async_add_entities(entities)
 
+class ProfileSwitchManager:
+    """
+    Profile and group switches of one entry.
 
-class VLANProfileSwitch(TPLinkSmartSwitchBaseEntity, SwitchEntity):
-    def __init__(self, config_entry, name: str, vlans: dict, pvid: dict):
-        super().__init__(config_entry)
+    On an options change only the affected entities are added, removed or given their new
+    plan; all others keep their state, and the entry keeps its session and coordinator.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry, async_add_entities: AddEntitiesCallback):
+        self._hass = hass
+        self._entry = entry
+        self._add_entities = async_add_entities
+        data = hass.data[DOMAIN][entry.entry_id]
+        self._queue: DeviceCommandQueue = data[DATA_QUEUE]
+        self._coordinator: TPLinkVlanCoordinator = data[DATA_COORDINATOR]
+        self._profiles: dict[str, VLANProfileSwitch] = {}
+        self._groups: dict[str, VLANGroupProfileSwitch] = {}
+
+    @callback
+    def async_update(self, plans: Dict[str, ProfilePlan], groups: Dict[str, Dict[str, Any]]) -> None:
+        new: list[Entity] = []
+        for name in self._profiles.keys() - plans.keys():
+            self._async_remove(self._profiles.pop(name))
+        for name, plan in plans.items():
+            entity = self._profiles.get(name)
+            if entity is None:
+                entity = self._profiles[name] = VLANProfileSwitch(self._entry, self._queue, self._coordinator, plan)
+                new.append(entity)
+            elif entity.plan != plan:
+                entity.async_set_plan(plan)
+
+        for name in self._groups.keys() - groups.keys():
+            self._async_remove(self._groups.pop(name))
+        for name, cfg in groups.items():
+            entity = self._groups.get(name)
+            if entity is None:
+                entity = self._groups[name] = VLANGroupProfileSwitch(self._entry, name, cfg)
+                new.append(entity)
+            else:
+                entity.async_set_config(cfg)
+
+        if new:
+            self._add_entities(new)
 
+    @callback
+    def _async_remove(self, entity: Entity) -> None:
+        # Aus der Registry entfernen, sonst bleibt eine "nicht verfügbar"-Leiche stehen
+        registry = er.async_get(self._hass)
+        if entity.registry_entry is not None and registry.async_get(entity.entity_id) is not None:
+            registry.async_remove(entity.entity_id)
+        elif entity.hass is not None:
+            self._hass.async_create_task(entity.async_remove())
+
+
+class VLANProfileSwitch(CoordinatorEntity[TPLinkVlanCoordinator], TPLinkSmartSwitchBaseEntity,
+                        SwitchEntity, RestoreEntity):
+    def __init__(self, config_entry, queue: DeviceCommandQueue,
+                 coordinator: TPLinkVlanCoordinator, plan: ProfilePlan):
+        CoordinatorEntity.__init__(self, coordinator)
+        TPLinkSmartSwitchBaseEntity.__init__(self, config_entry)
+
+        name = plan.name
         self._profile_name = name
-        self._vlans = vlans        # {"turn_on": [...], "turn_off": [...]}
-        self._pvid = pvid          # {"turn_on": {...}, "turn_off": {...}}
+        self._plan = plan          # kompilierte Requests für turn_on / turn_off
         self._is_on = False
+        self._matched = False      # True sobald eine Phase in den Tabellen erkannt wurde
+        self._update_from_state()
 
         self._attr_name = name
         self._attr_unique_id = f"{config_entry.entry_id}_{slugify(name)}"
 
-        # TPLinkConnector initialisieren
-        self._connector = TPLinkConnector(self._ip, self._user, self._pwd)
+        # Gemeinsame Befehlswarteschlange des Geräts
+        self._queue = queue
 
     @property
     def is_on(self) -> bool:
         return self._is_on
 
+    @property
+    def plan(self) -> ProfilePlan:
+        return self._plan
+
+    @callback
+    def async_set_plan(self, plan: ProfilePlan) -> None:
+        """Switch to an edited profile without re-creating the entity."""
+        self._plan = plan
+        self._matched = False
+        self._update_from_state()
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Ohne erkennbare Phase im Snapshot den Zustand vor dem Neustart übernehmen
+        if not self._matched and (last := await self.async_get_last_state()) is not None:
+            self._is_on = last.state == STATE_ON
+
+    # ---------------------- Status ----------------------
+    def _update_from_state(self) -> None:
+        """Derive on/off from the polled tables; keep the last state if neither phase matches."""
+        state = self.coordinator.data
+        if state is None:
+            return
+        if self._plan.turn_on.matches(state):
+            self._is_on = self._matched = True
+        elif self._plan.turn_off.matches(state):
+            self._is_on, self._matched = False, True
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._update_from_state()
+        super()._handle_coordinator_update()
+
     async def async_turn_on(self, **kwargs):
-        ok = await self.hass.async_add_executor_job(self._apply_profile, "turn_on")
+        ok = await self._apply_profile("turn_on")
         if ok:
             self._is_on = True
             self.async_write_ha_state()
+            await self.coordinator.async_request_refresh()
 
     async def async_turn_off(self, **kwargs):
-        ok = await self.hass.async_add_executor_job(self._apply_profile, "turn_off")
+        ok = await self._apply_profile("turn_off")
         if ok:
             self._is_on = False
             self.async_write_ha_state()
-
-    # async def async_update(self):
-    #     """HA calls this to refresh the state."""
-    #     await self.hass.async_add_executor_job(self.update_status)
-    #     self.async_write_ha_state()
-    #
-    # def update_status(self):
-    #     """
-    #     Read current switch configuration and update self._is_on.
-    #     If no status-API is available, fallback to last known state.
-    #     """
-    #     try:
-    #         self._connector._start_session()
-    #         # TODO: Hier echte Status-Abfrage einbauen, z.B.:
-    #         # response = self._connector._session.get(f"http://{self._ip}/status.cgi")
-    #         # parse response -> self._is_on = True/False
-    #         # Fallback: Beibehalten des letzten bekannten Status
-    #     except Exception as e:
-    #         _LOGGER.warning("Could not read switch status for '%s': %s", self._profile_name, e)
-    #     finally:
-    #         self._connector._close_session()
+            await self.coordinator.async_request_refresh()
 
     # ---------------------- Profile anwenden ----------------------
-    def _apply_profile(self, phase: Phase) -> bool:
-        """Apply VLAN + PVID using TPLinkConnector."""
+    async def _apply_profile(self, phase: Phase) -> bool:
+        """Apply VLAN + PVID through the device command queue."""
         try:
-            return self._connector.apply_profile(self._vlans, self._pvid, phase)
+            return await self._queue.async_submit(self._plan, phase)
         except Exception as e:
             _LOGGER.exception("Fehler beim Anwenden des Profils %s auf %s: %s", phase, self._profile_name, e)
             return False
+
+
+class VLANGroupProfileSwitch(TPLinkSmartSwitchBaseEntity, SwitchEntity, RestoreEntity):
+    """Applies a profile of the same name on several switches concurrently."""
+
+    def __init__(self, config_entry, name: str, cfg: dict):
+        super().__init__(config_entry)
+
+        self._name = name
+        self._results: dict[str, str] = {}
+        self._is_on = False
+        self._unsub_members: list[CALLBACK_TYPE] = []
+        self._set_config(cfg)
+
+        self._attr_name = name
+        self._attr_unique_id = f"{config_entry.entry_id}_group_{slugify(name)}"
+
+    def _set_config(self, cfg: dict) -> None:
+        self._members: list[str] = list(cfg.get(CONF_MEMBERS, []))
+        self._profile = cfg.get(CONF_PROFILE, self._name)
+        self._max_concurrency = cfg.get(CONF_MAX_CONCURRENCY, DEFAULT_GROUP_CONCURRENCY)
+
+    @callback
+    def async_set_config(self, cfg: dict) -> None:
+        """Apply edited group options in place."""
+        before = (self._members, self._profile, self._max_concurrency)
+        self._set_config(cfg)
+        if self.hass is not None and before != (self._members, self._profile, self._max_concurrency):
+            self._async_track_members()
+            self.async_write_ha_state()
+
+    @property
+    def is_on(self) -> bool:
+        return self._is_on
+
+    @property
+    def available(self) -> bool:
+        # Nicht der Breaker des eigenen Eintrags zählt, sondern die der Mitglieder
+        return self.hass is not None and any(self._member_available(entry_id) for entry_id in self._members)
+
+    def _member_available(self, entry_id: str) -> bool:
+        data = self.hass.data.get(DOMAIN, {}).get(entry_id)
+        return data is not None and data[DATA_BROKER].breaker.available
+
+    @callback
+    def _async_track_members(self) -> None:
+        """Follow the breakers of the currently loaded members."""
+        for unsub in self._unsub_members:
+            unsub()
+        self._unsub_members = [
+            data[DATA_BROKER].breaker.add_listener(self.async_write_ha_state)
+            for entry_id in self._members
+            if (data := self.hass.data.get(DOMAIN, {}).get(entry_id)) is not None
+        ]
+
+    @callback
+    def _async_entries_changed(self) -> None:
+        self._async_track_members()
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {
+            "profile": self._profile,
+            "members": self._members,
+            "results": self._results,
+        }
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Gruppen haben keinen eigenen Poll, daher den letzten Zustand wiederherstellen
+        if (last := await self.async_get_last_state()) is not None:
+            self._is_on = last.state == STATE_ON
+            self._results = dict(last.attributes.get("results") or {})
+        self._async_track_members()
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, SIGNAL_ENTRIES_CHANGED, self._async_entries_changed)
+        )
+
+    async def async_will_remove_from_hass(self) -> None:
+        for unsub in self._unsub_members:
+            unsub()
+        self._unsub_members = []
+        await super().async_will_remove_from_hass()
+
+    async def async_turn_on(self, **kwargs):
+        await self._apply_group("turn_on")
+
+    async def async_turn_off(self, **kwargs):
+        await self._apply_group("turn_off")
+
+    async def _apply_group(self, phase: Phase) -> None:
+        """
+        Apply on all members; the state follows only if every member succeeded.
+
+        On a (partial) failure the state stays as it was, the results attribute tells which
+        member did what and a HomeAssistantError names the failed members.
+        """
+        results = await async_apply_group(
+            self.hass, self._members, self._profile, phase, self._max_concurrency
+        )
+        self._results = {
+            self._member_title(entry_id): result for entry_id, result in results.items()
+        }
+        failed = [title for title, result in self._results.items() if result != RESULT_OK]
+        if not failed:
+            self._is_on = phase == "turn_on"
+        self.async_write_ha_state()
+        if failed:
+            raise HomeAssistantError(
+                f"Group {self._name}: {phase} failed on {len(failed)} of {len(self._results)} "
+                f"switches ({', '.join(failed)})"
+            )
+
+    def _member_title(self, entry_id: str) -> str:
+        entry = self.hass.config_entries.async_get_entry(entry_id)
+        return entry.title if entry else entry_id
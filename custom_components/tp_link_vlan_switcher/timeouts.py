@@ -0,0 +1,117 @@
+from typing import Optional
+
+import aiohttp
+
+from .const import (
+    DEFAULT_TIMEOUT_MIN, DEFAULT_TIMEOUT_MAX, INITIAL_TIMEOUT, CONNECT_TIMEOUT_MIN, CONNECT_TIMEOUT_MAX,
+)
+
+# RFC 6298 gains and variance factor
+ALPHA = 1 / 8
+BETA = 1 / 4
+K = 4
+# Lower bound of the variance term (timer granularity)
+GRANULARITY = 0.01
+
+
+class RttEstimator:
+    """Smoothed round-trip time and its variance (RFC 6298) with timeout backoff."""
+
+    __slots__ = ("srtt", "rttvar", "_backoff")
+
+    def __init__(self):
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self._backoff = 1
+
+    def observe(self, rtt: float) -> None:
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * rtt
+        self._backoff = 1
+
+    def on_timeout(self) -> None:
+        # Nach einem Timeout doppelt so lange warten, bis wieder ein Sample kommt
+        self._backoff = min(self._backoff * 2, 64)
+
+    def rto(self, floor: float, ceiling: float) -> Optional[float]:
+        """Retransmission timeout clamped to [floor, ceiling], None without samples."""
+        if self.srtt is None:
+            return None
+        rto = self.srtt + max(GRANULARITY, K * self.rttvar)
+        return min(ceiling, max(floor, rto) * self._backoff)
+
+
+class AdaptiveTimeouts:
+    """
+    Request timeouts of one switch derived from measured round-trip times.
+
+    Every endpoint has its own estimator; endpoints without samples fall back to the
+    estimator over all requests, and to INITIAL_TIMEOUT while nothing was measured yet.
+    The connect timeout follows the device-wide estimator within its own bounds.
+    """
+
+    def __init__(self, floor: float = DEFAULT_TIMEOUT_MIN, ceiling: float = DEFAULT_TIMEOUT_MAX,
+                 connect_floor: float = CONNECT_TIMEOUT_MIN, connect_ceiling: float = CONNECT_TIMEOUT_MAX):
+        self.floor = floor
+        self.ceiling = max(floor, ceiling)
+        self.connect_floor = connect_floor
+        self.connect_ceiling = max(connect_floor, connect_ceiling)
+        self.device = RttEstimator()
+        self.endpoints: dict[str, RttEstimator] = {}
+
+    def _endpoint(self, endpoint: str) -> RttEstimator:
+        est = self.endpoints.get(endpoint)
+        if est is None:
+            est = self.endpoints[endpoint] = RttEstimator()
+        return est
+
+    def read_timeout(self, endpoint: str) -> float:
+        est = self.endpoints.get(endpoint)
+        rto = est.rto(self.floor, self.ceiling) if est is not None else None
+        if rto is None:
+            rto = self.device.rto(self.floor, self.ceiling)
+        return min(self.ceiling, max(self.floor, INITIAL_TIMEOUT)) if rto is None else rto
+
+    def connect_timeout(self) -> float:
+        rto = self.device.rto(self.connect_floor, self.connect_ceiling)
+        return self.connect_ceiling if rto is None else rto
+
+    def client_timeout(self, endpoint: str, remaining: Optional[float] = None) -> aiohttp.ClientTimeout:
+        """
+        ClientTimeout for endpoint, cut down to `remaining` seconds of an apply deadline.
+
+        Before the first sample INITIAL_TIMEOUT is the whole budget, connect included, so an
+        unreachable switch costs no more than with the former fixed timeout.
+        """
+        connect = self.connect_timeout()
+        if self.device.srtt is None:
+            total = self.read_timeout(endpoint)
+            connect = min(connect, total)
+        else:
+            total = connect + self.read_timeout(endpoint)
+        if remaining is not None:
+            total = min(total, remaining)
+            connect = min(connect, remaining)
+        return aiohttp.ClientTimeout(total=total, sock_connect=connect)
+
+    def observe(self, endpoint: str, rtt: float) -> None:
+        self.device.observe(rtt)
+        self._endpoint(endpoint).observe(rtt)
+
+    def on_timeout(self, endpoint: str) -> None:
+        self.device.on_timeout()
+        self._endpoint(endpoint).on_timeout()
+
+    def summary(self) -> dict:
+        return {
+            endpoint: {
+                "srtt_ms": None if est.srtt is None else round(est.srtt * 1000, 1),
+                "rttvar_ms": None if est.rttvar is None else round(est.rttvar * 1000, 1),
+                "timeout_s": round(self.read_timeout(endpoint), 2),
+            }
+            for endpoint, est in self.endpoints.items()
+        }
@@ -1,107 +1,560 @@
+import asyncio
+import contextlib
 import logging
-import requests
-from typing import Dict, Any, Optional, Literal
+import re
+import time
+import aiohttp
+from typing import IO, AsyncContextManager, TYPE_CHECKING, Awaitable, Callable, Dict, Any, Optional, Literal, Union
+
+from .const import BACKUP_CHUNK_SIZE
+from .metrics import ConnectorMetrics
+from .timeouts import AdaptiveTimeouts
+from .models import (
+    PORT_NOT_MEMBER, PortCounters, SwitchVlanState, parse_port_counters, parse_vlan_state
+)
+from .profile_plan import (
+    PhasePlan, PvidWrite, VlanWrite, compile_pvids, compile_vlans, pvid_query, vlan_delete_query, vlan_query
+)
+from .utils import ParseCache, extract_js_object_field, parse_js_object
+
+if TYPE_CHECKING:
+    from .recorder import HttpRecorder, ReplaySession
 
 _LOGGER = logging.getLogger(__name__)
 
 Phase = Literal["turn_on", "turn_off"]
 
-class TPLinkConnector:
-    """Handles TP-Link login, VLAN and PVID configuration with clean session management."""
+LOGIN_PATTERN = re.compile(
+    r"var\s+logonInfo\s*=\s*new\s+Array\s*\(\s*(\d+)\s*,", re.IGNORECASE
+)
+
+# Easy Smart switches answer config pages with the login page once the web session is gone
+SESSION_EXPIRED_PATTERN = re.compile(r"var\s+logonInfo\s*=", re.IGNORECASE)
+
+# 802.1Q read pages and their embedded JS objects
+VLAN_PAGE = "Vlan8021QRpm.htm"
+VLAN_OBJECT = "qvlan_ds"
+PVID_PAGE = "Vlan8021QPvidRpm.htm"
+PVID_OBJECT = "pvid_ds"
+PORT_STATS_PAGE = "PortStatisticsRpm.htm"
+PORT_STATS_OBJECT = "all_info"
+REBOOT_PATH = "reboot.cgi"
+REBOOT_QUERY = (("reboot_op", "reboot"), ("save_op", "true"))
+# Config backup download (binary file) and restore upload (multipart, switch reboots afterwards)
+CONFIG_BACKUP_PATH = "config_back.cgi"
+CONFIG_BACKUP_QUERY = (("btnBackup", "Backup"),)
+CONFIG_RESTORE_PATH = "conf_restore.cgi"
+CONFIG_RESTORE_FIELD = "configfile"
+
+# Fixed timeout of the reachability probe; all other requests use AdaptiveTimeouts
+PROBE_TIMEOUT = 3
+
+
+class TPLinkError(Exception):
+    """Base error for TP-Link switch communication."""
+
+
+class TPLinkLoginError(TPLinkError):
+    """Login to the switch web interface failed."""
+
 
-    def __init__(self, ip: str, username: str, password: str):
+class TPLinkSessionExpired(TPLinkError):
+    """The switch answered with its login page, i.e. the web session is gone."""
+
+
+class TPLinkApplyError(TPLinkError):
+    """A profile could not be applied completely (changes were rolled back)."""
+
+
+class TPLinkUnavailable(TPLinkError):
+    """The switch is considered down (circuit open), the command was not sent."""
+
+
+class TPLinkDeadlineExceeded(TPLinkError):
+    """The deadline of a profile apply ran out before all requests were answered."""
+
+
+class AsyncTPLinkConnector:
+    """Async-native TP-Link connector on top of a (shared) aiohttp client session."""
+
+    def __init__(self, session: Union[aiohttp.ClientSession, "ReplaySession"], ip: str,
+                 username: str, password: str,
+                 metrics: Optional[ConnectorMetrics] = None,
+                 timeouts: Optional[AdaptiveTimeouts] = None,
+                 apply_deadline: Optional[float] = None,
+                 limiter: Optional[AsyncContextManager] = None,
+                 recorder: Optional["HttpRecorder"] = None):
+        # session may also be a ReplaySession serving a recorded trace
+        self._http = session if recorder is None else recorder.wrap(session)
         self._ip = ip
         self._user = username
         self._pwd = password
-        self._session: Optional[requests.Session] = None
+        self._base_url = f"http://{ip}/"
+        self.metrics = metrics or ConnectorMetrics()
+        self.timeouts = timeouts or AdaptiveTimeouts()
+        # Seconds one execute_plan may take (None = only the per-request timeouts)
+        self.apply_deadline = apply_deadline
+        self._deadline: Optional[float] = None
+        # Plan interrupted by a session expiry with its first snapshot and journals, resumed
+        # by the broker's re-run after the re-login
+        self._interrupted: Optional[tuple[PhasePlan, SwitchVlanState, list[VlanWrite], list[int]]] = None
+        # Shared with the connectors of all switches: caps requests in flight fleet-wide
+        self._limiter = limiter or contextlib.nullcontext()
+        self.parse_cache = ParseCache()
+        # Last VLAN/PVID tables read from the switch
+        self.vlan_state: Optional[SwitchVlanState] = None
+
+    @property
+    def ip(self) -> str:
+        return self._ip
 
-    # ---------------------- Session Management ----------------------
-    def _start_session(self) -> None:
-        if self._session is None:
-            self._session = requests.Session()
+    # ---------------------- HTTP ----------------------
+    def _client_timeout(self, endpoint: str) -> aiohttp.ClientTimeout:
+        """RTT based timeout for endpoint, limited by the running apply deadline."""
+        if self._deadline is None:
+            return self.timeouts.client_timeout(endpoint)
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            raise TPLinkDeadlineExceeded(f"Apply deadline on {self._ip} exceeded before {endpoint}")
+        return self.timeouts.client_timeout(endpoint, remaining)
 
-    def _close_session(self) -> None:
-        if self._session:
+    def _on_timeout(self, endpoint: str) -> None:
+        self.metrics.timeouts += 1
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            # cut short by the apply deadline, says nothing about the switch
+            raise TPLinkDeadlineExceeded(f"Apply deadline on {self._ip} exceeded during {endpoint}")
+        self.timeouts.on_timeout(endpoint)
+
+    def _on_response(self, endpoint: str, duration: float) -> None:
+        self.metrics.record_request(endpoint, duration)
+        self.timeouts.observe(endpoint, duration)
+
+    def _guarded_timeout(self, endpoint: str) -> aiohttp.ClientTimeout:
+        """
+        Timeout for requests the switch may answer by going down (reboot, restore).
+
+        The separate connect limit makes aiohttp raise ServerTimeoutError while connecting,
+        so a timeout there (the request never reached the switch) can be told apart from
+        the switch dropping an already sent request.
+        """
+        timeout = self._client_timeout(endpoint)
+        return aiohttp.ClientTimeout(total=timeout.total, sock_connect=timeout.sock_connect,
+                                     connect=timeout.sock_connect)
+
+    async def _get(self, path: str, params=None, timeout: Optional[aiohttp.ClientTimeout] = None) -> tuple[int, str]:
+        async with self._limiter:
+            timeout = timeout or self._client_timeout(path)
+            start = time.monotonic()
+            try:
+                async with self._http.get(self._base_url + path, params=params, timeout=timeout) as resp:
+                    text = await resp.text(errors="replace")
+            except asyncio.TimeoutError:
+                self._on_timeout(path)
+                raise
+            except aiohttp.ClientError:
+                self.metrics.errors += 1
+                raise
+            self._on_response(path, time.monotonic() - start)
+
+        if resp.status == 401 or SESSION_EXPIRED_PATTERN.search(text):
+            raise TPLinkSessionExpired(f"Session on {self._ip} expired ({path})")
+        return resp.status, text
+
+    async def probe(self) -> bool:
+        """Cheap reachability check: any HTTP answer on the root page, no login."""
+        async with self._limiter:
             try:
-                self._session.get(f"http://{self._ip}/Logout.htm", timeout=5)
-            except Exception:
-                pass
-            finally:
-                self._session.close()
-                self._session = None
+                async with self._http.get(
+                    self._base_url, timeout=aiohttp.ClientTimeout(total=PROBE_TIMEOUT)
+                ) as resp:
+                    await resp.read()
+                return True
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return False
 
     # ---------------------- Login / Logout ----------------------
-    def login(self) -> bool:
-        self._start_session()
+    async def logon(self) -> Optional[int]:
+        """POST logon.cgi and return the parsed TP-Link errType (None on HTTP/parse error)."""
+        self.metrics.logins += 1
+        async with self._limiter:
+            timeout = self._client_timeout("logon.cgi")
+            start = time.monotonic()
+            try:
+                async with self._http.post(
+                    self._base_url + "logon.cgi",
+                    data={"username": self._user, "password": self._pwd, "cpassword": "", "logon": "Login"},
+                    timeout=timeout,
+                ) as resp:
+                    status = resp.status
+                    text = await resp.text(errors="replace")
+            except asyncio.TimeoutError:
+                self._on_timeout("logon.cgi")
+                raise
+            except aiohttp.ClientError:
+                self.metrics.errors += 1
+                raise
+            self._on_response("logon.cgi", time.monotonic() - start)
+
+        if status != 200:
+            _LOGGER.error("Login failed (%s): HTTP %s", self._ip, status)
+            return None
+
+        m = LOGIN_PATTERN.search(text)
+        if not m:
+            _LOGGER.debug("logonInfo array not found in login response from %s", self._ip)
+            return None
+        return int(m.group(1))
+
+    async def login(self) -> bool:
         try:
-            resp = self._session.post(
-                f"http://{self._ip}/logon.cgi",
-                data={"username": self._user, "password": self._pwd, "cpassword": "", "logon": "Login"},
-                timeout=8,
-            )
-            if resp.status_code != 200:
-                _LOGGER.error("Login failed (%s): HTTP %s", self._ip, resp.status_code)
-                return False
-            return True
-        except Exception as e:
-            _LOGGER.exception("Login exception for %s: %s", self._ip, e)
+            err_type = await self.logon()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _LOGGER.error("Login exception for %s: %s", self._ip, e)
+            return False
+        if err_type != 0:
+            _LOGGER.error("Login failed (%s): errType %s", self._ip, err_type)
             return False
+        return True
 
-    def logout(self) -> None:
-        self._close_session()
+    async def logout(self) -> None:
+        try:
+            await self._get("Logout.htm")
+        except Exception:
+            pass
 
-    # ---------------------- VLAN ----------------------
-    def apply_vlan(self, vlans: Dict[Phase, list[Dict[str, Any]]], phase: Phase) -> None:
-        """Apply VLAN settings based on the given phase."""
-        vlan_list = vlans.get(phase, [])
-        if not vlan_list:
-            return
-
-        for vlan in vlan_list:
-            vid = vlan.get("vid")
-            vname = vlan.get("vname")
-            ports = vlan.get("ports", {})
-
-            params = {"vid": vid, "vname": vname, "qvlan_add": "Add/Modify"}
-            for port, state in ports.items():
-                params[f"selType_{port}"] = state
-
-            url = f"http://{self._ip}/qvlanSet.cgi"
-            _LOGGER.debug("Setting VLAN (%s/%s) GET %s params=%s", vid, vname, url, params)
+    async def ensure_login(self) -> None:
+        """Login or raise TPLinkLoginError (connection errors propagate unchanged)."""
+        err_type = await self.logon()
+        if err_type != 0:
+            _LOGGER.error("Login failed (%s): errType %s", self._ip, err_type)
+            raise TPLinkLoginError(f"Login to {self._ip} failed (errType {err_type})")
+
+    # ---------------------- Device Info ----------------------
+    async def get_device_info(self) -> Optional[Dict[str, Any]]:
+        """Read SystemInfoRpm.htm (requires a logged-in session)."""
+        status, text = await self._get("SystemInfoRpm.htm")
+        if status != 200:
+            _LOGGER.warning("Unable to get device info, Status code: %s", status)
+            return None
+        return self.parse_cache.get_or_parse(
+            "SystemInfoRpm.htm", (text,), lambda: extract_js_object_field(text, "info_ds")
+        )
+
+    # ---------------------- Read ----------------------
+    async def _get_page(self, page: str) -> str:
+        status, text = await self._get(page)
+        if status != 200:
+            raise TPLinkError(f"{page} on {self._ip} returned HTTP {status}")
+        return text
+
+    def _js_object(self, text: str, page: str, object_name: str) -> Dict[str, Any]:
+        obj = parse_js_object(text, object_name)
+        if obj is None:
+            raise TPLinkError(f"{object_name} not found in {page} on {self._ip}")
+        return obj
+
+    async def get_vlan_state(self) -> SwitchVlanState:
+        """
+        Read the current 802.1Q VLAN and PVID tables (requires a logged-in session).
+
+        While both pages are unchanged the previously parsed state object is returned.
+        """
+        vlan_text = await self._get_page(VLAN_PAGE)
+        pvid_text = await self._get_page(PVID_PAGE)
+        self.vlan_state = self.parse_cache.get_or_parse(VLAN_PAGE, (vlan_text, pvid_text), lambda: parse_vlan_state(
+            self._js_object(vlan_text, VLAN_PAGE, VLAN_OBJECT),
+            self._js_object(pvid_text, PVID_PAGE, PVID_OBJECT),
+        ))
+        return self.vlan_state
+
+    async def get_port_counters(self, port_count: int) -> tuple[PortCounters, ...]:
+        """Read link state and packet counters of all ports with one request."""
+        text = await self._get_page(PORT_STATS_PAGE)
+        return self.parse_cache.get_or_parse(PORT_STATS_PAGE, (text, str(port_count)), lambda: parse_port_counters(
+            self._js_object(text, PORT_STATS_PAGE, PORT_STATS_OBJECT), port_count
+        ))
+
+    async def _send(self, path: str, query, what: str, timeout: Optional[aiohttp.ClientTimeout] = None) -> None:
+        """Send a config request and fail on anything but HTTP 200."""
+        status, _ = await self._get(path, query, timeout)
+        if status != 200:
+            self.metrics.errors += 1
+            raise TPLinkApplyError(f"{what} on {self._ip} failed: HTTP {status}")
+
+    # ---------------------- System ----------------------
+    async def reboot(self) -> None:
+        """
+        Trigger a reboot (saving the running config); the switch may drop the connection first.
+
+        Timeouts while connecting propagate, the request never reached the switch.
+        """
+        try:
+            await self._send(REBOOT_PATH, REBOOT_QUERY, "Reboot", self._guarded_timeout(REBOOT_PATH))
+        except aiohttp.ServerTimeoutError:
+            raise
+        except (aiohttp.ServerDisconnectedError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+            _LOGGER.debug("%s went down while answering the reboot request: %s", self._ip, e)
+
+    # ---------------------- Config backup ----------------------
+    async def download_config(self, sink: Callable[[bytes], Awaitable[None]]) -> int:
+        """Stream the config backup file chunk by chunk into sink; returns its size."""
+        path = CONFIG_BACKUP_PATH
+        async with self._limiter:
+            timeout = self._client_timeout(path)
+            start = time.monotonic()
+            size = 0
             try:
-                self._session.get(url, params=params, timeout=8)
-            except Exception as e:
-                _LOGGER.exception("Failed setting VLAN %s/%s on %s: %s", vid, vname, self._ip, e)
+                async with self._http.get(
+                    self._base_url + path, params=CONFIG_BACKUP_QUERY, timeout=timeout
+                ) as resp:
+                    if resp.status != 200:
+                        raise TPLinkError(f"{path} on {self._ip} returned HTTP {resp.status}")
+                    if resp.content_type == "text/html":
+                        # Statt der Datei kommt eine HTML-Seite: Login-Seite oder Fehler
+                        text = await resp.text(errors="replace")
+                        if SESSION_EXPIRED_PATTERN.search(text):
+                            raise TPLinkSessionExpired(f"Session on {self._ip} expired ({path})")
+                        raise TPLinkError(f"{path} on {self._ip} returned no config file")
+                    async for chunk in resp.content.iter_chunked(BACKUP_CHUNK_SIZE):
+                        size += len(chunk)
+                        await sink(chunk)
+            except asyncio.TimeoutError:
+                self._on_timeout(path)
+                raise
+            except aiohttp.ClientError:
+                self.metrics.errors += 1
+                raise
+            self._on_response(path, time.monotonic() - start)
+        if not size:
+            raise TPLinkError(f"{path} on {self._ip} returned an empty config file")
+        return size
+
+    async def upload_config(self, config: IO[bytes]) -> None:
+        """
+        Upload a config backup file; the switch reboots to load it and may drop the connection.
+
+        Timeouts while connecting propagate, the upload never reached the switch.
+        """
+        path = CONFIG_RESTORE_PATH
+        form = aiohttp.FormData()
+        form.add_field(CONFIG_RESTORE_FIELD, config, filename="config.cfg",
+                       content_type="application/octet-stream")
+        async with self._limiter:
+            try:
+                async with self._http.post(
+                    self._base_url + path, data=form, timeout=self._guarded_timeout(path)
+                ) as resp:
+                    status = resp.status
+                    text = await resp.text(errors="replace")
+            except aiohttp.ServerTimeoutError:
+                raise
+            except (aiohttp.ServerDisconnectedError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                _LOGGER.debug("%s went down while answering the config restore: %s", self._ip, e)
+                return
+        if status == 401 or SESSION_EXPIRED_PATTERN.search(text):
+            raise TPLinkSessionExpired(f"Session on {self._ip} expired ({path})")
+        if status != 200:
+            self.metrics.errors += 1
+            raise TPLinkApplyError(f"Config restore on {self._ip} failed: HTTP {status}")
+
+    # ---------------------- VLAN ----------------------
+    async def write_vlans(self, writes: tuple[VlanWrite, ...],
+                          current: Optional[SwitchVlanState] = None,
+                          journal: Optional[list[VlanWrite]] = None) -> None:
+        """Send precompiled qvlanSet.cgi requests (only changed VLANs if current is given)."""
+        for w in writes:
+            if current is not None:
+                if not current.vlan_differs(w.vid, w.ports):
+                    _LOGGER.debug("VLAN %s on %s already up to date, skipping", w.vid, self._ip)
+                    continue
+                if w.vid not in current.vlans and all(st == PORT_NOT_MEMBER for _, st in w.ports):
+                    _LOGGER.debug("VLAN %s on %s absent and without members, skipping", w.vid, self._ip)
+                    continue
+
+            _LOGGER.debug("Setting VLAN (%s/%s) GET qvlanSet.cgi params=%s", w.vid, w.name, w.query)
+            if journal is not None:
+                journal.append(w)
+            await self._send("qvlanSet.cgi", w.query, f"VLAN {w.vid}")
+
+    async def apply_vlan(self, vlans: Dict[Phase, list[Dict[str, Any]]], phase: Phase,
+                         current: Optional[SwitchVlanState] = None) -> None:
+        """Apply VLAN settings based on the given phase (only changed VLANs if current is given)."""
+        await self.write_vlans(compile_vlans(vlans.get(phase, [])), current)
 
     # ---------------------- PVID ----------------------
-    def apply_pvid(self, pvid: Dict[Phase, Dict[str, list[int]]], phase: Phase) -> None:
-        """Apply PVID settings based on the given phase."""
-        pvid_cfg = pvid.get(phase, {})
-        if not pvid_cfg:
-            return
-
-        for pvid_str, ports in pvid_cfg.items():
-            pbm = 0
-            for p in ports:
-                if isinstance(p, int) and p >= 1:
-                    pbm |= (1 << (p - 1))
-            url = f"http://{self._ip}/vlanPvidSet.cgi"
-            params = {"pbm": str(pbm), "pvid": str(pvid_str)}
-            _LOGGER.debug("Setting PVID (%s): GET %s params=%s", self._ip, url, params)
+    async def write_pvids(self, writes: tuple[PvidWrite, ...],
+                          current: Optional[SwitchVlanState] = None,
+                          journal: Optional[list[int]] = None) -> None:
+        """
+        Send precompiled vlanPvidSet.cgi requests (only changed ports if current is given).
+
+        The port bitmap of every request sent is appended to journal.
+        """
+        for w in writes:
+            query, pbm = w.query, w.pbm
+            if current is not None:
+                pbm = w.pbm & ~current.pvid_bitmap(w.pvid)
+                if not pbm:
+                    _LOGGER.debug("PVID %s on %s already up to date, skipping", w.pvid, self._ip)
+                    continue
+                if pbm != w.pbm:
+                    query = pvid_query(w.pvid, pbm)
+
+            _LOGGER.debug("Setting PVID (%s): GET vlanPvidSet.cgi params=%s", self._ip, query)
+            if journal is not None:
+                journal.append(pbm)
+            await self._send("vlanPvidSet.cgi", query, f"PVID {w.pvid}")
+
+    async def apply_pvid(self, pvid: Dict[Phase, Dict[str, list[int]]], phase: Phase,
+                         current: Optional[SwitchVlanState] = None) -> None:
+        """Apply PVID settings based on the given phase (only changed ports if current is given)."""
+        await self.write_pvids(compile_pvids(pvid.get(phase, {})), current)
+
+    # ---------------------- Rollback ----------------------
+    async def _rollback(self, snapshot: SwitchVlanState,
+                        vlan_journal: list[VlanWrite], pvid_journal: list[int]) -> None:
+        """
+        Restore the touched VLAN entries and PVIDs from the snapshot, then check the tables.
+
+        A port's PVID has to stay a VLAN the port is member of, so memberships the snapshot
+        had are re-added first, then the PVIDs restored, and only then memberships the plan
+        added removed and VLANs it created deleted.
+        """
+        touched_ports: Dict[int, set[int]] = {}
+        for w in reversed(vlan_journal):
+            touched_ports.setdefault(w.vid, set()).update(port for port, _ in w.ports)
+        touched_pbm = 0
+        for pbm in pvid_journal:
+            touched_pbm |= pbm
+
+        # 1. Mitgliedschaften des Snapshots wiederherstellen
+        for vid, ports in touched_ports.items():
+            entry = snapshot.vlans.get(vid)
+            if entry is None:
+                continue
+            members = tuple((port, entry.port_state(port)) for port in sorted(ports)
+                            if entry.port_state(port) != PORT_NOT_MEMBER)
+            if members:
+                _LOGGER.debug("Rollback VLAN %s on %s: ports=%s", vid, self._ip, members)
+                await self._send("qvlanSet.cgi", vlan_query(vid, entry.name, members), f"Rollback VLAN {vid}")
+
+        # 2. PVIDs zurück, jetzt ist jeder Port wieder Mitglied seines alten PVID-VLANs
+        by_pvid: Dict[int, int] = {}
+        for i, pvid in enumerate(snapshot.pvids):
+            if touched_pbm & (1 << i):
+                by_pvid[pvid] = by_pvid.get(pvid, 0) | (1 << i)
+        for pvid, pbm in by_pvid.items():
+            _LOGGER.debug("Rollback PVID %s on %s: pbm=%s", pvid, self._ip, pbm)
+            await self._send("vlanPvidSet.cgi", pvid_query(pvid, pbm), f"Rollback PVID {pvid}")
+
+        # 3. Hinzugekommene Mitgliedschaften entfernen, neue VLANs löschen
+        for vid, ports in touched_ports.items():
+            entry = snapshot.vlans.get(vid)
+            if entry is None:
+                _LOGGER.debug("Rollback VLAN %s on %s: delete", vid, self._ip)
+                await self._send("qvlanSet.cgi", vlan_delete_query(vid), f"Rollback VLAN {vid}")
+                continue
+            removed = tuple((port, PORT_NOT_MEMBER) for port in sorted(ports)
+                            if entry.port_state(port) == PORT_NOT_MEMBER)
+            if removed:
+                _LOGGER.debug("Rollback VLAN %s on %s: ports=%s", vid, self._ip, removed)
+                await self._send("qvlanSet.cgi", vlan_query(vid, entry.name, removed), f"Rollback VLAN {vid}")
+
+        state = await self.get_vlan_state()
+        for vid in touched_ports:
+            if state.vlans.get(vid) != snapshot.vlans.get(vid):
+                raise TPLinkApplyError(f"Rollback on {self._ip} did not restore VLAN {vid}")
+        for i, pvid in enumerate(snapshot.pvids):
+            if touched_pbm & (1 << i) and state.pvids[i] != pvid:
+                raise TPLinkApplyError(f"Rollback on {self._ip} did not restore the PVID of port {i + 1}")
+
+    # ---------------------- Apply Profile ----------------------
+    async def execute_plan(self, plan: PhasePlan, diff: bool = False) -> bool:
+        """
+        Execute a compiled phase plan transactionally on an already logged-in session.
+
+        The current tables are read as snapshot first. With diff=True only the VLAN entries
+        and PVID ports that differ from it are written. Afterwards the tables are read again;
+        the switch answers HTTP 200 even to settings it rejects, so a plan it did not take
+        over counts as failed. On any failure every entry touched so far is restored from the
+        snapshot and TPLinkApplyError is raised. If the session expires midway, snapshot and
+        journals are kept for the broker's re-run of the same plan, so a later rollback still
+        restores the state from before the first attempt. Snapshot, writes and check together
+        are bounded by apply_deadline.
+        """
+        if self.apply_deadline is not None:
+            self._deadline = time.monotonic() + self.apply_deadline
+        try:
+            interrupted, self._interrupted = self._interrupted, None
+            if interrupted is not None and interrupted[0] is not plan:
+                await self._rollback_interrupted(interrupted)
+                interrupted = None
+
+            state = await self.get_vlan_state()
+            if interrupted is None:
+                snapshot, vlan_journal, pvid_journal = state, [], []
+            else:
+                _LOGGER.debug("Resuming the interrupted plan on %s after re-login", self._ip)
+                _, snapshot, vlan_journal, pvid_journal = interrupted
+            current = state if diff else None
             try:
-                self._session.get(url, params=params, timeout=8)
+                await self.write_vlans(plan.vlans, current, vlan_journal)
+                await self.write_pvids(plan.pvids, current, pvid_journal)
+                if not plan.matches(await self.get_vlan_state()):
+                    raise TPLinkApplyError(f"{self._ip} did not take over all settings of the plan")
+            except TPLinkSessionExpired:
+                # Broker logs in again and re-runs the plan, which resumes this transaction
+                self._interrupted = (plan, snapshot, vlan_journal, pvid_journal)
+                raise
             except Exception as e:
-                _LOGGER.exception("Failed setting PVID %s on %s: %s", pvid_str, self._ip, e)
+                _LOGGER.error("Applying plan on %s failed (%s), rolling back", self._ip, e)
+                # Rollback runs on the normal per-request timeouts, not on the spent deadline
+                self._deadline = None
+                try:
+                    await self._rollback(snapshot, vlan_journal, pvid_journal)
+                except Exception as rb_err:
+                    raise TPLinkApplyError(
+                        f"Apply on {self._ip} failed ({e}) and rollback failed ({rb_err})"
+                    ) from e
+                raise TPLinkApplyError(f"Apply on {self._ip} failed and was rolled back: {e}") from e
+        finally:
+            self._deadline = None
+        return True
 
-    # ---------------------- Apply Profile ----------------------
-    def apply_profile(self, vlans: Dict[Phase, list[Dict[str, Any]]],
-                      pvid: Dict[Phase, Dict[str, list[int]]], phase: Phase) -> bool:
+    async def _rollback_interrupted(
+        self, interrupted: tuple[PhasePlan, SwitchVlanState, list[VlanWrite], list[int]]
+    ) -> None:
+        """Restore what a plan wrote before its session expired and its re-run never came."""
+        _, snapshot, vlan_journal, pvid_journal = interrupted
+        _LOGGER.warning("Rolling back a plan on %s interrupted by a session expiry", self._ip)
+        try:
+            await self._rollback(snapshot, vlan_journal, pvid_journal)
+        except TPLinkSessionExpired:
+            self._interrupted = interrupted
+            raise
+        except Exception as e:
+            _LOGGER.error("Rollback of the interrupted plan on %s failed: %s", self._ip, e)
+
+    async def apply_phase(self, vlans: Dict[Phase, list[Dict[str, Any]]],
+                          pvid: Dict[Phase, Dict[str, list[int]]], phase: Phase,
+                          diff: bool = False) -> bool:
+        """Apply VLAN and PVID for a given phase on an already logged-in session."""
+        plan = PhasePlan(
+            vlans=compile_vlans(vlans.get(phase, [])),
+            pvids=compile_pvids(pvid.get(phase, {})),
+        )
+        return await self.execute_plan(plan, diff)
+
+    async def apply_profile(self, vlans: Dict[Phase, list[Dict[str, Any]]],
+                            pvid: Dict[Phase, Dict[str, list[int]]], phase: Phase,
+                            diff: bool = False) -> bool:
         """High-level method to apply VLAN and PVID for a given phase."""
         try:
-            if not self.login():
+            if not await self.login():
                 return False
-            self.apply_vlan(vlans, phase)
-            self.apply_pvid(pvid, phase)
-            return True
+            return await self.apply_phase(vlans, pvid, phase, diff)
+        except TPLinkError as e:
+            _LOGGER.error("Applying profile %s on %s failed: %s", phase, self._ip, e)
+            return False
         finally:
-            self.logout()
+            await self.logout()
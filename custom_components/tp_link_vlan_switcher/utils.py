@@ -1,32 +1,270 @@
-import json
+import hashlib
 import re
+from collections import OrderedDict
+from typing import Any, Callable, Collection, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Parsed results kept per page (the current one plus a few recent alternatives)
+PARSE_CACHE_SIZE = 4
+
+
+# Start of a declaration whose value looks like a literal: "var name = {", "[", "new Array(", ...
+# (starts with the plain "var" literal so the regex engine can use its fast prefix scan)
+_VAR_RE = re.compile(
+    r"""var\s+([A-Za-z_$][\w$]*)\s*=\s*(?=[{\["'\d-]|new\s|true\b|false\b|null\b)"""
+)
+_IDENT_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$")
+
+# One JS literal token (leading whitespace skipped)
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<num>-?(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][-+]?\d+)?))
+      | (?P<newarr>new\s+Array\s*\()
+      | (?P<punct>[{}\[\](),:;])
+      | (?P<ident>[A-Za-z_$][\w$]*)
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+# What may follow a complete literal declaration ("var a = 1, b = 2;" or the end of the text)
+_DECL_END_RE = re.compile(r"\s*(?:[;,]|\Z)")
+
+_ESCAPE_RE = re.compile(r"\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|.)", re.DOTALL)
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+_CONSTANTS = {"true": True, "false": False, "null": None}
+
+
+class _JSSyntaxError(ValueError):
+    """The declaration is not a plain literal (function call, expression, ...)."""
+
+
+def _number(tok: str) -> Any:
+    # Ohne Exceptions: die Portbitmaps sind fast alle hex
+    if tok.lstrip("-")[:2] in ("0x", "0X"):
+        return int(tok, 16)
+    if "." in tok or "e" in tok or "E" in tok:
+        return float(tok)
+    return int(tok)
+
+
+def _unescape(body: str) -> str:
+    if "\\" not in body:
+        return body
+
+    def _sub(m: re.Match) -> str:
+        esc = m.group(1)
+        if esc[0] in "ux" and len(esc) > 1:
+            return chr(int(esc[1:], 16))
+        return _ESCAPES.get(esc, esc)
+
+    return _ESCAPE_RE.sub(_sub, body)
+
+
+# Token kinds by group index of _TOKEN_RE
+_STR, _NUM, _NEWARR, _PUNCT, _IDENT = range(1, 6)
+
+
+class _LiteralParser:
+    """Recursive descent over the token stream, starting at a given position."""
+
+    __slots__ = ("_text", "pos")
+
+    def __init__(self, text: str, pos: int):
+        self._text = text
+        self.pos = pos
+
+    def _next(self) -> tuple[int, str]:
+        m = _TOKEN_RE.match(self._text, self.pos)
+        if m is None:
+            raise _JSSyntaxError(self.pos)
+        self.pos = m.end()
+        kind = m.lastindex
+        return kind, m.group(kind)
+
+    def value(self) -> Any:
+        return self._value(*self._next())
+
+    def _value(self, kind: int, tok: str) -> Any:
+        if kind == _NUM:
+            return _number(tok)
+        if kind == _STR:
+            return _unescape(tok[1:-1])
+        if kind == _PUNCT:
+            if tok == "[":
+                return self._sequence("]")
+            if tok == "{":
+                return self._object()
+        elif kind == _NEWARR:
+            return self._sequence(")")
+        elif kind == _IDENT and tok in _CONSTANTS:
+            return _CONSTANTS[tok]
+        raise _JSSyntaxError(self.pos)
+
+    def _sequence(self, close: str) -> list:
+        # Die Arrays machen fast alle Tokens einer Seite aus: Schleife ohne Methodenaufrufe
+        text, match, items = self._text, _TOKEN_RE.match, []
+        expect_item = True
+        while True:
+            m = match(text, self.pos)
+            if m is None:
+                raise _JSSyntaxError(self.pos)
+            self.pos = m.end()
+            kind = m.lastindex
+            tok = m.group(kind)
+            if kind == _PUNCT and tok == close and (expect_item or items):
+                # "[]", "[1, 2]" and the trailing comma in "[1, 2,]"
+                return items
+            if expect_item:
+                if kind == _NUM:
+                    items.append(_number(tok))
+                elif kind == _STR:
+                    items.append(_unescape(tok[1:-1]))
+                else:
+                    items.append(self._value(kind, tok))
+                expect_item = False
+            elif kind == _PUNCT and tok == ",":
+                expect_item = True
+            else:
+                raise _JSSyntaxError(self.pos)
+
+    def _object(self) -> Dict[str, Any]:
+        obj: Dict[str, Any] = {}
+        kind, tok = self._next()
+        if kind == _PUNCT and tok == "}":
+            return obj
+        while True:
+            if kind == _STR:
+                key = _unescape(tok[1:-1])
+            elif kind in (_IDENT, _NUM):
+                key = tok
+            else:
+                raise _JSSyntaxError(self.pos)
+            if self._next() != (_PUNCT, ":"):
+                raise _JSSyntaxError(self.pos)
+            obj[key] = self.value()
+            kind, tok = self._next()
+            if kind == _PUNCT and tok == "}":
+                return obj
+            if kind != _PUNCT or tok != ",":
+                raise _JSSyntaxError(self.pos)
+            kind, tok = self._next()
+            if kind == _PUNCT and tok == "}":  # trailing comma
+                return obj
+
+
+def parse_js_vars(html: str, names: Optional[Collection[str]] = None) -> Dict[str, Any]:
+    """
+    Extracts all literal JS variable declarations from a page in one scan.
+
+    Handles objects with quoted or unquoted keys, [...] and new Array(...) with any number
+    of numeric (decimal/hex) or string elements, true/false/null. Declarations whose value
+    is not a plain literal followed by ``;``, ``,`` or the end of the text are skipped; of
+    several declarations of a name the first literal one counts.
+
+    :param html: The HTML content as string
+    :param names: Optional: only parse these variables (others are skipped without parsing)
+    :return: dict of variable name -> parsed value (dict, list, str, int, float, bool, None)
+    """
+    result: Dict[str, Any] = {}
+    wanted = None if names is None else set(names)
+    pos = 0
+    while wanted is None or len(result) < len(wanted):
+        m = _VAR_RE.search(html, pos)
+        if m is None:
+            break
+        pos = m.end()
+        name = m.group(1)
+        start = m.start()
+        if (start and html[start - 1] in _IDENT_CHARS) or name in result \
+                or (wanted is not None and name not in wanted):
+            continue
+        parser = _LiteralParser(html, pos)
+        try:
+            value = parser.value()
+        except _JSSyntaxError:
+            continue
+        if _DECL_END_RE.match(html, parser.pos):
+            result[name] = value
+            pos = parser.pos
+    return result
+
+
+def parse_js_object(html: str, object_name: str):
+    """
+    Parses a plain JS object literal (unquoted keys, numeric/string arrays) into a dict.
+
+    :param html: The HTML content as string
+    :param object_name: The JS object variable name (e.g., "qvlan_ds")
+    :return: dict of the object or None if not found / not parseable
+    """
+    obj = parse_js_vars(html, (object_name,)).get(object_name)
+    return obj if isinstance(obj, dict) else None
 
 
 def extract_js_object_field(html: str, object_name: str, field: str = None):
     """
     Extracts a field or the whole JS object from HTML containing a JS variable.
 
+    Single-element arrays (the TP-Link style ``descriStr:["TL-SG108E"]``) are unwrapped,
+    arrays with several elements are returned as lists.
+
     :param html: The HTML content as string
     :param object_name: The JS object variable name (e.g., "info_ds")
     :param field: Optional: specific field to extract (e.g., "hardwareStr")
     :return: dict of the object or value of the field
     """
-    # Finde das JS-Objekt
-    match = re.search(rf"var {object_name} = (\{{.*?\}});", html, re.DOTALL)
-    if not match:
+    obj = parse_js_object(html, object_name)
+    if obj is None:
         return None
 
-    js_obj_str = match.group(1)
-
-    # Konvertiere JS-Listen in JSON-Listen
-    js_obj_str = re.sub(r'(\w+)?:\s*\[\s*"(.*?)"\s*\]', r'"\1": ["\2"]', js_obj_str)
-
-    # Lade als Python dict
-    obj = json.loads(js_obj_str)
-
     # Transform
-    transformed_obj = {k: v[0] for k, v in obj.items()}
+    transformed_obj = {
+        k: v[0] if isinstance(v, list) and len(v) == 1 else v for k, v in obj.items()
+    }
 
     if field:
         return transformed_obj.get(field)
-    return transformed_obj
\ No newline at end of file
+    return transformed_obj
+
+
+def body_digest(*bodies: str) -> bytes:
+    """Fast 128 bit digest over one or more response bodies."""
+    digest = hashlib.blake2b(digest_size=16)
+    for body in bodies:
+        digest.update(body.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class ParseCache:
+    """
+    Parsed page results of one switch, keyed by a digest of the response body.
+
+    The pages rarely change between polls, so an unchanged body returns the very object
+    parsed last time (callers must not mutate it). Each page has its own LRU of `size`
+    entries, so a page that changes on every poll cannot evict the others.
+    """
+
+    def __init__(self, size: int = PARSE_CACHE_SIZE):
+        self._size = size
+        self._pages: Dict[str, OrderedDict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_parse(self, page: str, bodies: tuple[str, ...], parse: Callable[[], T]) -> T:
+        entries = self._pages.get(page)
+        if entries is None:
+            entries = self._pages[page] = OrderedDict()
+        key = body_digest(*bodies)
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+
+        self.misses += 1
+        value = parse()
+        entries[key] = value
+        if len(entries) > self._size:
+            entries.popitem(last=False)
+        return value
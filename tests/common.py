@@ -0,0 +1,73 @@
+"""Helpers shared by the tests."""
+import contextlib
+from typing import AsyncIterator, Optional
+
+import aiohttp
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from benchmarks.bench_startup import start_hass
+from benchmarks.mock_switch import MockTPLinkSwitch
+from custom_components.tp_link_vlan_switcher.const import (
+    DOMAIN, DATA_COORDINATOR, CONF_DEBOUNCE, CONF_DEVICE, CONF_IP, CONF_PASSWORD, CONF_PORTS, CONF_USERNAME,
+)
+from custom_components.tp_link_vlan_switcher.tp_link_connector import AsyncTPLinkConnector
+
+
+@contextlib.asynccontextmanager
+async def logged_in(switch: MockTPLinkSwitch) -> AsyncIterator[AsyncTPLinkConnector]:
+    """Connector with a session on the mock switch."""
+    async with aiohttp.ClientSession() as session:
+        connector = AsyncTPLinkConnector(session, switch.address, switch.username, switch.password)
+        await connector.ensure_login()
+        yield connector
+
+
+@contextlib.asynccontextmanager
+async def running_hass(config_dir: str) -> AsyncIterator[HomeAssistant]:
+    """Bare HomeAssistant instance (storage and executor only) on the running loop."""
+    hass = HomeAssistant(config_dir)
+    try:
+        yield hass
+        await hass.async_block_till_done()
+    finally:
+        await hass.async_stop(force=True)
+
+
+def profile(vid: int, port: int = 1, pvid: bool = False) -> dict:
+    """Profile option that adds port untagged to vid (turn_on) and removes it again (turn_off)."""
+    return {
+        "vlans": {
+            "turn_on": [{"vid": vid, "vname": f"v{vid}", "ports": {str(port): 0}}],
+            "turn_off": [{"vid": vid, "vname": f"v{vid}", "ports": {str(port): 2}}],
+        },
+        "pvid": {"turn_on": {str(vid): [port]}, "turn_off": {"1": [port]}} if pvid else {},
+    }
+
+
+async def add_entry(hass: HomeAssistant, switch: MockTPLinkSwitch, options: Optional[dict] = None) -> ConfigEntry:
+    """Set up a config entry of the integration on the mock switch, with its first poll done."""
+    entry = ConfigEntry(
+        version=1, minor_version=1, domain=DOMAIN, title=switch.address, source="user",
+        data={CONF_IP: switch.address, CONF_USERNAME: switch.username, CONF_PASSWORD: switch.password,
+              CONF_PORTS: switch.port_count, CONF_DEVICE: dict(switch.info)},
+        options={CONF_DEBOUNCE: 0, **(options or {})},
+    )
+    await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    # Der erste Poll läuft im Hintergrund, Tests brauchen die Tabellen sofort
+    await hass.data[DOMAIN][entry.entry_id][DATA_COORDINATOR].async_refresh()
+    return entry
+
+
+@contextlib.asynccontextmanager
+async def integration(config_dir: str, switch: MockTPLinkSwitch,
+                      options: Optional[dict] = None) -> AsyncIterator[tuple[HomeAssistant, ConfigEntry]]:
+    """Home Assistant core with one config entry of the integration set up on the mock switch."""
+    hass = await start_hass(config_dir)
+    try:
+        entry = await add_entry(hass, switch, options)
+        yield hass, entry
+        await hass.config_entries.async_unload(entry.entry_id)
+    finally:
+        await hass.async_stop(force=True)
@@ -0,0 +1,23 @@
+"""Fixtures on top of the in-process mock switch (benchmarks/mock_switch.py)."""
+import asyncio
+import inspect
+
+import pytest
+
+from benchmarks.mock_switch import MockTPLinkSwitch
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Run coroutine tests in their own event loop, no pytest plugin needed."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    kwargs = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**kwargs))
+    return True
+
+
+@pytest.fixture
+def switch():
+    with MockTPLinkSwitch() as sw:
+        yield sw
@@ -0,0 +1,75 @@
+"""BackupStore on the mock switch: content-addressed dedup and retention."""
+import os
+
+import pytest
+
+from custom_components.tp_link_vlan_switcher.backup import BackupError, BackupStore
+
+from .common import logged_in, running_hass
+
+ENTRY = "entry"
+
+
+def _change_config(switch, vid):
+    switch.vlans[vid] = [f"v{vid}", {p: 2 for p in range(1, switch.port_count + 1)}]
+
+
+def _files(store):
+    return sorted(name for name in os.listdir(store._dir) if name.endswith(".cfg"))
+
+
+async def test_unchanged_config_is_deduplicated(switch, tmp_path):
+    async with running_hass(str(tmp_path)) as hass, logged_in(switch) as connector:
+        store = BackupStore(hass)
+        first = await store.async_backup_connector(ENTRY, connector, "first")
+        second = await store.async_backup_connector(ENTRY, connector, "second")
+        assert second == first
+        assert store.backups(ENTRY) == [first]
+
+        # Gleicher Inhalt bei einem zweiten Switch: neuer Eintrag, aber nur eine Datei
+        other = await store.async_backup_connector("other", connector, "other")
+        assert other.sha256 == first.sha256
+        assert _files(store) == [f"{first.sha256}.cfg"]
+        with open(store.path(first.sha256), "rb") as fh:
+            assert fh.read() == switch.config_file()
+        assert not [name for name in os.listdir(store._dir) if name.startswith(".download-")]
+
+
+async def test_retention_drops_oldest_and_collects_files(switch, tmp_path):
+    async with running_hass(str(tmp_path)) as hass, logged_in(switch) as connector:
+        store = BackupStore(hass)
+        records = []
+        for vid in (10, 20, 30):
+            _change_config(switch, vid)
+            records.append(await store.async_backup_connector(ENTRY, connector, f"vlan {vid}", retention=2))
+
+        assert store.backups(ENTRY) == records[1:]
+        assert _files(store) == sorted(f"{r.sha256}.cfg" for r in records[1:])
+
+        # keep schützt das Backup, das gleich zurückgespielt wird
+        _change_config(switch, 40)
+        latest = await store.async_backup_connector(ENTRY, connector, "vlan 40", retention=2,
+                                                    keep=records[1].sha256)
+        assert store.backups(ENTRY) == [records[1], latest]
+
+        # Der Index überlebt einen Neustart
+        reloaded = BackupStore(hass)
+        await reloaded.async_load()
+        assert reloaded.backups(ENTRY) == [records[1], latest]
+
+        await store.async_remove_entry(ENTRY)
+        assert _files(store) == []
+
+
+async def test_find_by_prefix(switch, tmp_path):
+    async with running_hass(str(tmp_path)) as hass, logged_in(switch) as connector:
+        store = BackupStore(hass)
+        with pytest.raises(BackupError):
+            store.find(ENTRY, None)
+        record = await store.async_backup_connector(ENTRY, connector, "manual")
+        assert store.find(ENTRY, None) == record
+        assert store.find(ENTRY, record.sha256[:8].upper()) == record
+        with pytest.raises(BackupError, match="too short"):
+            store.find(ENTRY, record.sha256[:3])
+        with pytest.raises(BackupError, match="matches 0"):
+            store.find(ENTRY, "ffffffffff" if not record.sha256.startswith("ff") else "0000000000")
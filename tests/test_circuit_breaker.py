@@ -0,0 +1,93 @@
+"""CircuitBreaker state machine with a controlled clock."""
+import pytest
+
+from custom_components.tp_link_vlan_switcher import circuit_breaker
+from custom_components.tp_link_vlan_switcher.circuit_breaker import (
+    STATE_CLOSED, STATE_HALF_OPEN, STATE_MAINTENANCE, STATE_OPEN, CircuitBreaker,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock.monotonic)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    breaker = CircuitBreaker(threshold=3, backoff=10, max_backoff=25)
+    breaker.changes = []
+    breaker.add_listener(lambda: breaker.changes.append(breaker.state))
+    return breaker
+
+
+def test_opens_after_threshold_consecutive_failures(breaker):
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    breaker.record_success()
+    assert breaker.failures == 0
+
+    assert [breaker.record_failure() for _ in range(3)] == [False, False, True]
+    assert breaker.state == STATE_OPEN and not breaker.available
+    assert breaker.changes == [STATE_OPEN]
+
+
+def test_half_open_probe_after_backoff_and_backoff_doubling(breaker, clock):
+    breaker.trip()
+    assert not breaker.try_probe()
+    assert breaker.retry_in == 10
+
+    clock.now += 10
+    assert breaker.try_probe()
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.try_probe()
+
+    # Fehlgeschlagene Probe: wieder offen, Backoff verdoppelt, gedeckelt
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN and breaker.retry_in == 20
+    clock.now += 20
+    assert breaker.try_probe()
+    breaker.record_failure()
+    assert breaker.retry_in == 25
+
+    clock.now += 25
+    assert breaker.try_probe()
+    assert breaker.record_success()
+    assert breaker.state == STATE_CLOSED and breaker.available
+    assert breaker.changes == [STATE_OPEN, STATE_CLOSED]
+
+    # Nach dem Schließen beginnt der Backoff wieder bei der Basis
+    breaker.trip()
+    assert breaker.retry_in == 10
+
+
+def test_maintenance_ignores_failures_until_resume(breaker):
+    breaker.record_failure()
+    breaker.suspend()
+    assert breaker.state == STATE_MAINTENANCE and not breaker.available
+    assert not any(breaker.record_failure() for _ in range(5))
+    assert not breaker.record_success()
+    assert not breaker.try_probe()
+    assert breaker.state == STATE_MAINTENANCE
+
+    breaker.resume()
+    assert breaker.state == STATE_CLOSED and breaker.failures == 0
+    assert breaker.changes == [STATE_MAINTENANCE, STATE_CLOSED]
+
+
+def test_listener_removal(breaker):
+    calls = []
+    remove = breaker.add_listener(lambda: calls.append(1))
+    breaker.trip()
+    remove()
+    breaker.resume()
+    assert calls == [1]
@@ -0,0 +1,120 @@
+"""DeviceCommandQueue: debounce, coalescing and what ends up desired/applied."""
+import asyncio
+import contextlib
+from typing import AsyncIterator
+
+import aiohttp
+
+from benchmarks.mock_switch import MockTPLinkSwitch
+from custom_components.tp_link_vlan_switcher.command_queue import DeviceCommandQueue
+from custom_components.tp_link_vlan_switcher.const import DEBOUNCE_MAX_DELAY
+from custom_components.tp_link_vlan_switcher.profile_plan import compile_profile, merge_phase_plans, ProfilePlan
+from custom_components.tp_link_vlan_switcher.session_broker import TPLinkSessionBroker
+from custom_components.tp_link_vlan_switcher.tp_link_connector import AsyncTPLinkConnector
+
+from .common import profile, running_hass
+
+
+class _Applied(list):
+    """on_applied callback keeping (loop time, profile, phase)."""
+
+    def __call__(self, name: str, phase: str) -> None:
+        self.append((asyncio.get_running_loop().time(), name, phase))
+
+
+@contextlib.asynccontextmanager
+async def _queue(switch: MockTPLinkSwitch, tmp_path, debounce: float) -> AsyncIterator[tuple]:
+    async with running_hass(str(tmp_path)) as hass, aiohttp.ClientSession() as session:
+        broker = TPLinkSessionBroker(
+            hass, AsyncTPLinkConnector(session, switch.address, switch.username, switch.password)
+        )
+        applied = _Applied()
+        queue = DeviceCommandQueue(hass, broker, debounce, applied)
+        try:
+            yield queue, applied
+        finally:
+            await queue.async_shutdown()
+            await broker.async_close()
+
+
+def _plan(name: str, vid: int, port: int = 1) -> ProfilePlan:
+    options = profile(vid, port)
+    return compile_profile(name, options["vlans"], options["pvid"], 8)
+
+
+async def test_only_the_latest_phase_of_a_profile_runs(switch, tmp_path):
+    async with _queue(switch, tmp_path, 0.05) as (queue, applied):
+        plan = _plan("a", 10)
+        results = await asyncio.gather(
+            queue.async_submit(plan, "turn_on"),
+            queue.async_submit(plan, "turn_off"),
+            queue.async_submit(plan, "turn_on"),
+        )
+        # Überholte Phasen melden False, obwohl die letzte geklappt hat
+        assert results == [True, False, True]
+        assert [(name, phase) for _, name, phase in applied] == [("a", "turn_on")]
+        assert queue.desired == {"a": "turn_on"}
+        assert switch.vlans[10][1][1] == 0
+        assert switch.counts["qvlanSet.cgi"] == 1
+        assert switch.counts["logon.cgi"] == 1
+
+
+async def test_debounce_collects_a_burst_into_one_batch(switch, tmp_path):
+    async with _queue(switch, tmp_path, 0.1) as (queue, applied):
+        loop = asyncio.get_running_loop()
+
+        async def _submit(delay: float, plan: ProfilePlan) -> bool:
+            await asyncio.sleep(delay)
+            return await queue.async_submit(plan, "turn_on")
+
+        start = loop.time()
+        assert await asyncio.gather(_submit(0, _plan("a", 10)), _submit(0.05, _plan("b", 20, port=2))) == [True, True]
+        times = [t - start for t, _, _ in applied]
+        # Das Fenster läuft ab der letzten Anfrage, beide Profile in einem Durchlauf
+        assert [name for _, name, _ in applied] == ["a", "b"]
+        assert all(0.15 <= t < 0.15 + 0.2 for t in times)
+        assert switch.counts["logon.cgi"] == 1
+
+        await queue.async_submit(_plan("a", 10), "turn_off")
+        assert applied[-1][1:] == ("a", "turn_off")
+        assert switch.vlans[10][1][1] == 2
+
+
+async def test_debounce_is_capped(switch, tmp_path):
+    async with _queue(switch, tmp_path, DEBOUNCE_MAX_DELAY / 4) as (queue, applied):
+        loop = asyncio.get_running_loop()
+        plan = _plan("a", 10)
+        start = loop.time()
+        pending = []
+        # Dauerfeuer innerhalb des Fensters schiebt die Ausführung nicht beliebig hinaus
+        while loop.time() - start < DEBOUNCE_MAX_DELAY + 0.3:
+            pending.append(asyncio.ensure_future(queue.async_submit(plan, "turn_on")))
+            await asyncio.sleep(DEBOUNCE_MAX_DELAY / 8)
+            if applied:
+                break
+        assert applied
+        assert applied[0][0] - start < DEBOUNCE_MAX_DELAY + 0.3
+        await asyncio.gather(*pending)
+
+
+async def test_merged_plan_records_its_members(switch, tmp_path):
+    async with _queue(switch, tmp_path, 0) as (queue, applied):
+        a, b = _plan("a", 10), _plan("b", 20, port=2)
+        merged = ProfilePlan(
+            name="scene",
+            turn_on=merge_phase_plans([("a", a.turn_on), ("b", b.turn_on)]),
+            turn_off=merge_phase_plans([("a", a.turn_off), ("b", b.turn_off)]),
+        )
+        assert await queue.async_submit(merged, "turn_on", members=(("a", "turn_on"), ("b", "turn_on")))
+        assert queue.desired == {"a": "turn_on", "b": "turn_on"}
+        assert [entry[1:] for entry in applied] == [("a", "turn_on"), ("b", "turn_on")]
+
+
+async def test_failed_apply_is_not_reported_applied(switch, tmp_path):
+    async with _queue(switch, tmp_path, 0) as (queue, applied):
+        switch.fail("qvlanSet.cgi", count=10)
+        assert not await queue.async_submit(_plan("a", 10), "turn_on")
+        assert applied == []
+        switch.fail("qvlanSet.cgi", count=0)
+        assert await queue.async_submit(_plan("a", 10), "turn_on")
+        assert [entry[1:] for entry in applied] == [("a", "turn_on")]
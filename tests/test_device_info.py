@@ -0,0 +1,27 @@
+"""DeviceInfo built from system_info and kept with the entry."""
+from homeassistant.helpers import device_registry as dr
+
+from custom_components.tp_link_vlan_switcher.const import DOMAIN, CONF_DEVICE, DATA_DEVICE_INFO
+from custom_components.tp_link_vlan_switcher.entity_base import entry_device_info
+
+from .common import integration
+
+
+async def test_device_info_is_cached_in_the_entry_data(switch, tmp_path):
+    async with integration(str(tmp_path), switch) as (hass, entry):
+        data = hass.data[DOMAIN][entry.entry_id]
+        system_info, info = data[DATA_DEVICE_INFO]
+        assert system_info is entry.data[CONF_DEVICE]
+        assert entry_device_info(hass, entry) is info
+        device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, switch.address)})
+        assert (device.model, device.sw_version) == (info["model"], switch.info["firmwareStr"])
+
+        # Neue Systeminfo -> neu aufgebaut
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_DEVICE: {**entry.data[CONF_DEVICE], "firmwareStr": "2.0.0"}}
+        )
+        assert entry_device_info(hass, entry)["sw_version"] == "2.0.0"
+        assert data[DATA_DEVICE_INFO][1]["sw_version"] == "2.0.0"
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        assert entry.entry_id not in hass.data[DOMAIN]
@@ -0,0 +1,105 @@
+"""Discovery: probing a single host and sweeping a network."""
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+from custom_components.tp_link_vlan_switcher import discovery
+from custom_components.tp_link_vlan_switcher.discovery import (
+    DiscoveredSwitch, DiscoveryCache, async_discover, async_probe, discovery_hosts,
+)
+
+
+def _public_system_info(switch):
+    """Firmware that serves SystemInfoRpm.htm without login."""
+    handle = switch.handle
+
+    def _handle(method, path, query, form):
+        if path.lstrip("/") == "SystemInfoRpm.htm":
+            return 200, switch.system_info_page()
+        return handle(method, path, query, form)
+
+    switch.handle = _handle
+
+
+async def test_probe_reads_the_public_system_info(switch):
+    _public_system_info(switch)
+    async with aiohttp.ClientSession() as session:
+        found = await async_probe(session, switch.address)
+    assert found == DiscoveredSwitch(
+        switch.address,
+        model=switch.info["descriStr"],
+        mac=switch.info["macStr"],
+        firmware=switch.info["firmwareStr"],
+        hardware=switch.info["hardwareStr"],
+    )
+    assert found.port_count == 8
+
+
+async def test_probe_offers_the_ip_if_the_info_needs_a_login(switch):
+    async with aiohttp.ClientSession() as session:
+        found = await async_probe(session, switch.address)
+    assert found == DiscoveredSwitch(switch.address)
+    assert found.label == f"TP-Link Easy Smart ({switch.address})"
+
+
+async def test_probe_ignores_other_devices(switch):
+    switch.handle = lambda method, path, query, form: (200, "<html><title>Router</title></html>")
+    async with aiohttp.ClientSession() as session:
+        assert await async_probe(session, switch.address) is None
+        # Geschlossener Port
+        address = switch.address
+        switch.stop()
+        assert await async_probe(session, address, timeout=1) is None
+
+
+def test_discovery_hosts():
+    assert discovery_hosts("192.168.0.0/30") == ["192.168.0.1", "192.168.0.2"]
+    assert discovery_hosts(" 10.0.0.5/32 ") == ["10.0.0.5"]
+    assert len(discovery_hosts("10.0.0.0/22")) == 1022
+    for network in ("10.0.0.0/21", "fe80::/120", "no network"):
+        with pytest.raises(ValueError):
+            discovery_hosts(network)
+
+
+async def test_sweep_uses_the_cache_and_skips_excluded_hosts(monkeypatch):
+    probed: list[str] = []
+    in_flight = peak = 0
+
+    async def _probe(session, ip, timeout):
+        nonlocal in_flight, peak
+        probed.append(ip)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return DiscoveredSwitch(ip) if ip.endswith((".7", ".20")) else None
+
+    monkeypatch.setattr(discovery, "async_probe", _probe)
+    cache = DiscoveryCache()
+    cache.set("10.0.0.3", DiscoveredSwitch("10.0.0.3", model="cached"))
+
+    found = await async_discover(None, "10.0.0.0/27", exclude=["10.0.0.20"], cache=cache, concurrency=4)
+    assert [s.ip for s in found] == ["10.0.0.3", "10.0.0.7"]
+    assert found[0].model == "cached"
+    assert len(probed) == 30 - 2
+    assert peak == 4
+
+    # Treffer kommen aus dem Cache, Fehlschläge werden erneut geprüft
+    probed.clear()
+    found = await async_discover(None, "10.0.0.0/27", cache=cache, concurrency=4)
+    assert [s.ip for s in found] == ["10.0.0.3", "10.0.0.7", "10.0.0.20"]
+    assert "10.0.0.7" not in probed and "10.0.0.3" not in probed
+    assert len(probed) == 30 - 2
+
+
+def test_cache_entries_expire(monkeypatch):
+    cache = DiscoveryCache(ttl=10)
+    cache.set("10.0.0.1", DiscoveredSwitch("10.0.0.1"))
+    assert cache.get("10.0.0.1") == (True, DiscoveredSwitch("10.0.0.1"))
+    now = time.monotonic()
+    monkeypatch.setattr(discovery.time, "monotonic", lambda: now + 11)
+    assert cache.get("10.0.0.1") == (False, None)
+    cache.set("10.0.0.1", None)
+    assert cache.get("10.0.0.1") == (False, None)
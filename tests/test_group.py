@@ -0,0 +1,79 @@
+"""Group switch: availability from the member switches, partial failures."""
+import pytest
+from homeassistant.const import STATE_OFF, STATE_ON, STATE_UNAVAILABLE
+from homeassistant.exceptions import HomeAssistantError
+
+from benchmarks.mock_switch import MockTPLinkSwitch
+from custom_components.tp_link_vlan_switcher.const import (
+    DOMAIN, CONF_GROUPS, CONF_MEMBERS, CONF_PROFILE, CONF_SWITCHES, DATA_BROKER,
+)
+
+from .common import add_entry, integration, profile
+
+GROUP = "switch.all"
+
+
+async def _call(hass, service):
+    await hass.services.async_call("switch", service, {"entity_id": GROUP}, blocking=True)
+
+
+async def test_partial_failure_keeps_the_state_and_names_the_member(switch, tmp_path):
+    options = {CONF_SWITCHES: {"g": profile(10)}}
+    with MockTPLinkSwitch() as other:
+        async with integration(str(tmp_path), switch, options) as (hass, entry):
+            second = await add_entry(hass, other, options)
+            hass.config_entries.async_update_entry(entry, options={**entry.options, CONF_GROUPS: {
+                "all": {CONF_MEMBERS: [entry.entry_id, second.entry_id], CONF_PROFILE: "g"},
+            }})
+            await hass.async_block_till_done()
+
+            await _call(hass, "turn_on")
+            assert hass.states.get(GROUP).state == STATE_ON
+            assert switch.vlans[10][1][1] == other.vlans[10][1][1] == 0
+
+            other.fail("qvlanSet.cgi", count=100)
+            with pytest.raises(HomeAssistantError, match=rf"turn_off failed on 1 of 2 switches \({other.address}\)"):
+                await _call(hass, "turn_off")
+            state = hass.states.get(GROUP)
+            # Ein Mitglied ist noch an: die Gruppe meldet nicht "aus"
+            assert state.state == STATE_ON
+            assert state.attributes["results"] == {switch.address: "ok", other.address: "failed"}
+            assert switch.vlans[10][1][1] == 2
+
+            other.fail("qvlanSet.cgi", count=0)
+            await _call(hass, "turn_off")
+            assert hass.states.get(GROUP).state == STATE_OFF
+            await hass.config_entries.async_unload(second.entry_id)
+
+
+async def test_availability_follows_the_members(switch, tmp_path):
+    with MockTPLinkSwitch() as other:
+        async with integration(str(tmp_path), switch) as (hass, entry):
+            second = await add_entry(hass, other, {CONF_SWITCHES: {"g": profile(10)}})
+            hass.config_entries.async_update_entry(entry, options={**entry.options, CONF_GROUPS: {
+                "all": {CONF_MEMBERS: [second.entry_id], CONF_PROFILE: "g"},
+            }})
+            await hass.async_block_till_done()
+            assert hass.states.get(GROUP).state == STATE_OFF
+
+            # Der Switch des eigenen Eintrags ist egal
+            hass.data[DOMAIN][entry.entry_id][DATA_BROKER].breaker.suspend()
+            assert hass.states.get(GROUP).state == STATE_OFF
+            hass.data[DOMAIN][entry.entry_id][DATA_BROKER].breaker.resume()
+
+            breaker = hass.data[DOMAIN][second.entry_id][DATA_BROKER].breaker
+            breaker.suspend()
+            assert hass.states.get(GROUP).state == STATE_UNAVAILABLE
+            breaker.resume()
+            assert hass.states.get(GROUP).state == STATE_OFF
+
+            await hass.config_entries.async_unload(second.entry_id)
+            await hass.async_block_till_done()
+            assert hass.states.get(GROUP).state == STATE_UNAVAILABLE
+            await hass.config_entries.async_setup(second.entry_id)
+            await hass.async_block_till_done()
+            assert hass.states.get(GROUP).state == STATE_OFF
+            # Nach dem Neuladen zählt der Breaker des neuen Brokers
+            hass.data[DOMAIN][second.entry_id][DATA_BROKER].breaker.suspend()
+            assert hass.states.get(GROUP).state == STATE_UNAVAILABLE
+            await hass.config_entries.async_unload(second.entry_id)
@@ -0,0 +1,50 @@
+"""Option changes: profiles in place, everything else through a reload."""
+from custom_components.tp_link_vlan_switcher.const import (
+    DOMAIN, CONF_DEBOUNCE, CONF_SWITCHES, DATA_COORDINATOR, DATA_PLANS, DATA_QUEUE, DATA_SNAPSHOT,
+)
+
+from .common import integration, profile
+
+
+async def _turn_on(hass, *entity_ids):
+    await hass.services.async_call("switch", "turn_on", {"entity_id": list(entity_ids)}, blocking=True)
+
+
+async def test_profile_changes_update_the_entities_in_place(switch, tmp_path):
+    options = {CONF_SWITCHES: {"a": profile(10), "b": profile(20, port=2)}}
+    async with integration(str(tmp_path), switch, options) as (hass, entry):
+        data = hass.data[DOMAIN][entry.entry_id]
+        coordinator = data[DATA_COORDINATOR]
+        await _turn_on(hass, "switch.a", "switch.b")
+        switch.reset_counts()
+
+        hass.config_entries.async_update_entry(
+            entry, options={**entry.options, CONF_SWITCHES: {"a": profile(10, port=3), "c": profile(30)}}
+        )
+        await hass.async_block_till_done()
+
+        # Kein Reload: dieselben Objekte, keine neue Session am Switch
+        assert hass.data[DOMAIN][entry.entry_id] is data
+        assert data[DATA_COORDINATOR] is coordinator
+        assert switch.counts["logon.cgi"] == 0
+        assert sorted(data[DATA_PLANS]) == ["a", "c"]
+        assert hass.states.get("switch.b") is None
+        assert hass.states.get("switch.c").state == "off"
+        assert hass.states.get("switch.a") is not None
+        # Entfernte Profile werden beim Reboot nicht wiederhergestellt
+        assert data[DATA_QUEUE].desired == {"a": "turn_on"}
+        assert data[DATA_SNAPSHOT].desired == {"a": "turn_on"}
+
+        await _turn_on(hass, "switch.a")
+        assert switch.vlans[10][1][3] == 0
+
+
+async def test_other_option_changes_reload_the_entry(switch, tmp_path):
+    options = {CONF_SWITCHES: {"a": profile(10)}}
+    async with integration(str(tmp_path), switch, options) as (hass, entry):
+        data = hass.data[DOMAIN][entry.entry_id]
+        hass.config_entries.async_update_entry(entry, options={**entry.options, CONF_DEBOUNCE: 0.01})
+        await hass.async_block_till_done()
+
+        assert hass.data[DOMAIN][entry.entry_id] is not data
+        assert hass.states.get("switch.a") is not None
@@ -0,0 +1,41 @@
+"""ParseCache: hits by body digest, per-page LRU."""
+from custom_components.tp_link_vlan_switcher.utils import ParseCache
+
+
+def _parser(calls):
+    def parse(value):
+        def _parse():
+            calls.append(value)
+            return {"value": value}
+        return _parse
+    return parse
+
+
+def test_unchanged_body_returns_the_same_object():
+    cache, calls = ParseCache(), []
+    parse = _parser(calls)
+    first = cache.get_or_parse("vlan", ("a", "b"), parse(1))
+    assert cache.get_or_parse("vlan", ("a", "b"), parse(2)) is first
+    assert calls == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_body_boundaries_are_part_of_the_key():
+    cache, calls = ParseCache(), []
+    parse = _parser(calls)
+    cache.get_or_parse("vlan", ("ab", "c"), parse(1))
+    cache.get_or_parse("vlan", ("a", "bc"), parse(2))
+    assert calls == [1, 2]
+
+
+def test_lru_per_page():
+    cache, calls = ParseCache(size=2), []
+    parse = _parser(calls)
+    cache.get_or_parse("info", ("x",), parse("info"))
+    for body in ("1", "2", "1", "3"):
+        cache.get_or_parse("stats", (body,), parse(body))
+    # "1" war zuletzt benutzt, "2" ist verdrängt; die andere Seite bleibt unberührt
+    cache.get_or_parse("stats", ("1",), parse("1 again"))
+    cache.get_or_parse("stats", ("2",), parse("2 again"))
+    cache.get_or_parse("info", ("x",), parse("info again"))
+    assert calls == ["info", "1", "2", "3", "2 again"]
@@ -0,0 +1,48 @@
+"""Port statistics coordinator: counters and packet rates between two polls."""
+import asyncio
+
+import pytest
+
+from custom_components.tp_link_vlan_switcher.const import DOMAIN, DATA_PORT_COORDINATOR
+
+from .common import integration
+
+
+async def test_rates_between_two_polls(switch, tmp_path):
+    switch.packets[0] = [1000, 5, 2000, 0]
+    async with integration(str(tmp_path), switch) as (hass, entry):
+        coordinator = hass.data[DOMAIN][entry.entry_id][DATA_PORT_COORDINATOR]
+        await coordinator.async_refresh()
+        first = coordinator.data[1]
+        assert (first.counters.tx_good, first.counters.rx_good) == (1000, 2000)
+
+        await asyncio.sleep(0.2)
+        switch.packets[0] = [1100, 5, 2400, 2]
+        await coordinator.async_refresh()
+        status = coordinator.data[1]
+        dt = 100 / status.tx_good_rate
+        assert dt == pytest.approx(0.2, abs=0.1)
+        assert status.rx_good_rate == pytest.approx(400 / dt, rel=0.02)
+        assert status.tx_bad_rate == 0
+        assert status.rx_bad_rate == pytest.approx(2 / dt, abs=0.02)
+        assert coordinator.data[2].tx_good_rate == 0
+
+
+async def test_cleared_counters_have_no_rate(switch, tmp_path):
+    switch.packets[0] = [1000, 5, 2000, 0]
+    async with integration(str(tmp_path), switch) as (hass, entry):
+        coordinator = hass.data[DOMAIN][entry.entry_id][DATA_PORT_COORDINATOR]
+        await coordinator.async_refresh()
+        await asyncio.sleep(0.05)
+        switch.packets[0] = [10, 0, 20, 0]
+        await coordinator.async_refresh()
+        status = coordinator.data[1]
+        assert status.counters.tx_good == 10
+        assert status.tx_good_rate is None
+        assert status.rx_good_rate is None
+
+        # Ab dem nächsten Poll gegen die neuen Zähler
+        await asyncio.sleep(0.05)
+        switch.packets[0] = [20, 0, 20, 0]
+        await coordinator.async_refresh()
+        assert coordinator.data[1].tx_good_rate > 0
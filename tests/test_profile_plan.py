@@ -0,0 +1,42 @@
+"""merge_phase_plans: one write per VID and PVID, conflicts between profiles detected."""
+import pytest
+
+from custom_components.tp_link_vlan_switcher.profile_plan import (
+    PlanConflictError, compile_profile, merge_phase_plans,
+)
+
+
+def _phase(vlans, pvid=None):
+    return compile_profile("p", {"turn_on": vlans}, {"turn_on": pvid or {}}, 8).turn_on
+
+
+def test_merge_combines_ports_and_pvids():
+    a = _phase([{"vid": 10, "vname": "iot", "ports": {"1": 0}}], {"10": [1]})
+    b = _phase([{"vid": 10, "vname": "iot", "ports": {"2": 1}}, {"vid": 20, "vname": "cam", "ports": {"3": 0}}],
+               {"10": [2], "20": [3]})
+    merged = merge_phase_plans([("a", a), ("b", b)])
+
+    assert {w.vid: w.ports for w in merged.vlans} == {10: ((1, 0), (2, 1)), 20: ((3, 0),)}
+    assert {w.pvid: w.pbm for w in merged.pvids} == {10: 0b011, 20: 0b100}
+
+
+def test_merge_accepts_identical_settings():
+    a = _phase([{"vid": 10, "vname": "iot", "ports": {"1": 0}}], {"10": [1]})
+    merged = merge_phase_plans([("a", a), ("b", a)])
+    assert len(merged.vlans) == 1 and len(merged.pvids) == 1
+
+
+@pytest.mark.parametrize(
+    ("other", "message"),
+    [
+        (_phase([{"vid": 10, "vname": "iot", "ports": {"1": 1}}]), "VLAN 10 port 1"),
+        (_phase([{"vid": 10, "vname": "guest", "ports": {"2": 0}}]), "name 'iot'"),
+        (_phase([{"vid": 20, "vname": "cam", "ports": {"1": 0}}], {"20": [1]}), "Port 1: PVID 10"),
+    ],
+    ids=["port-state", "vlan-name", "pvid"],
+)
+def test_merge_conflicts_name_both_profiles(other, message):
+    a = _phase([{"vid": 10, "vname": "iot", "ports": {"1": 0}}], {"10": [1]})
+    with pytest.raises(PlanConflictError, match=message) as err:
+        merge_phase_plans([("a", a), ("b", other)])
+    assert "(a)" in str(err.value) and "(b)" in str(err.value)
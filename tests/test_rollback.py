@@ -0,0 +1,108 @@
+"""Transactional apply: what _rollback sends, in which order, and the state it leaves."""
+import pytest
+
+from custom_components.tp_link_vlan_switcher.profile_plan import compile_profile
+from custom_components.tp_link_vlan_switcher.tp_link_connector import TPLinkApplyError
+
+from .common import logged_in
+
+PROFILE_VLANS = {
+    "turn_on": [
+        {"vid": 100, "vname": "iot", "ports": {"1": 0, "2": 1}},
+        {"vid": 101, "vname": "cam", "ports": {"2": 1, "3": 0}},
+        {"vid": 1, "vname": "Default", "ports": {"1": 2}},
+    ],
+    "turn_off": [],
+}
+PROFILE_PVID = {"turn_on": {"100": [1], "101": [3]}, "turn_off": {}}
+
+
+def _log_requests(switch):
+    """Record (path, query) of every config write the switch receives."""
+    log = []
+    handle = switch.handle
+
+    def logging_handle(method, path, query, form):
+        path = path.lstrip("/")
+        if path in ("qvlanSet.cgi", "vlanPvidSet.cgi"):
+            log.append((path, query))
+        return handle(method, path, query, form)
+
+    switch.handle = logging_handle
+    return log
+
+
+def _plan(switch):
+    return compile_profile("test", PROFILE_VLANS, PROFILE_PVID, switch.port_count).turn_on
+
+
+async def test_rollback_readds_memberships_before_pvids_and_deletes_last(switch):
+    log = _log_requests(switch)
+    # Zweiter PVID-Write schlägt fehl, beide VLANs und der erste PVID sind da schon geschrieben
+    handle = switch.handle
+    pvid_writes = []
+
+    def failing_handle(method, path, query, form):
+        if path.lstrip("/") == "vlanPvidSet.cgi":
+            pvid_writes.append(query)
+            if len(pvid_writes) == 2:
+                return 500, "error"
+        return handle(method, path, query, form)
+
+    switch.handle = failing_handle
+    async with logged_in(switch) as connector:
+        with pytest.raises(TPLinkApplyError, match="rolled back"):
+            await connector.execute_plan(_plan(switch))
+
+    writes = [(path, query) for path, query in log if path != "vlanPvidSet.cgi" or query["pvid"] != ["101"]]
+    applied, rollback = writes[:4], writes[4:]
+    assert [q.get("vid") for _, q in applied] == [["100"], ["101"], ["1"], None]
+
+    # Erst Port 1 wieder in VLAN 1, dann die PVIDs, dann die neuen VLANs löschen
+    assert rollback[0][0] == "qvlanSet.cgi"
+    assert rollback[0][1]["vid"] == ["1"] and rollback[0][1]["selType_1"] == ["0"]
+    assert rollback[1] == ("vlanPvidSet.cgi", {"pvid": ["1"], "pbm": ["5"]})
+    assert [q.get("selVlans") for _, q in rollback[2:]] == [["101"], ["100"]]
+    assert all("qvlan_del" in q for _, q in rollback[2:])
+
+    assert sorted(switch.vlans) == [1]
+    assert switch.vlans[1][1][1] == 0
+    assert switch.pvids == [1] * switch.port_count
+
+
+async def test_rollback_fails_if_the_switch_ignores_it(switch):
+    handle = switch.handle
+
+    def ignoring_handle(method, path, query, form):
+        if path.lstrip("/") == "qvlanSet.cgi" and "qvlan_del" in query:
+            return 200, switch.vlan_page()
+        return handle(method, path, query, form)
+
+    switch.handle = ignoring_handle
+    switch.fail("vlanPvidSet.cgi")
+    async with logged_in(switch) as connector:
+        with pytest.raises(TPLinkApplyError, match="rollback failed.*did not restore VLAN"):
+            await connector.execute_plan(_plan(switch))
+
+
+async def test_rollback_only_touches_written_entries(switch):
+    # VLAN 100 existiert schon mit anderen Mitgliedern; nur der PVID-Write schlägt fehl
+    switch.vlans[100] = ["iot", {p: 2 for p in range(1, switch.port_count + 1)}]
+    switch.vlans[100][1][5] = 1
+    switch.fail("vlanPvidSet.cgi")
+    async with logged_in(switch) as connector:
+        with pytest.raises(TPLinkApplyError):
+            await connector.execute_plan(_plan(switch), diff=True)
+
+    assert sorted(switch.vlans) == [1, 100]
+    assert switch.vlans[100][1] == {p: 1 if p == 5 else 2 for p in range(1, switch.port_count + 1)}
+    assert switch.vlans[1][1][1] == 0
+    assert switch.pvids == [1] * switch.port_count
+
+
+async def test_successful_plan_is_not_rolled_back(switch):
+    log = _log_requests(switch)
+    async with logged_in(switch) as connector:
+        assert await connector.execute_plan(_plan(switch))
+    assert not any("qvlan_del" in q for _, q in log)
+    assert switch.pvids[:3] == [100, 1, 101]
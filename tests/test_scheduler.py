@@ -0,0 +1,105 @@
+"""FleetScheduler slots/backoff and the coordinator polls it drives."""
+import asyncio
+import logging
+from datetime import timedelta
+
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from custom_components.tp_link_vlan_switcher.const import FLEET_MAX_BACKOFF, FLEET_SLOW_POLL
+from custom_components.tp_link_vlan_switcher.scheduler import FleetScheduler, ScheduledPollMixin
+
+from .common import running_hass
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Poller(ScheduledPollMixin, DataUpdateCoordinator[int]):
+    def __init__(self, hass, name: str, scheduler: FleetScheduler):
+        super().__init__(hass, _LOGGER, name=name, update_interval=None)
+        self.polls: list[float] = []
+        self._init_schedule(scheduler)
+
+    async def _async_update_data(self) -> int:
+        self.polls.append(self.hass.loop.time())
+        self._record_poll(0.0, True)
+        return len(self.polls)
+
+
+async def test_slots_are_spread_over_the_interval(tmp_path):
+    async with running_hass(str(tmp_path)) as hass:
+        scheduler = FleetScheduler(hass, timedelta(seconds=30))
+        a, b, c = (scheduler.async_register(key) for key in "abc")
+        assert [a.offset, b.offset, c.offset] == [0.0, 10.0, 20.0]
+        assert scheduler.async_register("a") is a
+
+        scheduler.async_unregister("b")
+        assert [a.offset, c.offset] == [0.0, 15.0]
+
+
+async def test_next_delay_keeps_the_slot_phase(tmp_path):
+    async with running_hass(str(tmp_path)) as hass:
+        scheduler = FleetScheduler(hass, timedelta(seconds=30))
+        slots = [scheduler.async_register(key) for key in "ab"]
+        elapsed = hass.loop.time() - scheduler._epoch
+        for slot in slots:
+            delay = scheduler.next_delay(slot)
+            # eine Periode (± halbe) entfernt, auf der Phase des Slots (± Jitter)
+            assert 15 <= delay <= 45 + 1.5
+            phase = (elapsed + delay - slot.offset) % 30
+            assert min(phase, 30 - phase) <= 1.5 + 0.01
+
+
+async def test_backoff_grows_while_unchanged_and_resets(tmp_path):
+    async with running_hass(str(tmp_path)) as hass:
+        scheduler = FleetScheduler(hass, timedelta(seconds=30))
+        slot = scheduler.async_register("a")
+        scheduler.async_record_poll(slot, 0.1, changed=False)
+        assert slot.backoff == 1.5
+        scheduler.async_record_poll(slot, FLEET_SLOW_POLL + 1, changed=True)
+        assert slot.backoff == 3.0
+        for _ in range(5):
+            scheduler.async_record_poll(slot, 0.1, changed=False)
+        assert slot.backoff == FLEET_MAX_BACKOFF
+        scheduler.async_record_poll(slot, 0.1, changed=True)
+        assert slot.backoff == 1.0
+
+        slot.backoff = 2.0
+        scheduler.async_reset(slot)
+        assert slot.backoff == 1.0
+
+
+async def test_coordinators_poll_in_their_slots(tmp_path):
+    async with running_hass(str(tmp_path)) as hass:
+        scheduler = FleetScheduler(hass, timedelta(seconds=0.2))
+        first, second = _Poller(hass, "first", scheduler), _Poller(hass, "second", scheduler)
+        assert first.update_interval is None
+
+        await first.async_refresh()
+        await second.async_refresh()
+        await asyncio.sleep(0.75)
+        # Die Timer des Schedulers pollen weiter, nicht der DataUpdateCoordinator
+        assert 3 <= len(first.polls) <= 6
+        assert 3 <= len(second.polls) <= 6
+        gaps = [b - a for a, b in zip(first.polls[1:], first.polls[2:])]
+        assert all(0.1 <= gap <= 0.3 for gap in gaps)
+
+        await first.async_shutdown()
+        count = len(first.polls)
+        await asyncio.sleep(0.3)
+        assert len(first.polls) == count
+        assert len(second.polls) > 3
+        assert list(scheduler.summary()) == ["second"]
+        await second.async_shutdown()
+
+
+async def test_set_updated_data_postpones_the_next_poll(tmp_path):
+    async with running_hass(str(tmp_path)) as hass:
+        scheduler = FleetScheduler(hass, timedelta(seconds=0.2))
+        poller = _Poller(hass, "p", scheduler)
+        await poller.async_refresh()
+        for _ in range(4):
+            await asyncio.sleep(0.05)
+            poller.async_set_updated_data(0)
+        # Jede eigene Änderung verschiebt den Poll um mindestens eine halbe Periode
+        assert len(poller.polls) == 1
+        await poller.async_shutdown()
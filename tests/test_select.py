@@ -0,0 +1,55 @@
+"""Port PVID select: options, queued write, state taken from the switch."""
+import pytest
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.tp_link_vlan_switcher.const import DOMAIN, DATA_QUEUE, DATA_SNAPSHOT
+
+from .common import integration, profile
+
+SELECT = "select.port_1_pvid"
+
+
+async def _select(hass, option):
+    await hass.services.async_call("select", "select_option", {"entity_id": SELECT, "option": option},
+                                   blocking=True)
+
+
+async def test_options_are_the_vlans_of_the_port(switch, tmp_path):
+    switch.vlans[10] = ["iot", {p: 2 for p in range(1, switch.port_count + 1)}]
+    switch.vlans[10][1][1] = 1
+    switch.vlans[20] = ["cam", {p: 2 for p in range(1, switch.port_count + 1)}]
+    async with integration(str(tmp_path), switch) as (hass, _):
+        state = hass.states.get(SELECT)
+        assert state.attributes["options"] == ["1", "10"]
+        assert state.state == "1"
+
+
+async def test_select_writes_through_the_queue_and_overrides_profiles(switch, tmp_path):
+    options = {"switches": {"a": profile(10, pvid=True), "b": profile(20, port=2)}}
+    async with integration(str(tmp_path), switch, options) as (hass, entry):
+        await hass.services.async_call("switch", "turn_on", {"entity_id": ["switch.a", "switch.b"]}, blocking=True)
+        data = hass.data[DOMAIN][entry.entry_id]
+        assert switch.pvids[0] == 10
+        assert data[DATA_QUEUE].desired == {"a": "turn_on", "b": "turn_on"}
+
+        switch.reset_counts()
+        await _select(hass, "1")
+        assert switch.pvids[0] == 1
+        assert switch.counts["vlanPvidSet.cgi"] == 1
+        assert hass.states.get(SELECT).state == "1"
+        # Profil a setzt Port 1 auf PVID 10 und würde die Änderung beim Restore zurückdrehen
+        assert data[DATA_QUEUE].desired == {"b": "turn_on"}
+        assert data[DATA_SNAPSHOT].desired == {"b": "turn_on"}
+        assert data[DATA_SNAPSHOT].state.pvid(1) == 1
+
+
+async def test_rejected_pvid_keeps_the_reported_state(switch, tmp_path):
+    switch.vlans[10] = ["iot", {p: 2 for p in range(1, switch.port_count + 1)}]
+    switch.vlans[10][1][1] = 0
+    async with integration(str(tmp_path), switch) as (hass, _):
+        # Zwischen Poll und Schreiben verschwindet der Port aus VLAN 10, der Switch ignoriert den PVID
+        switch.vlans[10][1][1] = 2
+        with pytest.raises(HomeAssistantError, match="PVID 10 on port 1"):
+            await _select(hass, "10")
+        assert switch.pvids[0] == 1
+        assert hass.states.get(SELECT).state == "1"
@@ -0,0 +1,52 @@
+"""DeviceSnapshot: applied phases and tables persisted across a restart."""
+from custom_components.tp_link_vlan_switcher.models import SwitchVlanState, VlanEntry
+from custom_components.tp_link_vlan_switcher.snapshot import DeviceSnapshot
+
+from .common import running_hass
+
+STATE = SwitchVlanState(
+    port_count=4,
+    vlans={1: VlanEntry(vid=1, name="Default", tagged=0, untagged=0b1111),
+           10: VlanEntry(vid=10, name="iot", tagged=0b0010, untagged=0b0001)},
+    pvids=(10, 1, 1, 1),
+)
+
+
+async def test_forget_drops_every_name(tmp_path):
+    async with running_hass(str(tmp_path)) as hass:
+        snapshot = DeviceSnapshot(hass, "entry")
+        for name in ("a", "b", "c", "d"):
+            snapshot.async_record_apply(name, "turn_on")
+        snapshot.async_forget(["a", "b", "missing", "c"])
+        assert snapshot.desired == {"d": "turn_on"}
+
+        await snapshot.async_flush()
+        reloaded = DeviceSnapshot(hass, "entry")
+        await reloaded.async_load()
+        assert reloaded.desired == {"d": "turn_on"}
+
+
+async def test_forget_without_match_schedules_no_save(tmp_path):
+    async with running_hass(str(tmp_path)) as hass:
+        snapshot = DeviceSnapshot(hass, "entry")
+        snapshot.async_forget(["a"])
+        assert snapshot.timestamp is None
+
+
+async def test_state_and_phases_survive_a_restart(tmp_path):
+    async with running_hass(str(tmp_path)) as hass:
+        snapshot = DeviceSnapshot(hass, "entry")
+        snapshot.async_update_state(STATE)
+        snapshot.async_record_apply("iot", "turn_off")
+        await snapshot.async_flush()
+
+        reloaded = DeviceSnapshot(hass, "entry")
+        await reloaded.async_load()
+        assert reloaded.state == STATE
+        assert reloaded.desired == {"iot": "turn_off"}
+        assert reloaded.timestamp == snapshot.timestamp
+
+        await reloaded.async_remove()
+        empty = DeviceSnapshot(hass, "entry")
+        await empty.async_load()
+        assert empty.state is None and empty.desired == {}
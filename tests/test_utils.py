@@ -0,0 +1,86 @@
+"""Embedded JS literal parser of the switch pages."""
+import pytest
+
+from custom_components.tp_link_vlan_switcher.utils import (
+    extract_js_object_field, parse_js_object, parse_js_vars,
+)
+
+from benchmarks.mock_switch import MockTPLinkSwitch
+
+
+@pytest.mark.parametrize(
+    ("source", "expected"),
+    [
+        ("var a = [1, 2, 3];", [1, 2, 3]),
+        ("var a = ['x', \"y\", 'z'];", ["x", "y", "z"]),
+        ("var a = [0x1F, 0X0a, -0x2, 010, 007, 1.5, -3, 2e3];", [31, 10, -2, 10, 7, 1.5, -3, 2000.0]),
+        ("var a = new Array(0, 0, 4, 0);", [0, 0, 4, 0]),
+        ("var a = new Array();", []),
+        ("var a = [1, 2,];", [1, 2]),
+        ("var a = {b: 1, 'c': [2,], \"d\": {e: 'f',},};", {"b": 1, "c": [2], "d": {"e": "f"}}),
+        ("var a = [[1, 2], [], {x: [3]}];", [[1, 2], [], {"x": [3]}]),
+        ("var a = ['it\\'s', \"say \\\"hi\\\"\", 'a\\\\b', '\\u00e4\\x41\\n'];",
+         ["it's", 'say "hi"', "a\\b", "äA\n"]),
+        ("var a = ['],)', '{'];", ["],)", "{"]),
+        ("var a = [true, false, null];", [True, False, None]),
+        ("var a = 'end of text'", "end of text"),
+    ],
+)
+def test_literals(source, expected):
+    assert parse_js_vars(source) == {"a": expected}
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        'var a = "x" + y;',
+        "var a = [1, 2] .concat(b);",
+        "var a = 1 - 2;",
+        "var a = new Array(f(1));",
+        "var a = [1, 2;",
+        "var a = {b c};",
+        "var a = document.title;",
+    ],
+    ids=["concat", "method", "expression", "call", "unclosed", "bad-object", "identifier"],
+)
+def test_non_literals_are_skipped(source):
+    assert parse_js_vars(source + "\nvar z = 1;") == {"z": 1}
+
+
+def test_several_declarations_in_one_statement_and_first_wins():
+    html = "var a = 1, b = 2; var b = 3; var a = 'x' + 1; var c = [a];"
+    assert parse_js_vars(html) == {"a": 1, "b": 3}
+    assert parse_js_vars("var b = 'x' + 1;\nvar b = 2;") == {"b": 2}
+
+
+def test_names_filter_and_suffixes():
+    html = (
+        "var info_ds_old = {x: 1}; var myinfo_ds = {x: 2}; xvar info_ds = {x: 3};\n"
+        "var info = [4]; var info_ds = {x: 5}; var other = f();"
+    )
+    assert parse_js_vars(html, ("info_ds",)) == {"info_ds": {"x": 5}}
+    assert parse_js_vars(html, ("info", "missing")) == {"info": [4]}
+    assert parse_js_vars(html) == {"info_ds_old": {"x": 1}, "myinfo_ds": {"x": 2}, "info": [4],
+                                  "info_ds": {"x": 5}}
+
+
+def test_object_helpers():
+    html = '<script>var info_ds = {\ndescriStr:["TL-SG108E"],\nports:[1,2],\nname:[]\n};</script>'
+    assert parse_js_object(html, "info_ds") == {"descriStr": ["TL-SG108E"], "ports": [1, 2], "name": []}
+    assert extract_js_object_field(html, "info_ds") == {"descriStr": "TL-SG108E", "ports": [1, 2], "name": []}
+    assert extract_js_object_field(html, "info_ds", "descriStr") == "TL-SG108E"
+    assert parse_js_object("var info_ds = [1];", "info_ds") is None
+    assert extract_js_object_field(html, "missing") is None
+
+
+def test_mock_switch_pages():
+    switch = MockTPLinkSwitch(port_count=24)
+    switch.vlans[10] = ["iot's", {p: 1 if p % 2 else 2 for p in range(1, 25)}]
+    qvlan = parse_js_object(switch.vlan_page(), "qvlan_ds")
+    assert qvlan["vids"] == [1, 10]
+    assert qvlan["names"] == ["Default", "iot's"]
+    assert qvlan["tagMbrs"] == [0, int("01" * 12, 2)]
+    assert qvlan["untagMbrs"] == [(1 << 24) - 1, 0]
+    assert parse_js_object(switch.pvid_page(), "pvid_ds")["pvids"] == [1] * 24
+    assert parse_js_vars(switch.login_page(4), ("logonInfo",)) == {"logonInfo": [4, 0, 0]}
+    assert extract_js_object_field(switch.system_info_page(), "info_ds", "hardwareStr") == "TL-SG108E 6.0"